@@ -1,10 +1,40 @@
 from a2_support import *
-from typing import Optional
+import sys
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from heapq import heapify, heappop, heappush
+from itertools import islice
+from functools import partial
+from random import Random
+from threading import Lock, RLock
+from typing import Callable, ContextManager, Iterable, Iterator, Optional
+
+# Names of the moves a player can make, used to label timing counters.
+MOVES = ('ls', 'n', 'stats', 'w', 'rm', 'p', 'a', 'm', 's', 'undo', 'redo', 
+    'journal', 'suggest', 'urgent')
+
+# Number of pots suggested by the 'suggest' move.
+SUGGESTIONS = 5
+
+# Number of plants listed by the 'urgent' move if no number is given.
+URGENT = 5
+
+# Number of pots listed by each page of the 'ls' move.
+PAGE_SIZE = 50
+
+# States of pots that the 'ls' move can be filtered by.
+POT_STATES = ('alive', 'dead', 'empty')
+
+# Number of days that survival is simulated for when planning where to plant.
+SURVIVAL_HORIZON = 60
 
 class Entity:
     """
     Provides base functionality for Plant and Item.
     """
+    # IDs of each class, read from constants.py once per class.
+    _ids = {}
+
     def get_class_name(self) -> str:
         """
         str: Returns string of the name of the class
@@ -18,13 +48,21 @@ class Entity:
         Returns:
             str: string of the ID of corresponding class.
         """
+        class_name = self.get_class_name()
+        if class_name in Entity._ids:
+            return Entity._ids[class_name]
+
+        id_self = None
         with open("constants.py", "r") as id_file:
             for line in id_file:
                 line = line.replace("_", "")
-                if self.get_class_name().upper() in line:
+                if class_name.upper() in line:
                     line_wout_n = line.strip()
                     _, id_self = line_wout_n.split(" = ")
-                    return str(id_self.strip("'"))
+                    id_self = str(id_self.strip("'"))
+                    break
+        Entity._ids[class_name] = id_self
+        return id_self
     
     def __str__(self) -> str:
         """
@@ -85,11 +123,15 @@ class Plant(Entity):
         """
         return self._water_lvl
 
-    def water_plant(self) -> None:
+    def water_plant(self, amount: float = 1) -> None:
         """
-        Adds 1 to the water level.
+        Adds 1 to the water level by default,
+        otherwise it adds the specified amount.
+
+        Parameters:
+            amount (float, optional): amount of water, defaults to 1.
         """
-        self._water_lvl += 1
+        self._water_lvl += amount
 
     def get_drink_rate(self) -> float:	
         """
@@ -182,6 +224,22 @@ class Plant(Entity):
         else:
             return False
 
+    def get_state(self) -> tuple[float, int, int, bool]:
+        """
+        tuple[float, int, int, bool]: Returns the plant's water level,
+            health level, age, and whether it has repellent.
+        """
+        return (self._water_lvl, self._health_lvl, self._age, self._repellent)
+
+    def set_state(self, state: tuple[float, int, int, bool]) -> None:
+        """
+        Sets the plant's water level, health level, age, and repellent.
+
+        Parameters:
+            state (tuple[float, int, int, bool]): a state from get_state().
+        """
+        self._water_lvl, self._health_lvl, self._age, self._repellent = state
+
     # The __str__ method is inherited from Entity.
 
     def __repr__(self) -> str:
@@ -211,6 +269,18 @@ class Item(Entity):
         """
         raise NotImplementedError
 
+    def apply_many(self, plant: 'Plant', count: int) -> None:
+        """
+        Applies the item to the specified instance of Plant count times.
+        Subclasses override this to apply the combined effect at once.
+
+        Parameters:
+            plant (Plant): an instance of Plant to apply item to.
+            count (int): the number of times the item is applied.
+        """
+        for _ in range(count):
+            self.apply(plant)
+
 
 class Water(Item):
     """
@@ -227,6 +297,16 @@ class Water(Item):
         """
         plant.water_plant()
 
+    def apply_many(self, plant: 'Plant', count: int) -> None:
+        """
+        Waters the specified instance of plant count times at once.
+
+        Parameters:
+            plant (Plant): an instance of Plant to water.
+            count (int): the number of waterings.
+        """
+        plant.water_plant(count)
+
 
 class Fertiliser(Item):
     """
@@ -243,6 +323,16 @@ class Fertiliser(Item):
         """
         plant.add_health(1)
 
+    def apply_many(self, plant: 'Plant', count: int) -> None:
+        """
+        Applies count fertilisers to the specified instance of Plant at once.
+
+        Parameters:
+            plant (Plant): an instance of Plant to apply fertiliser.
+            count (int): the number of fertilisers.
+        """
+        plant.add_health(count)
+
 
 class PossumRepellent(Item):
     """
@@ -259,11 +349,127 @@ class PossumRepellent(Item):
         """
         plant.set_repellent(True)
 
+    def apply_many(self, plant: 'Plant', count: int) -> None:
+        """
+        Applies repellent to specified instance of Plant. Applying it more
+        than once has no further effect.
+
+        Parameters:
+            plant (Plant): an instance of Plant to apply repellent.
+            count (int): the number of repellents.
+        """
+        plant.set_repellent(True)
+
+
+class EntityStack:
+    """
+    The instances of one item or plant in the inventory.
+    Instances from a quantity are only created when they are taken out,
+    so large quantities cost no more than small ones.
+    """
+    def __init__(self, make: Callable[[], 'Item | Plant'], 
+        count: int = 0) -> None:
+        """
+        Parameters:
+            make (Callable[[], Item | Plant]): creates one more instance.
+            count (int, optional): the number of instances not created yet.
+                Defaults to 0.
+        """
+        self._make = make
+        self._count = count
+        self._entities = []
+
+    def add(self, count: int) -> None:
+        """
+        Adds instances that are created when they are taken out.
+
+        Parameters:
+            count (int): the number of instances.
+        """
+        self._count += count
+
+    def append(self, entity: 'Item | Plant') -> None:
+        """
+        Adds an instance that already exists, after any others.
+
+        Parameters:
+            entity (Item | Plant): the instance.
+        """
+        self._entities.append(entity)
+
+    def take(self, count: int) -> list['Item | Plant']:
+        """
+        Removes and returns up to count instances, oldest first.
+
+        Parameters:
+            count (int): the number of instances to take.
+
+        Returns:
+            list[Item | Plant]: the instances that were taken.
+        """
+        made = min(count, self._count)
+        self._count -= made
+        taken = [self._make() for _ in range(made)]
+        taken.extend(self._entities[:count - made])
+        del self._entities[:count - made]
+        return taken
+
+    def get_state(self) -> tuple[Callable, int, tuple['Item | Plant', ...]]:
+        """
+        tuple[Callable, int, tuple[Item | Plant, ...]]: Returns the function
+            that creates instances, the number of instances not created yet
+            and the instances that exist.
+        """
+        return (self._make, self._count, tuple(self._entities))
+
+    def set_state(self, 
+        state: tuple[Callable, int, tuple['Item | Plant', ...]]) -> None:
+        """
+        Sets the instances of the stack.
+
+        Parameters:
+            state (tuple[Callable, int, tuple[Item | Plant, ...]]): a state
+                from get_state().
+        """
+        self._make = state[0]
+        self._count = state[1]
+        self._entities = list(state[2])
+
+    def __len__(self) -> int:
+        """
+        int: Returns the number of instances.
+        """
+        return self._count + len(self._entities)
+
+    def __getitem__(self, index: int) -> 'Item | Plant':
+        """
+        Returns the instance at index without removing it. Instances that
+        are not created yet are returned as new instances.
+
+        Parameters:
+            index (int): the index of the instance.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('EntityStack index out of range')
+        if index < self._count:
+            return self._make()
+        return self._entities[index - self._count]
+
+    def __repr__(self) -> str:
+        """
+        str: Returns the representation of the instances, as a list.
+        """
+        entities = [repr(self._make())] * self._count \
+            + [repr(entity) for entity in self._entities]
+        return f"[{', '.join(entities)}]"
+
 
 class Inventory:
     """
     Class for base functionality of the inventory.
-    It contains lists and dictionaries for the player's items and plants.
+    It contains dictionaries for the player's items and plants.
     """
     def __init__(self, initial_items: Optional[list[Item]] = None, 
         initial_plants: Optional[list[Plant]] = None) -> None:
@@ -280,71 +486,52 @@ class Inventory:
                 A list of the instances of Plant.
                 Defaults to None if nothing is input.
         """
-        # If there is no input to Inventory, the initial lists and dictionaries
-        # are empty.
-        self._initial_items = []
-        self._initial_plants = []
+        # Each dictionary maps an item's ID or a plant's name to
+        # the stack of its instances.
         self._items_inv = {}
         self._plants_inv = {}
 
-        # If there are inputs to Inventory, the following code is executed.
-        if initial_items != None and initial_items != []:
-            # If there is input for initial_items but not initial_plants, 
-            # then initial_items must be checked if it has items or plants.
-            if type(initial_items[0]) == Plant:
-                self._initial_plants = initial_items
-            else:
-                # If both inputs exist, then they are assigned to private
-                # variables accordingly.
-                self._initial_items = initial_items
-                self._initial_plants = initial_plants
-                # inital_plants can be None if there is no input for it.
-
+        # A list of plants may be the only input.
+        if initial_items != None and initial_items != [] \
+            and type(initial_items[0]) == Plant:
+            initial_items, initial_plants = None, initial_items
 
-        # A dictionary for items and a dictionary for plants are then 
-        # initialised using the corresponding lists.
-
-        if self._initial_items != None:
-            for item in self._initial_items:
-                # This adds each item to self._items_inv.
-                self.add_item(item)
+        for item in initial_items or []:
+            # This adds each item to self._items_inv.
+            self.add_item(item)
         
-        if self._initial_plants != None:
-            for plant in self._initial_plants:
-                # This adds each plant to self._plants_inv.
-                self.add_plant(plant)
-        else:
-            self._initial_plants = []
+        for plant in initial_plants or []:
+            # This adds each plant to self._plants_inv.
+            self.add_plant(plant)
 
     def add_item(self, item: Item) -> None:
         """
         Adds an item to the items dictionary (self._items_inv) by creating
-        a new key or appending to the existing key's list.
+        a new key or adding to the existing key's stack.
 
         Parameters:
             item (Item): an instance of a subclass of Item.
         """
         if item.get_id() not in self._items_inv:
-            self._items_inv[item.get_id()] = [item]
-        else:
-            self._items_inv.get(item.get_id()).append(item)
+            self._items_inv[item.get_id()] = EntityStack(type(item))
+        self._items_inv.get(item.get_id()).append(item)
 
     def add_plant(self, plant: Plant) -> None:
         """
         Adds an plant to the plants dictionary (self._plants_inv) by creating
-        a new key or appending to the existing key's list.
+        a new key or adding to the existing key's stack.
 
         Parameters:
             plant (Plant): an instance of Plant.
         """
         if plant.get_name() not in self._plants_inv:
-            self._plants_inv[plant.get_name()] = [plant]
-        else:
-            self._plants_inv.get(plant.get_name()).append(plant)
+            self._plants_inv[plant.get_name()] = \
+                EntityStack(partial(Plant, plant.get_name()))
+        self._plants_inv.get(plant.get_name()).append(plant)
 
     def add_entity(self, entity: Item | Plant) -> None:
         """
-        Adds an item or plant to their corresponding lists and dictionaries.
+        Adds an item or plant to their corresponding dictionaries.
 
         Parameters:
             entity (Item | Plant): an instance of Plant or subclass of Item.
@@ -353,13 +540,65 @@ class Inventory:
 
         if issubclass(type(entity), Item):
             self.add_item(entity)
-            self._initial_items.append(entity)
 
         if issubclass(type(entity), Plant):
             self.add_plant(entity)
-            self._initial_plants.append(entity)
 
-    def get_entities(self, entity_type: str) -> dict[str, list[Item | Plant]]:
+    def add_quantity(self, entity_type: str, entity_name: str, 
+        count: int, make: Callable[[], Item | Plant]) -> None:
+        """
+        Adds a quantity of an item or plant without creating the instances,
+        which are only created when they are removed.
+
+        Parameters:
+            entity_type (str): 'Item' or 'Plant'.
+            entity_name (str): the item's ID or the plant's name.
+            count (int): the number of instances.
+            make (Callable[[], Item | Plant]): creates one instance.
+        """
+        if count <= 0:
+            return
+        temp_inv = self.get_entities(entity_type)
+        if entity_name not in temp_inv:
+            temp_inv[entity_name] = EntityStack(make)
+        temp_inv.get(entity_name).add(count)
+
+    def get_stack(self, entity_type: str, 
+        entity_name: str) -> Optional[tuple]:
+        """
+        Gets the state of the instances of one item or plant.
+
+        Parameters:
+            entity_type (str): 'Item' or 'Plant'.
+            entity_name (str): the item's ID or the plant's name.
+
+        Returns:
+            Optional[tuple]: the state of the item's or plant's EntityStack,
+                or None if there are none.
+        """
+        stack = self.get_entities(entity_type).get(entity_name)
+        if stack == None:
+            return None
+        return stack.get_state()
+
+    def set_stack(self, entity_type: str, entity_name: str, 
+        stack: Optional[tuple]) -> None:
+        """
+        Sets the instances of one item or plant.
+
+        Parameters:
+            entity_type (str): 'Item' or 'Plant'.
+            entity_name (str): the item's ID or the plant's name.
+            stack (Optional[tuple]): a state from get_stack().
+        """
+        temp_inv = self.get_entities(entity_type)
+        if stack == None:
+            temp_inv.pop(entity_name, None)
+            return
+        temp_inv[entity_name] = EntityStack(stack[0])
+        temp_inv[entity_name].set_state(stack)
+
+    def get_entities(self, entity_type: str) -> dict[str, EntityStack]:
         """
         Gets the specified dictionary of either items or plants.
 
@@ -368,7 +607,7 @@ class Inventory:
                 'Plant' for the plants dictionary.
 
         Returns:
-            dict[str, list[Item | Plant]]: The dictionary of items or plants.
+            dict[str, EntityStack]: The dictionary of items or plants.
         """
         if entity_type == 'Item':
             return self._items_inv
@@ -378,7 +617,7 @@ class Inventory:
     def remove_entity(self, entity_name: str) -> Optional[Item | Plant]:
         """
         Removes an instance of item or plant from their corresponding
-        dictionaries and lists.
+        dictionaries.
 
         Parameters:
             entity_name (str): To remove an item, input the item's ID.
@@ -388,24 +627,35 @@ class Inventory:
             Optional[Item | Plant]: If an instance of entity was removed,
                 that entity is returned. Otherwise, None is returned.
         """
+        entities = self.remove_entities(entity_name, 1)
+        if entities == []:
+            return None
+        return entities[0]
+
+    def remove_entities(self, entity_name: str, 
+        count: int) -> list[Item | Plant]:
+        """
+        Removes up to count instances of an item or plant at once.
+
+        Parameters:
+            entity_name (str): To remove items, input the item's ID.
+                To remove plants, input the plant's name.
+            count (int): the number of instances to remove.
+
+        Returns:
+            list[Item | Plant]: the instances that were removed.
+        """
         if entity_name in self._items_inv:
             temp_inv = self._items_inv
-            temp_entities = self._initial_items
-            pass
         elif entity_name in self._plants_inv:
             temp_inv = self._plants_inv
-            temp_entities = self._initial_plants
-            pass
         else:
-            return None
-
-        entity = temp_inv.get(entity_name).pop(0)
-        temp_entities.pop(temp_entities.index(entity))
+            return []
 
-        if temp_inv.get(entity_name) == []:
+        entities = temp_inv.get(entity_name).take(count)
+        if len(temp_inv.get(entity_name)) == 0:
             temp_inv.pop(entity_name)
-        
-        return entity
+        return entities
 
     def __str__(self) -> str:
         """
@@ -426,8 +676,12 @@ class Inventory:
         """
         str: Returns the representation of Inventory.
         """
-        return f"Inventory(initial_items={self._initial_items}, " \
-            f"initial_plants={self._initial_plants})"
+        items = ', '.join(repr(stack)[1:-1] 
+            for stack in self._items_inv.values() if len(stack) > 0)
+        plants = ', '.join(repr(stack)[1:-1] 
+            for stack in self._plants_inv.values() if len(stack) > 0)
+        return f"Inventory(initial_items=[{items}], " \
+            f"initial_plants=[{plants}])"
 
 
 class Pot(Entity):
@@ -562,19 +816,24 @@ class Pot(Entity):
         self.look_at_plant().increase_age()
 
 
-    def animal_attack(self) -> None:
+    def animal_attack(self) -> bool:
         """
         Applies effects of an animal attack to the plant.
 
         Decreases plant's health by 5 points if it does not have repellent.
         Otherwise, plant is not affected.
+
+        Returns:
+            bool: True if the plant was harmed, but False if it has
+                repellent or there is no living plant.
         """
 
         if self.look_at_plant() == None or self.look_at_plant().is_dead():
-            return
+            return False
         elif self.look_at_plant().has_repellent():
             print("There has been an animal attack! But luckily "
                 f"the {self.look_at_plant().get_name()} has repellent.")
+            return False
         else:
             self.look_at_plant().decrease_health(ANIMAL_ATTACK_DAMAGE)
 
@@ -584,6 +843,7 @@ class Pot(Entity):
             else:
                 print(f"There has been an animal attack! "
                     f"{self.look_at_plant().get_name()} is dead.")
+            return True
 
 
     def __str__(self) -> str:
@@ -600,7 +860,7 @@ class Room:
     Provides functionality for a room.
 
     It contains a room's layout (from constants.py).
-    A room contains 4 pots.
+    A room contains any number of pots, stored in a list by position.
     """
     def __init__(self, name: str) -> None:
         """
@@ -611,24 +871,172 @@ class Room:
         """
         self._room_name = name
         self._room_layout = ROOM_LAYOUTS[self._room_name]
-        self._plants_position = {0: None, 1: None, 2: None, 3: None}
-        self._pots_position = {0: None, 1: None, 2: None, 3: None}
+        self._plants_position = None
+        self._pots_position = []
+
+        # Bitmaps of the pots that hold a plant and that hold a living
+        # plant, with bit n for the pot at position n. Only pots with
+        # living plants are progressed each day.
+        self._occupied = 0
+        self._alive = 0
+        # Bitmap of the pots that hold a plant of each species, by name.
+        self._species = {}
+
+        # Counts of what happened to the room's plants since the counts
+        # were last cleared, e.g. {'deaths': 1}.
+        self._events = {}
+        self._stats = Stats()
+        self._random = None
+
+        # Functions that are called with a position whenever the plant in
+        # the pot at that position may have changed.
+        self._pot_listeners = []
 
+        # Recent vitals of the plant in each pot, by position, kept for the
+        # plants that have been progressed while it has been in the pot.
+        self._history = {}
+        self._history_length = HISTORY_LENGTH
+        self._downsample = False
 
-    def get_plants(self) -> dict[int, Plant | None]:
+    def set_random(self, rng: Optional[Random]) -> None:
         """
-        Gets instances of all plants from all pots in the room.
+        Sets the random number generator of the room's dice rolls.
+
+        Giving each room its own generator makes the room's progress
+        independent of the order in which rooms are progressed.
+
+        Parameters:
+            rng (Optional[Random]): the generator, or None to use the
+                global generator.
+        """
+        self._random = rng
+
+    def get_random(self) -> Optional[Random]:
+        """
+        Optional[Random]: Returns the generator of the room's dice rolls,
+            or None if the room uses the global generator.
+        """
+        return self._random
+
+    def set_stats(self, stats: Stats) -> None:
+        """
+        Sets the timing counters that the room's progress is recorded in.
+
+        Parameters:
+            stats (Stats): the model's timing counters.
+        """
+        self._stats = stats
+
+    def set_history(self, length: int, downsample: bool = False) -> None:
+        """
+        Sets how many days of vitals are kept for each pot, clearing the
+        vitals kept so far.
+
+        Parameters:
+            length (int): the number of samples kept, or 0 to keep none.
+            downsample (bool, optional): True to keep fewer samples of older
+                days instead of forgetting them (see VitalsRing).
+                Defaults to False.
+        """
+        self._history = {}
+        self._history_length = length
+        self._downsample = downsample
+
+    def get_history(self, position: int, 
+        before: Optional[int] = None) -> list[tuple[int, float, int]]:
+        """
+        Gets the recent vitals of the plant in a pot.
+
+        Parameters:
+            position (int): a position of a pot in the room.
+            before (Optional[int], optional): only get the samples of days
+                before this one, e.g. to leave out days that were undone.
+                Defaults to None for every sample.
 
         Returns:
-            dict[int, Plant | None]: a dictionary of all plants in the room.
+            list[tuple[int, float, int]]: the day, water level and health
+                of each sample, oldest first.
         """
+        ring = self._history.get(position)
+        if ring == None:
+            return []
+        return [sample for sample in ring.get_samples()
+            if before == None or sample[0] < before]
 
-        # Iterates through each pot and adds its plant to self._plants_position.
-        for pot in self._pots_position:
-            if self._pots_position[pot] != None:
-                self._plants_position[pot] = \
-                    self._pots_position[pot].look_at_plant()
-        
+    def get_ring(self, position: int) -> Optional[VitalsRing]:
+        """
+        Gets the ring of vitals of the plant in a pot, so that it can follow
+        the plant to another pot (see set_ring()).
+
+        Parameters:
+            position (int): a position of a pot in the room.
+
+        Returns:
+            Optional[VitalsRing]: the ring, or None if nothing is recorded.
+        """
+        return self._history.get(position)
+
+    def set_ring(self, position: int, ring: Optional[VitalsRing]) -> None:
+        """
+        Sets the ring of vitals of the plant in a pot, e.g. after the plant
+        was moved into the pot.
+
+        Parameters:
+            position (int): a position of a pot in the room.
+            ring (Optional[VitalsRing]): the ring from get_ring(), or None
+                to record afresh.
+        """
+        if ring == None:
+            self._history.pop(position, None)
+        else:
+            self._history[position] = ring
+
+    def add_pot_listener(self, listener: Callable[[int], None]) -> None:
+        """
+        Adds a function that is called with a pot's position whenever a plant
+        is put in or taken out of the pot, for each pot that is added, and
+        when its plant is changed by an item or an animal attack.
+
+        Parameters:
+            listener (Callable[[int], None]): the function.
+        """
+        self._pot_listeners.append(listener)
+
+    def notify(self, position: int) -> None:
+        """
+        Calls the pot listeners after the plant in a pot was changed other
+        than by its daily progress, e.g. by an item.
+
+        Parameters:
+            position (int): a position of a pot in the room.
+        """
+        for listener in self._pot_listeners:
+            listener(position)
+
+    def __getstate__(self) -> dict:
+        """
+        dict: Returns the room's attributes for pickling, without the pot
+            listeners, which belong to whoever added them and would pickle
+            it along with the room.
+        """
+        state = self.__dict__.copy()
+        state['_pot_listeners'] = []
+        return state
+
+    def get_plants(self) -> tuple[Plant | None, ...]:
+        """
+        Gets instances of all plants from all pots in the room.
+
+        The plants are copied once and the copy is kept until a plant is
+        put in or taken out of a pot.
+
+        Returns:
+            tuple[Plant | None, ...]: the plant in each pot, indexed by
+                position.
+        """
+        if self._plants_position == None:
+            self._plants_position = \
+                tuple(pot.look_at_plant() for pot in self._pots_position)
         return self._plants_position
         
     def get_number_of_plants(self) -> int:
@@ -638,39 +1046,189 @@ class Room:
         Returns:
             int: total number of instances of plants in the room.
         """
-        num_plants = 0
-        for position in self.get_plants():
-            if self.get_plants().get(position) != None:
-                num_plants += 1
-        return num_plants
+        return self._occupied.bit_count()
+
+    def has_plant(self, position: int) -> bool:
+        """
+        Checks whether the pot at the specified position holds a plant,
+        dead or alive.
+
+        Parameters:
+            position (int): a position of a pot in the room.
+
+        Returns:
+            bool: True if the pot holds a plant, otherwise False.
+        """
+        return (self._occupied >> position) & 1 == 1
+
+    def find_empty_pot(self, start: int = 0) -> Optional[int]:
+        """
+        Finds the first empty pot at or after a position.
+
+        Parameters:
+            start (int, optional): the position to search from,
+                defaults to 0.
+
+        Returns:
+            Optional[int]: the position of the pot, or None if the pots
+                from start on all hold plants.
+        """
+        # The lowest clear bit of the occupied pots from start on.
+        empty = ~(self._occupied >> start) \
+            & ((1 << max(0, len(self._pots_position) - start)) - 1)
+        if empty == 0:
+            return None
+        return start + (empty & -empty).bit_length() - 1
+
+    def add_pots(self, pots: list[Pot]) -> None:
+        """
+        Adds pots to the room after its existing pots.
+
+        Each line of pots in a house file is added in turn, so the first
+        pot of a line takes the position after the last pot of the line before.
+
+        Parameters:
+            pots (list[Pot]): the pots to be added, in order of position.
+        """
+        first = len(self._pots_position)
+        self._pots_position.extend(pots)
+        for position in range(first, len(self._pots_position)):
+            self.refresh(position)
+
+    def refresh(self, position: int) -> None:
+        """
+        Updates whether the pot at the specified position is progressed
+        each day, which it is if it holds a living plant.
+
+        Call this after changing a pot's plant without using the room.
+
+        Parameters:
+            position (int): a position of a pot in the room.
+        """
+        plant = self._pots_position[position].look_at_plant()
+        bit = 1 << position
+        if plant != None:
+            self._occupied |= bit
+        else:
+            self._occupied &= ~bit
+        if plant != None and not plant.is_dead():
+            self._alive |= bit
+        else:
+            self._alive &= ~bit
+        self._clear_species(bit)
+        if plant != None:
+            name = plant.get_name()
+            self._species[name] = self._species.get(name, 0) | bit
+        self._plants_position = None
+        for listener in self._pot_listeners:
+            listener(position)
+
+    def count_event(self, event: str) -> None:
+        """
+        Adds 1 to the count of an event in the room.
+
+        Parameters:
+            event (str): name of the event, e.g. 'deaths'.
+        """
+        self._events[event] = self._events.get(event, 0) + 1
+
+    def get_events(self) -> dict[str, int]:
+        """
+        dict[str, int]: Returns the count of each event in the room
+            since the counts were last cleared.
+        """
+        return self._events
+
+    def clear_events(self) -> None:
+        """
+        Clears the counts of events in the room.
+        """
+        self._events.clear()
+
+    def set_events(self, events: dict[str, int]) -> None:
+        """
+        Sets the counts of events in the room.
+
+        Parameters:
+            events (dict[str, int]): the count of each event.
+        """
+        self._events = dict(events)
+
+    def get_active_positions(self) -> list[int]:
+        """
+        list[int]: Returns the positions of the pots with living plants,
+            in order.
+        """
+        return bit_positions(self._alive)
+
+    def _clear_species(self, bit: int) -> None:
+        """
+        Clears a pot's bit from the bitmap of its species, if it had one.
+
+        Parameters:
+            bit (int): the pot's bit.
+        """
+        for name, bits in self._species.items():
+            if bits & bit:
+                bits &= ~bit
+                if bits == 0:
+                    del self._species[name]
+                else:
+                    self._species[name] = bits
+                return
 
-    def add_pots(self, pots: dict[int, Pot]) -> None:
+    def get_bits(self, state: Optional[str] = None, 
+        species: Optional[str] = None) -> int:
         """
-        Adds pots to the room (to self._pots_position).
+        Gets a bitmap of the pots in a state and with a species of plant.
 
         Parameters:
-            pots (dict[int, Pot]): a dictionary of pots with positions 0 to 3.
+            state (Optional[str], optional): 'alive', 'dead' or 'empty'
+                (see POT_STATES). Defaults to None for every pot.
+            species (Optional[str], optional): name of the species.
+                Defaults to None for any plant, or none.
+
+        Returns:
+            int: the bitmap, with bit n set for the pot at position n.
+        """
+        if state == 'alive':
+            bits = self._alive
+        elif state == 'dead':
+            bits = self._occupied & ~self._alive
+        else:
+            bits = (1 << len(self._pots_position)) - 1
+            if state == 'empty':
+                bits &= ~self._occupied
+        if species != None:
+            bits &= self._species.get(species, 0)
+        return bits
+
+    def get_number_of_plants_alive(self) -> int:
+        """
+        int: Returns the number of living plants in the room.
         """
-        for position in pots:
-            self._pots_position[position] = pots[position]
+        return self._alive.bit_count()
 
-    def get_pots(self) -> dict[int, Pot]:	
+    def get_pots(self) -> list[Pot]:	
         """
-        dict[int, Pot]: Returns a dictionary of pots with positions 0 to 3.
+        list[Pot]: Returns the list of pots, indexed by position.
         """
         return self._pots_position
 
-    def get_pot(self, position: int) -> Pot:
+    def get_pot(self, position: int) -> Optional[Pot]:
         """
         Gets the Pot at the specified position.
 
         Parameters:
-            position (int): a position between 0 and 3.
+            position (int): a position between 0 and the number of pots.
 
         Returns:
-            Pot: the instance of pot.
+            Optional[Pot]: the instance of pot, or None if there is no pot
+                at that position.
         """
-        return self._pots_position.get(position)
+        if 0 <= position < len(self._pots_position):
+            return self._pots_position[position]
+        return None
 
     def add_plant(self, position: int, plant: Plant) -> None:
         """
@@ -678,11 +1236,13 @@ class Room:
         at the specified position if empty.
 
         Parameters:
-            position (int): a position between 0 and 3.
+            position (int): a position of a pot in the room.
             plant (Plant): the instance of Plant.
         """
-        if self.get_pot(position).look_at_plant() == None:
+        if not self.has_plant(position):
             self.get_pot(position).put_plant(plant)
+            self._history.pop(position, None)
+            self.refresh(position)
         
     def get_name(self) -> str:
         """
@@ -695,20 +1255,29 @@ class Room:
         Removes the instance of Plant from the Pot at the specified position.
 
         Parameters:
-            position (int): a position between 0 and 3.
+            position (int): a position of a pot in the room.
 
         Returns:
             Plant | None: the instance of Plant that was removed,
                 otherwise returns None if no plant in the pot.
         """
-        return self.get_pot(position).remove_plant()
+        plant = self.get_pot(position).remove_plant()
+        bit = 1 << position
+        self._occupied &= ~bit
+        self._alive &= ~bit
+        self._clear_species(bit)
+        self._plants_position = None
+        self._history.pop(position, None)
+        for listener in self._pot_listeners:
+            listener(position)
+        return plant
         
     def progress_plant(self, pot: Pot) -> bool:
         """
         Progresses the plant in the pot at the specified position.
 
         Parameters:
-            pot (Pot): a pot from positions 0 to 3.
+            pot (Pot): a pot in the room.
 
         Returns:
             bool: True if there is a plant in the pot, but False if no plant.
@@ -717,13 +1286,34 @@ class Room:
             pot.progress()
         return pot.look_at_plant() != None
         
-    def progress_plants(self) -> None:
+    def progress_plants(self, day: Optional[int] = None) -> None:
         """
-        Progresses all plants in all pots in the room.
-        """
-        for pot in self.get_pots():
-            if self.get_pot(pot) != None:
-                self.progress_plant(self.get_pot(pot))
+        Progresses all living plants in the room, in order of position.
+
+        Pots that are empty or hold dead plants are skipped, and plants that
+        die are no longer progressed.
+
+        Parameters:
+            day (Optional[int], optional): the day, to record each plant's
+                vitals under. Defaults to None, recording nothing.
+        """
+        record = day != None and self._history_length > 0
+        for position in bit_positions(self._alive):
+            pot = self._pots_position[position]
+            attacks = self._events.get('animal attacks', 0)
+            self.progress_plant(pot)
+            if self._events.get('animal attacks', 0) != attacks:
+                self.notify(position)
+            plant = pot.look_at_plant()
+            if record:
+                ring = self._history.get(position)
+                if ring == None:
+                    ring = VitalsRing(self._history_length, self._downsample)
+                    self._history[position] = ring
+                ring.record(day, plant.get_water(), plant.get_health())
+            if plant.is_dead():
+                self._alive &= ~(1 << position)
+                self.count_event('deaths')
         
     def __str__(self) -> str:
         """
@@ -759,7 +1349,7 @@ class OutDoor(Room):
         The plant loses 5 health points if attacked.
 
         Parameters:
-            pot (Pot): a pot from positions 0 to 3.
+            pot (Pot): a pot in the room.
 
         Returns:
             bool: True (and progresses plant) if there is a plant in the pot,
@@ -767,8 +1357,12 @@ class OutDoor(Room):
         """
         if pot.look_at_plant() != None:
             super().progress_plant(pot)
-            if dice_roll():
-                pot.animal_attack()
+            with self._stats.time('animal attacks'):
+                if dice_roll(self._random):
+                    if pot.animal_attack():
+                        self.count_event('animal attacks')
+                    else:
+                        self.count_event('repelled attacks')
         
         return pot.look_at_plant() != None
     
@@ -782,77 +1376,797 @@ class OutDoor(Room):
         return f"OutDoor('{self.get_name()}')"
 
 
-def load_house(filename: str) -> tuple[list[tuple[Room, str]], dict[str, int]]:
-    """ Reads a file and creates a dictionary of all the Rooms.
-    
-    Parameters:
-        filename: The path to the file
+class PendingEffects:
+    """
+    Items waiting to be applied when the game progresses to the next day.
+
+    Effects are indexed by the room and positions they target and by item ID,
+    so repeating a move adds to the count of an existing effect instead of
+    adding another entry, and an effect can be cancelled in constant time.
+    The total number of each item to take from the inventory is kept as
+    effects are added and cancelled.
+    """
+    def __init__(self) -> None:
+        """
+        Initialises an empty set of effects.
+        """
+        # (room ID, first position, end position) -> item ID ->
+        # [item, count, number of targeted pots]
+        self._effects = {}
+        self._totals = {}
+
+    def _key(self, room_id: str, 
+        positions: int | slice) -> tuple[str, int | None, int | None]:
+        """
+        Returns the index for a room and its positions.
+
+        Parameters:
+            room_id (str): ID of a room, or '*' for every room.
+            positions (int | slice): a position or a slice of positions.
+
+        Returns:
+            tuple[str, int | None, int | None]: the room ID, and the start
+                and stop of the positions.
+        """
+        if isinstance(positions, int):
+            return (room_id, positions, positions + 1)
+        return (room_id, positions.start, positions.stop)
+
+    def add(self, room_id: str, positions: int | slice, item: Item, 
+        pot_count: int, times: int = 1) -> None:
+        """
+        Adds an item to be applied to the targeted pots.
+
+        Parameters:
+            room_id (str): ID of a room, or '*' for every room.
+            positions (int | slice): a position or a slice of positions.
+            item (Item): the item to be applied.
+            pot_count (int): the number of pots that are targeted, which is
+                the number of items that are used each time.
+            times (int, optional): the number of times the item is applied,
+                defaults to 1.
+        """
+        items = self._effects.setdefault(self._key(room_id, positions), {})
+        item_id = item.get_id()
+        if item_id in items:
+            items[item_id][1] += times
+        else:
+            items[item_id] = [item, times, pot_count]
+        self._totals[item_id] = \
+            self._totals.get(item_id, 0) + pot_count * times
+
+    def cancel(self, room_id: str, positions: int | slice, 
+        item_id: str) -> bool:
+        """
+        Cancels one application of an item to the targeted pots.
+
+        Parameters:
+            room_id (str): ID of a room, or '*' for every room.
+            positions (int | slice): a position or a slice of positions.
+            item_id (str): ID of the item.
+
+        Returns:
+            bool: True if an effect was cancelled, but False if there
+                was no such effect.
+        """
+        key = self._key(room_id, positions)
+        items = self._effects.get(key)
+        if items == None or item_id not in items:
+            return False
+
+        effect = items[item_id]
+        effect[1] -= 1
+        self._totals[item_id] -= effect[2]
+        if self._totals[item_id] == 0:
+            self._totals.pop(item_id)
+        if effect[1] == 0:
+            items.pop(item_id)
+            if items == {}:
+                self._effects.pop(key)
+        return True
+
+    def get_effect(self, room_id: str, positions: int | slice, 
+        item_id: str) -> Optional[tuple[Item, int, int]]:
+        """
+        Gets one effect, e.g. to restore it with set_effect().
+
+        Parameters:
+            room_id (str): ID of a room, or '*' for every room.
+            positions (int | slice): a position or a slice of positions.
+            item_id (str): ID of the item.
+
+        Returns:
+            Optional[tuple[Item, int, int]]: the item, the number of times
+                it is applied, and the number of targeted pots, or None if
+                there is no such effect.
+        """
+        effect = self._effects.get(self._key(room_id, positions), {})\
+            .get(item_id)
+        return None if effect == None else tuple(effect)
+
+    def set_effect(self, room_id: str, positions: int | slice, item_id: str,
+        effect: Optional[tuple[Item, int, int]]) -> None:
+        """
+        Sets one effect to a value from get_effect(), by cancelling or
+        adding applications of its item.
+
+        Parameters:
+            room_id (str): ID of a room, or '*' for every room.
+            positions (int | slice): a position or a slice of positions.
+            item_id (str): ID of the item.
+            effect (Optional[tuple[Item, int, int]]): the effect, or None
+                for no effect.
+        """
+        current = self.get_effect(room_id, positions, item_id)
+        times = 0 if current == None else current[1]
+        target = 0 if effect == None else effect[1]
+        for _ in range(times - target):
+            self.cancel(room_id, positions, item_id)
+        if target > times:
+            item, _, pot_count = effect
+            self.add(room_id, positions, item, pot_count, target - times)
+
+    def get_effects(self) -> list[tuple[str, slice, Item, int]]:
+        """
+        Gets every effect that is waiting to be applied.
+
+        Returns:
+            list[tuple[str, slice, Item, int]]: a list of tuples with room
+                IDs, slices of positions, items, and the number of times
+                each item is applied to each targeted pot.
+        """
+        effects = []
+        for (room_id, start, stop), items in self._effects.items():
+            for item, count, _ in items.values():
+                effects.append((room_id, slice(start, stop), item, count))
+        return effects
+
+    def get_totals(self) -> dict[str, int]:
+        """
+        dict[str, int]: Returns the number of each item ID that is used
+            by the waiting effects.
+        """
+        return self._totals
+
+    def clear(self) -> None:
+        """
+        Removes every waiting effect.
+        """
+        self._effects.clear()
+        self._totals.clear()
+
+    def get_state(self) -> tuple[dict, dict]:
+        """
+        tuple[dict, dict]: Returns copies of the indexed effects and of
+            the totals of each item.
+        """
+        effects = {}
+        for key, items in self._effects.items():
+            effects[key] = {item_id: list(effect) 
+                for item_id, effect in items.items()}
+        return (effects, dict(self._totals))
+
+    def set_state(self, state: tuple[dict, dict]) -> None:
+        """
+        Sets the waiting effects.
+
+        Parameters:
+            state (tuple[dict, dict]): a state from get_state().
+        """
+        effects, totals = state
+        self._effects.clear()
+        for key, items in effects.items():
+            self._effects[key] = {item_id: list(effect) 
+                for item_id, effect in items.items()}
+        self._totals.clear()
+        self._totals.update(totals)
+
+    def __len__(self) -> int:
+        """
+        int: Returns the number of indexed effects.
+        """
+        return sum(len(items) for items in self._effects.values())
+
+    def __repr__(self) -> str:
+        """
+        str: Returns the representation of PendingEffects.
+        """
+        return f"PendingEffects({self.get_effects()})"
+
+
+class PlacementIndex:
+    """
+    An index from each species to the empty pots that suit it.
+
+    Pots are grouped by their sun range and evaporation rate. For each
+    species, the groups with empty pots whose sun range overlaps the
+    species' are ranked by the size of the overlap, then by the water lost
+    to evaporation each day, so the best k empty pots are found by reading
+    the first groups in order. A group leaves the rankings while it has no
+    empty pots. The index is kept up to date by listening to each room's
+    pots.
+    """
+    def __init__(self, rooms: list[tuple[Room, str]]) -> None:
+        """
+        Indexes the empty pots of the rooms and starts listening to them.
+
+        Parameters:
+            rooms (list[tuple[Room, str]]): the rooms and their IDs, in the
+                order that suggestions within a group are given in.
+        """
+        self._rooms = [room for room, _ in rooms]
+        self._room_ids = [room_id for _, room_id in rooms]
+
+        # (sun lower, sun upper, evaporation) -> sorted (room index, position)
+        # of the empty pots of the group.
+        self._groups = {}
+        # Species name -> sorted (-overlap, evaporation, group key) of its
+        # suitable groups that have empty pots, best first.
+        self._rankings = {name: [] for name in PLANT_NAMES}
+        # Group key -> (species name, rank) of each species it suits.
+        self._ranks = {}
+        # (room index, position) -> group key, for every indexed pot.
+        self._pot_groups = {}
+        self._empty = set()
+        # Species name -> its sun range.
+        self._sun_ranges = {name: (PLANTS_DATA[name]['sun-lower'],
+            PLANTS_DATA[name]['sun-upper']) for name in PLANT_NAMES}
+
+        # Rooms changed by different threads update the index at once.
+        self._lock = Lock()
+
+        # Every pot is grouped first, and then each ranking is sorted once.
+        self._ranked = False
+        for room_index, room in enumerate(self._rooms):
+            for position in range(len(room.get_pots())):
+                self.update(room_index, position)
+            room.add_pot_listener(partial(self.update, room_index))
+        for key, group in self._groups.items():
+            if group != []:
+                for name, rank in self._ranks[key]:
+                    self._rankings[name].append(rank)
+        for ranking in self._rankings.values():
+            ranking.sort()
+        self._ranked = True
+
+    def __getstate__(self) -> dict:
+        """
+        dict: Returns the index's attributes for pickling, without its lock.
+        """
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restores the index's attributes from pickling, with a new lock.
+        """
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def _overlap(self, name: str, sun_range: tuple[int, int]) -> int:
+        """
+        Returns the number of sun levels in both a species' range and a pot's
+        range. The plant loses health each day if this is 0 (see Pot.progress).
+
+        Parameters:
+            name (str): name of the species.
+            sun_range (tuple[int, int]): the pot's sun range.
+        """
+        lower, upper = self._sun_ranges[name]
+        return max(0, min(upper, sun_range[1]) - max(lower, sun_range[0]) + 1)
+
+    def _add_group(self, key: tuple[int, int, float]) -> None:
+        """
+        Adds an empty group, and works out its rank for each species that it
+        suits once, for when it is ranked.
+
+        Parameters:
+            key (tuple[int, int, float]): the group's sun range and
+                evaporation rate.
+        """
+        self._groups[key] = []
+        self._ranks[key] = []
+        for name in self._rankings:
+            overlap = self._overlap(name, key[:2])
+            if overlap > 0:
+                self._ranks[key].append((name, (-overlap, key[2], key)))
+
+    def _rank_group(self, key: tuple[int, int, float], 
+        ranked: bool) -> None:
+        """
+        Adds a group to, or removes it from, the rankings of the species that
+        it suits, in O(log g) comparisons for g ranked groups.
+
+        Parameters:
+            key (tuple[int, int, float]): the group's key.
+            ranked (bool): True to add the group, False to remove it.
+        """
+        for name, rank in self._ranks[key]:
+            ranking = self._rankings[name]
+            if ranked:
+                insort(ranking, rank)
+            else:
+                del ranking[bisect_left(ranking, rank)]
+
+    def update(self, room_index: int, position: int) -> None:
+        """
+        Adds or removes a pot from its group if it was filled or emptied.
+
+        Parameters:
+            room_index (int): the index of the pot's room.
+            position (int): the position of the pot in the room.
+        """
+        with self._lock:
+            entry = (room_index, position)
+            key = self._pot_groups.get(entry)
+            if key == None:
+                pot = self._rooms[room_index].get_pot(position)
+                key = pot.get_sun_range() + (pot.get_evaporation(),)
+                self._pot_groups[entry] = key
+                if key not in self._groups:
+                    self._add_group(key)
+
+            is_empty = self._rooms[room_index].get_pot(position)\
+                .look_at_plant() == None
+            group = self._groups[key]
+            if is_empty and entry not in self._empty:
+                self._empty.add(entry)
+                insort(group, entry)
+                if len(group) == 1 and self._ranked:
+                    self._rank_group(key, True)
+            elif not is_empty and entry in self._empty:
+                self._empty.discard(entry)
+                del group[bisect_left(group, entry)]
+                if group == [] and self._ranked:
+                    self._rank_group(key, False)
+
+    def suggest(self, name: str, 
+        count: int) -> list[tuple[str, int, int, float]]:
+        """
+        Gets the best empty pots for a species.
+
+        Parameters:
+            name (str): name of the species.
+            count (int): the number of pots to suggest at most.
+
+        Returns:
+            list[tuple[str, int, int, float]]: the room ID, position, sun
+                overlap and evaporation rate of each pot, best first.
+        """
+        suggestions = []
+        with self._lock:
+            # Every ranked group has an empty pot, so at most count groups
+            # are read.
+            for overlap, _, key in self._rankings.get(name, []):
+                if len(suggestions) >= count:
+                    break
+                overlap = -overlap
+                for room_index, position in \
+                    self._groups[key][:count - len(suggestions)]:
+                    suggestions.append((self._room_ids[room_index], position,
+                        overlap, key[2]))
+        return suggestions
+
+    def get_empty_pots(self) -> dict[tuple[int, int, float], 
+        list[tuple[str, int]]]:
+        """
+        Gets the empty pots of every group.
+
+        Returns:
+            dict[tuple[int, int, float], list[tuple[str, int]]]: the room ID
+                and position of each empty pot, by sun range and evaporation
+                rate, in order of room and position.
+        """
+        with self._lock:
+            return {key: [(self._room_ids[room_index], position) 
+                for room_index, position in group] 
+                for key, group in self._groups.items() if group != []}
+
+    def __len__(self) -> int:
+        """
+        int: Returns the number of empty pots.
+        """
+        return len(self._empty)
+
+
+def survival_days(name: str, sun_range: tuple[int, int], evaporation: float,
+    outdoor: bool, horizon: int = SURVIVAL_HORIZON) -> int:
+    """
+    Simulates how many days a new plant lives in a pot if it is never
+    watered (see days_until_death()).
+
+    Parameters:
+        name (str): name of the species.
+        sun_range (tuple[int, int]): the pot's sun range.
+        evaporation (float): the pot's evaporation rate.
+        outdoor (bool): True if the pot is outdoors.
+        horizon (int, optional): the most days to simulate, defaults to
+            SURVIVAL_HORIZON.
+
+    Returns:
+        int: the number of days the plant lives, at most horizon.
+    """
+    return days_until_death(Plant(name), sun_range, evaporation, outdoor, 
+        horizon)
+
+
+def days_until_death(plant: Plant, sun_range: tuple[int, int], 
+    evaporation: float, outdoor: bool, 
+    horizon: int = SURVIVAL_HORIZON) -> int:
+    """
+    Simulates how many more days a plant lives in a pot if it is never
+    watered, following the rules of Pot.progress. Outdoors, each day's
+    animal attack is counted by its expected damage. The plant itself
+    is not changed.
+
+    Parameters:
+        plant (Plant): the plant.
+        sun_range (tuple[int, int]): the pot's sun range.
+        evaporation (float): the pot's evaporation rate.
+        outdoor (bool): True if the pot is outdoors.
+        horizon (int, optional): the most days to simulate, defaults to
+            SURVIVAL_HORIZON.
+
+    Returns:
+        int: the number of days until the plant dies, at most horizon,
+            or 0 if it is dead.
+    """
+    if plant.is_dead():
+        return 0
+    copy = Plant(plant.get_name())
+    copy.set_state(plant.get_state())
+    plant = copy
+    lower, upper = plant.get_sun_levels()
+    suits_sun = min(upper, sun_range[1]) >= max(lower, sun_range[0])
+    # dice_roll() is True for 15 of the 101 values it rolls.
+    attack_damage = ANIMAL_ATTACK_DAMAGE * 15 / 101 if outdoor else 0
+
+    for day in range(horizon):
+        if not suits_sun:
+            plant.decrease_health()
+        plant.decrease_water(evaporation)
+        plant.drink_water()
+        plant.decrease_health(attack_damage)
+        if plant.is_dead():
+            return day + 1
+    return horizon
+
+
+class TriageHeap:
+    """
+    A heap of the living plants, ordered by the day each is predicted to
+    die on (see days_until_death()).
+
+    A plant's predicted day of death does not change as days pass unless
+    something happens to it, so the heap is only updated for pots whose
+    room reports a change: planting, removing, moving, applying an item or
+    an animal attack. Those pots are predicted again when the heap is next
+    read, and their old entries are skipped when they reach the top. Other
+    predictions can only be too early, e.g. when a plant outlives its
+    horizon or escapes an expected attack, so each entry is checked as it
+    is read and pushed back if it has moved later.
+    """
+    def __init__(self, rooms: list[tuple[Room, str]], 
+        get_day: Callable[[], int]) -> None:
+        """
+        Predicts the death of every living plant and starts listening to
+        the rooms' pots.
+
+        Parameters:
+            rooms (list[tuple[Room, str]]): the rooms and their IDs.
+            get_day (Callable[[], int]): returns the current day.
+        """
+        self._rooms = [room for room, _ in rooms]
+        self._room_ids = [room_id for _, room_id in rooms]
+        self._get_day = get_day
+
+        # Entries are (day of death, (room index, position), version), and
+        # only the latest version of each pot's entry is valid. Versions only
+        # ever increase, so an old entry can never become valid again.
+        self._heap = []
+        self._versions = {}
+        self._dirty = set()
+
+        # Rooms changed by different threads mark their pots at once.
+        self._lock = Lock()
+
+        for room_index, room in enumerate(self._rooms):
+            for position in room.get_active_positions():
+                self._dirty.add((room_index, position))
+            room.add_pot_listener(partial(self.update, room_index))
+
+    def __getstate__(self) -> dict:
+        """
+        dict: Returns the heap's attributes for pickling, without its lock.
+        """
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restores the heap's attributes from pickling, with a new lock.
+        """
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def update(self, room_index: int, position: int) -> None:
+        """
+        Marks a pot to be predicted again when the heap is next read.
+
+        Parameters:
+            room_index (int): the index of the pot's room.
+            position (int): the position of the pot in the room.
+        """
+        with self._lock:
+            self._dirty.add((room_index, position))
+
+    def _predict(self, pot: tuple[int, int]) -> Optional[int]:
+        """
+        Returns the day that the plant in a pot is predicted to die on,
+        or None if the pot has no living plant.
+
+        Parameters:
+            pot (tuple[int, int]): the room index and position of the pot.
+        """
+        room = self._rooms[pot[0]]
+        plant = room.get_pot(pot[1]).look_at_plant()
+        if plant == None or plant.is_dead():
+            return None
+        return self._get_day() + days_until_death(plant, 
+            room.get_pot(pot[1]).get_sun_range(), 
+            room.get_pot(pot[1]).get_evaporation(), isinstance(room, OutDoor))
+
+    def _refresh(self) -> None:
+        """
+        Predicts the marked pots again, and rebuilds the heap if most of
+        its entries are out of date.
+        """
+        for pot in self._dirty:
+            version = self._versions.get(pot, 0) + 1
+            self._versions[pot] = version
+            death = self._predict(pot)
+            if death != None:
+                heappush(self._heap, (death, pot, version))
+        self._dirty.clear()
+
+        if len(self._heap) > 2 * len(self._versions) + 64:
+            self._heap = [entry for entry in self._heap 
+                if self._versions.get(entry[1]) == entry[2]]
+            heapify(self._heap)
+
+    def urgent(self, count: int) -> list[tuple[str, int, Plant, int]]:
+        """
+        Gets the plants that are predicted to die soonest, in O(k log n)
+        for k plants and n entries, apart from pots predicted again.
+
+        Parameters:
+            count (int): the number of plants to get at most.
+
+        Returns:
+            list[tuple[str, int, Plant, int]]: the room ID, position, plant
+                and predicted days until death of each plant, soonest first.
+        """
+        found = []
+        found_pots = set()
+        with self._lock:
+            self._refresh()
+            while self._heap != [] and len(found) < count:
+                death, pot, version = heappop(self._heap)
+                if self._versions.get(pot) != version or pot in found_pots:
+                    continue
+                actual = self._predict(pot)
+                if actual == None:
+                    # The pot's version is kept, so that its next plant's
+                    # entries are newer than any left in the heap.
+                    continue
+                elif actual != death:
+                    heappush(self._heap, (actual, pot, version))
+                else:
+                    found.append((death, pot, version))
+                    found_pots.add(pot)
+
+            for entry in found:
+                heappush(self._heap, entry)
+        return [(self._room_ids[room_index], position, 
+            self._rooms[room_index].get_pot(position).look_at_plant(),
+            death - self._get_day()) 
+            for death, (room_index, position), _ in found]
+
+
+def parse_pot(token: str) -> tuple[tuple[int, int], float, Optional[str]]:
+    """ Reads the description of a pot from a house file.
+
+    A pot is described as '{sun lower}.{sun upper}_{evaporation}_{plant}',
+    where the plant is 'None' for an empty pot, e.g. '8.10_1.2_Rebutia'.
+    
+    Parameters:
+        token: the description of the pot
+    
+    Return:
+        A tuple containing the pot's sun range, its evaporation rate, and
+        the name of its plant or None
+
+    Raises:
+        ValueError: the description is malformed.
+    """
+    fields = token.split('_')
+    sun_range = fields[0].split('.')
+    if len(fields) != 3 or len(sun_range) != 2 \
+        or not sun_range[0].isdigit() or not sun_range[1].isdigit():
+        raise ValueError(f"pot '{token}' is not of the form "
+            "'{sun lower}.{sun upper}_{evaporation}_{plant}'")
+    try:
+        evaporation_rate = float(fields[1])
+    except ValueError:
+        raise ValueError(f"pot '{token}' has an evaporation rate that is "
+            "not a number") from None
+    plant_name = fields[2]
+    if plant_name == 'None':
+        plant_name = None
+    return (int(sun_range[0]), int(sun_range[1])), evaporation_rate, \
+        plant_name
+
+
+def _parse_counts(entries: str) -> dict[str, int]:
+    """ Reads the names and quantities of a 'Plants' or 'Items' line.
+
+    Parameters:
+        entries: the part of the line after ' - ', e.g. 'F 2,R 2'
+
+    Raises:
+        ValueError: an entry is not a name and a quantity.
+    """
+    counts = {}
+    for entry in entries.split(','):
+        entry = entry.split(' ')
+        if len(entry) != 2 or not entry[1].isdigit():
+            raise ValueError(f"'{' '.join(entry)}' is not of the form "
+                "'{name} {quantity}'")
+        counts[entry[0]] = int(entry[1])
+    return counts
+
+
+def parse_house(lines: Iterable[str], filename: str = '<house>') -> \
+    tuple[list[tuple[Room, str]], dict[str, int], dict[str, int]]:
+    """ Creates the Rooms, plants and items of a house from its lines.
+    
+    Parameters:
+        lines: the lines of a house file
+        filename: the name of the file, for error messages
     
     Return:
         A tuple containing 
             - a list of all Room instances amd their room name,
-            - and a dictionary containing plant names and number of plants
+            - a dictionary containing plant names and number of plants,
+            - and a dictionary containing item IDs and number of items
+
+    Raises:
+        ValueError: the house is malformed, with the file name and line
+            number of the first mistake, e.g. a room has no pots or more
+            pots than its layout, or a plant or item does not exist.
     """
     rooms = []
     plants = {}
     items = {}
     room_count = {}
+    item_ids = [item_type().get_id() 
+        for item_type in [Water, Fertiliser, PossumRepellent]]
 
-    with open(filename, 'r') as file:
-        for line in file:
+    line_number = 0
+    room_line = 0
+    try:
+        for line_number, line in enumerate(lines, 1):
             line = line.strip()
             if line.startswith('Room'):
+                # A room's pots are on the lines before the next room.
+                if _has_empty_room(rooms):
+                    line_number = room_line
+                    raise ValueError(f"room '{rooms[-1][1]}' has no pots")
+                room_line = line_number
                 _, _, room = line.partition(' - ')
+                if len(room.split(' ')) != 2 \
+                    or not room.split(' ')[1].isdigit():
+                    raise ValueError(f"'{line}' is not of the form "
+                        "'Room - {name} {number}'")
                 name, room_number = room.split(' ')
                 room_number = int(room_number)
                 if room_count.get(name) is None:
                     room_count[name] = 0
                 room_count[name] += 1
-                if ROOM_LAYOUTS.get(name).get('room_type') == 'Room':
+                if ROOM_LAYOUTS[name]['room_type'] == 'Room':
                     room = Room(name)
-                elif ROOM_LAYOUTS.get(name).get('room_type') == 'OutDoor':
+                elif ROOM_LAYOUTS[name]['room_type'] == 'OutDoor':
                     room = OutDoor(name)
                 rooms.append((room, name[:3] + str(room_count[name])))
                 row_index = 0
 
             elif line.startswith('Plants'):
                 _, _, plant_names = line.partition(' - ')
-                plant_names = plant_names.split(',')
-                for plant in plant_names:
-                    plant = plant.split(' ')
-                    plants[plant[0]] = int(plant[1])
+                for plant_name, count in _parse_counts(plant_names).items():
+                    # An unknown plant raises a KeyError, as rooms do.
+                    PLANTS_DATA[plant_name]
+                    plants[plant_name] = count
 
             elif line.startswith('Items'):
                 _, _, item_names = line.partition(' - ')
-                item_names = item_names.split(',')
-                for item in item_names:
-                    item = item.split(' ')
-                    items[item[0]] = int(item[1])
+                for item_id, count in _parse_counts(item_names).items():
+                    if item_id not in item_ids:
+                        raise ValueError(f"there is no item with the ID "
+                            f"'{item_id}'")
+                    items[item_id] = count
 
             elif len(line) > 0 and len(rooms) > 0:
                 pots = line.split(',')
-                positions = {}
-                for index, pot in enumerate(pots):
-                    sun_range, evaporation_rate, plant_name = pot.split('_')
+                positions = []
+                for pot in pots:
+                    sun_range, evaporation_rate, plant_name = parse_pot(pot)
                     pot = Pot()
-                    if plant_name != 'None':
+                    if plant_name != None:
                         pot.put_plant(Plant(plant_name))
-                    sun_lower, sun_upper = sun_range.split('.')
-                    pot.set_evaporation(float(evaporation_rate))
-                    pot.set_sun_range((int(sun_lower), int(sun_upper)))
-                    positions[index] = pot
+                    pot.set_evaporation(evaporation_rate)
+                    pot.set_sun_range(sun_range)
+                    positions.append(pot)
                 rooms[-1][0].add_pots(positions)
                 row_index += 1
 
+    # Rooms and plants that do not exist are looked up in vain.
+    except KeyError as error:
+        raise ValueError(f'{filename}:{line_number}: there is no room or '
+            f'plant named {error}') from None
+    except ValueError as error:
+        raise ValueError(f'{filename}:{line_number}: {error}') from None
+
+    if rooms == []:
+        raise ValueError(f'{filename}: the house has no rooms')
+    if _has_empty_room(rooms):
+        raise ValueError(f"{filename}:{room_line}: room '{rooms[-1][1]}' "
+            "has no pots")
     return rooms, plants, items
 
 
+def _has_empty_room(rooms: list[tuple[Room, str]]) -> bool:
+    """ Returns True if the last room read from a house file has no pots.
+
+    Parameters:
+        rooms: the rooms read so far and their room names
+    """
+    return rooms != [] and rooms[-1][0].get_pots() == []
+
+
+def load_house(filename: str) -> \
+    tuple[list[tuple[Room, str]], dict[str, int], dict[str, int]]:
+    """ Reads a file and creates a dictionary of all the Rooms.
+    
+    Parameters:
+        filename: The path to the file
+    
+    Return:
+        A tuple containing 
+            - a list of all Room instances amd their room name,
+            - a dictionary containing plant names and number of plants,
+            - and a dictionary containing item IDs and number of items
+
+    Raises:
+        ValueError: the house is malformed (see parse_house()).
+    """
+    with open(filename, 'r') as file:
+        return parse_house(file, filename)
+
+
 class Model:
     """
     Provides an interface for GardenSim to use to play the game.
     It contains an inventory and a series of rooms.
+
+    Several threads may play one model, e.g. a GardenSim each. Each room has
+    a lock, so moves in different rooms run at once, and ending the day
+    waits for the moves in progress and holds up new ones until it is done
+    (see lock_rooms() and lock_day()).
     """
-    def __init__(self, house_file: str) -> None:
+    def __init__(self, house_file: str, stats: Optional[Stats] = None,
+        seed: Optional[int] = None, house: Optional[tuple] = None) -> None:
         """
         Initialises a model with multiple rooms and an inventory.
 
@@ -861,40 +2175,68 @@ class Model:
 
         Parameters:
             house_file (str): directory of the file with the house/model.
+            stats (Optional[Stats], optional): timing counters to record
+                the phases of each day in. Defaults to disabled counters.
+            seed (Optional[int], optional): seed for a random number
+                generator for each room. Defaults to None, in which case
+                rooms use the global generator.
+            house (Optional[tuple], optional): rooms, plants and items as
+                returned by load_house(), to use instead of reading
+                house_file. Defaults to None.
         """
         self._house_file = house_file
-        self._house = load_house(house_file)
+        self._house = house if house is not None else load_house(house_file)
         self._rooms, self._plants, self._items = self._house
         self._n_day = 0
+        self._seed = seed
 
+        # Rooms are looked up by ID for every move, so the dictionary
+        # and list of rooms are built once.
+        self._rooms_by_id = {}
+        for room in self._rooms:
+            self._rooms_by_id[room[1]] = room[0]
+        self._all_rooms = list(self._rooms_by_id.values())
 
-        # self._plants is a dictionary of plant names and quantities.
-        # Thus, the loops iterates through the dictionary, and appends
-        # to self._initial_plants as many times as each plant's quantity.
+        self._stats = stats if stats is not None else Stats()
+        for room, _ in self._rooms:
+            room.set_stats(self._stats)
 
-        self._initial_plants = []
-        for plant in self._plants:
-            n = 0
-            while n < self._plants[plant]:
-                self._initial_plants.append(Plant(plant))
-                n += 1
+        # Functions that are called with the model at the end of each day.
+        self._day_listeners = []
 
+        # The locks of the rooms, the day and the inventory.
+        self._make_locks()
 
-        # self._items is a dictionary of item IDs and quantities.
-        # Each item ID is compared to the IDs in all_items and it appends
-        # to self._initial_items based on the quantities.
+        # The index of empty pots for each species, and the heap of plants
+        # nearest to death, built when first needed.
+        self._placement_index = None
+        self._triage = None
+
+        # Each room's generator is seeded from its ID, so a room rolls the
+        # same dice wherever and in whatever order it is progressed.
+        if seed is not None:
+            for room, room_id in self._rooms:
+                room.set_random(Random(f'{seed}:{room_id}'))
 
-        all_items = [Water(), Fertiliser(), PossumRepellent()]
-        self._initial_items = []
-        for item in self._items:
-            n = 0
-            while n < self._items[item]:
-                for a_item in all_items:
-                    if item == a_item.get_id():
-                        self._initial_items.append(a_item)
-                n += 1
 
-        # This initialises initial items and initial plants for the inventory.
+        # self._plants is a dictionary of plant names and quantities, and
+        # self._items is a dictionary of item IDs and quantities. Only the
+        # quantities are added to the inventory, and each instance is
+        # created when it is taken out, so large quantities load as quickly
+        # as small ones. Item IDs that match no item are left out.
+
+        self._inventory = Inventory()
+        for plant in self._plants:
+            self._inventory.add_quantity('Plant', plant, self._plants[plant],
+                partial(Plant, plant))
+
+        item_types = {}
+        for item_type in [Water, Fertiliser, PossumRepellent]:
+            item_types[item_type().get_id()] = item_type
+        for item in self._items:
+            if item in item_types:
+                self._inventory.add_quantity('Item', item, self._items[item],
+                    item_types[item])
 
 
         # The initial number of plants in each room is added and
@@ -911,10 +2253,7 @@ class Model:
         Returns:
             dict[str, Room]: a dictionary of all rooms.
         """
-        rooms = {}
-        for room in self._rooms:
-            rooms[room[1]] = room[0]
-        return rooms
+        return self._rooms_by_id
         
     def get_all_rooms(self) -> list[Room]:
         """
@@ -923,26 +2262,293 @@ class Model:
         Returns:
             list[Room]: a list of all of room's instances.
         """
-        all_rooms = []
-        for room in self.get_rooms():
-            all_rooms.append(self.get_rooms().get(room))
-        return all_rooms
+        return self._all_rooms
+
+    def get_target_pots(self, room_id: str, 
+        positions: int | slice) -> list[Pot]:
+        """
+        Gets the pots targeted by a move.
+
+        Parameters:
+            room_id (str): ID of a room, or '*' for every room.
+            positions (int | slice): a position, or a slice of positions,
+                of pots within each of the targeted rooms.
+
+        Returns:
+            list[Pot]: the targeted pots, room by room in order of position.
+        """
+        if isinstance(positions, int):
+            positions = slice(positions, positions + 1)
+
+        if room_id == '*':
+            rooms = self.get_all_rooms()
+        else:
+            rooms = [self.get_rooms().get(room_id)]
+
+        pots = []
+        for room in rooms:
+            pots.extend(room.get_pots()[positions])
+        return pots
+
+    def count_target_pots(self, room_id: str, positions: int | slice, 
+        state: Optional[str] = None) -> int:
+        """
+        Counts the pots targeted by a move without building a list of them.
+
+        Parameters:
+            room_id (str): ID of a room, or '*' for every room.
+            positions (int | slice): a position, or a slice of consecutive
+                positions, of pots within each of the targeted rooms.
+            state (Optional[str], optional): 'alive', 'dead' or 'empty' to
+                count only the pots in that state (see POT_STATES).
+                Defaults to None for every pot.
+
+        Returns:
+            int: the number of targeted pots.
+        """
+        if isinstance(positions, int):
+            positions = slice(positions, positions + 1)
+
+        if room_id == '*':
+            rooms = self.get_all_rooms()
+        else:
+            rooms = [self.get_rooms().get(room_id)]
+
+        if state == None:
+            return sum(len(range(len(room.get_pots()))[positions]) 
+                for room in rooms)
+
+        # The targeted positions are masked out of each room's bitmap.
+        count = 0
+        for room in rooms:
+            targets = range(len(room.get_pots()))[positions]
+            mask = (1 << targets.stop) - (1 << targets.start) \
+                if targets.stop > targets.start else 0
+            count += (room.get_bits(state) & mask).bit_count()
+        return count
+
+    def get_state(self, key: tuple) -> object:
+        """
+        Gets one part of the model's state, for a Journal.
+
+        Keys are:
+            ('day',): the number of days that have passed.
+            ('events', room ID): the counts of events in a room.
+            ('pot', room ID, position): the plant in a pot, its state and
+                its ring of vitals, which is kept rather than copied.
+            ('inventory', 'Item' or 'Plant', ID or name): the instances
+                of an item or plant in the inventory.
+
+        Parameters:
+            key (tuple): the part of the state.
+
+        Returns:
+            object: a value that set_state() accepts for the same key.
+        """
+        if key[0] == 'day':
+            return self._n_day
+        elif key[0] == 'events':
+            return dict(self.get_rooms().get(key[1]).get_events())
+        elif key[0] == 'pot':
+            plant = self.get_rooms().get(key[1]).get_pot(key[2])\
+                .look_at_plant()
+            room = self.get_rooms().get(key[1])
+            return (plant, None if plant == None else plant.get_state(),
+                room.get_ring(key[2]))
+        elif key[0] == 'inventory':
+            return self._inventory.get_stack(key[1], key[2])
+
+    def set_state(self, key: tuple, value: object) -> None:
+        """
+        Sets one part of the model's state, for a Journal.
+
+        Parameters:
+            key (tuple): the part of the state, as for get_state().
+            value (object): a value from get_state() for the same key.
+        """
+        if key[0] == 'day':
+            self._n_day = value
+        elif key[0] == 'events':
+            self.get_rooms().get(key[1]).set_events(value)
+        elif key[0] == 'pot':
+            room = self.get_rooms().get(key[1])
+            plant, state, ring = value
+            room.remove_plant(key[2])
+            if plant != None:
+                plant.set_state(state)
+                room.add_plant(key[2], plant)
+                room.set_ring(key[2], ring)
+        elif key[0] == 'inventory':
+            self._inventory.set_stack(key[1], key[2], value)
+
+    def get_day_keys(self, applied_items: PendingEffects) -> list[tuple]:
+        """
+        Gets the keys of the state that the next day can change, which are
+        the living plants, the plants that items are applied to, the events
+        of each room, the day, and the items in the inventory.
+
+        Parameters:
+            applied_items (PendingEffects): the effects waiting to be applied.
+
+        Returns:
+            list[tuple]: keys for get_state().
+        """
+        keys = [('day',)]
+        for room_id, room in self.get_rooms().items():
+            keys.append(('events', room_id))
+            for position in room.get_active_positions():
+                keys.append(('pot', room_id, position))
+
+        for room_id, positions, _, _ in applied_items.get_effects():
+            room_ids = self.get_rooms() if room_id == '*' else [room_id]
+            for target_id in room_ids:
+                room = self.get_rooms().get(target_id)
+                for position in range(len(room.get_pots()))[positions]:
+                    keys.append(('pot', target_id, position))
+
+        # Items are taken for the effects and added when topping up.
+        item_ids = set(self._inventory.get_entities('Item'))
+        item_ids.update([Fertiliser().get_id(), PossumRepellent().get_id()])
+        for item_id in sorted(item_ids):
+            keys.append(('inventory', 'Item', item_id))
+        return keys
 
     def get_inventory(self) -> Inventory:
         """
-        Inventory: Returns user's inventory based on self._initial items and
-            self._initial_plants
+        Inventory: Returns user's inventory.
         """
-        return Inventory(self._initial_items, self._initial_plants)
+        return self._inventory
 
         
+    def get_stats(self) -> Stats:
+        """
+        Stats: Returns the timing counters of the model.
+        """
+        return self._stats
+
+    def get_seed(self) -> Optional[int]:
+        """
+        Optional[int]: Returns the seed of the rooms' random number
+            generators, or None if they use the global generator.
+        """
+        return self._seed
+
+    def restore_rooms(self, rooms: dict[str, Room]) -> None:
+        """
+        Replaces rooms with copies of them, e.g. copies that were
+        progressed in another process.
+
+        Lists of rooms returned by get_all_rooms() are updated in place.
+
+        Parameters:
+            rooms (dict[str, Room]): the copies of rooms, by room ID.
+        """
+        with self.lock_day():
+            self._rooms[:] = [(rooms.get(room_id, room), room_id) 
+                for room, room_id in self._rooms]
+            for room, room_id in self._rooms:
+                self._rooms_by_id[room_id] = room
+                room.set_stats(self._stats)
+            self._all_rooms[:] = list(self._rooms_by_id.values())
+
+            # The index and heap listen to the old rooms, so they are built
+            # again.
+            self._placement_index = None
+            self._triage = None
+
+    def set_history(self, length: int, downsample: bool = False) -> None:
+        """
+        Sets how many days of vitals each room keeps for each pot.
+
+        Parameters:
+            length (int): the number of samples kept, or 0 to keep none.
+            downsample (bool, optional): True to keep fewer samples of older
+                days instead of forgetting them. Defaults to False.
+        """
+        for room in self.get_all_rooms():
+            room.set_history(length, downsample)
+
+    def get_placement_index(self) -> PlacementIndex:
+        """
+        PlacementIndex: Returns the index of the empty pots that suit each
+            species, which is built the first time it is needed.
+        """
+        with self.lock_rooms('*'):
+            if self._placement_index == None:
+                self._placement_index = PlacementIndex(self._rooms)
+            return self._placement_index
+
+    def get_triage(self) -> TriageHeap:
+        """
+        TriageHeap: Returns the heap of the plants nearest to death, which
+            is built the first time it is needed.
+        """
+        with self.lock_rooms('*'):
+            if self._triage == None:
+                self._triage = TriageHeap(self._rooms, self.get_days_past)
+            return self._triage
+
+    def plan_planting(self) -> list[tuple[str, str, int]]:
+        """
+        Plans where to plant every plant in the inventory, planting as many
+        as there are empty pots for and, among those plans, the one in which
+        the plants live longest in total if they are not looked after.
+
+        Empty pots are grouped by sun range, evaporation rate and whether
+        they are outdoors, and plants by species. The number of each species
+        to plant in each group is then solved as a transportation problem,
+        costed by survival_days(), so the time taken depends on the number of
+        species and groups rather than the number of plants and pots.
+
+        Returns:
+            list[tuple[str, str, int]]: the plant name, room ID and position
+                of each planting.
+        """
+        outdoor_rooms = {room_id for room_id, room in self.get_rooms().items()
+            if isinstance(room, OutDoor)}
+        groups = {}
+        for (lower, upper, evaporation), pots in \
+            self.get_placement_index().get_empty_pots().items():
+            for room_id, position in pots:
+                key = (lower, upper, evaporation, room_id in outdoor_rooms)
+                groups.setdefault(key, []).append((room_id, position))
+        group_keys = sorted(groups)
+
+        plants = self._inventory.get_entities('Plant')
+        names = [name for name in plants if len(plants[name]) > 0]
+        costs = [[SURVIVAL_HORIZON - survival_days(name, key[:2], key[2], 
+            key[3]) for key in group_keys] for name in names]
+        moved = min_cost_transport([len(plants[name]) for name in names],
+            [len(groups[key]) for key in group_keys], costs)
+
+        placements = []
+        for i, name in enumerate(names):
+            for j, key in enumerate(group_keys):
+                for room_id, position in groups[key][:moved[i][j]]:
+                    placements.append((name, room_id, position))
+                del groups[key][:moved[i][j]]
+        return placements
+
+    def get_house_file(self) -> str:
+        """
+        str: Returns the directory of the house file of the model.
+        """
+        return self._house_file
+
+    def get_total_plants(self) -> int:
+        """
+        int: Returns the number of plants that the house started with.
+        """
+        return self._total_plants
+
     def get_days_past(self) -> int:
         """
         int: Returns the number of days that have passed.
         """
         return self._n_day + 1
 
-    def next(self, applied_items: list[tuple[str, int, Item]]) -> None:
+    def next(self, applied_items: PendingEffects | 
+        list[tuple[str, int | slice, Item]]) -> None:
         """
         Progresses state of the game to the next day and
         applies specified items.
@@ -952,34 +2558,211 @@ class Model:
         Adds an instance of fertiliser and repellent every 3 days.
         Progresses all plants in all rooms.
 
+        Each phase is timed in the model's Stats while they are enabled.
+
         Parameters:
-            applied_items (list[tuple[str, int, Item]]): a list of tuples
-                with room names, positions, and ID of items to be applied.
+            applied_items (PendingEffects | list[tuple[str, int | slice, 
+                Item]]): the effects waiting to be applied, or a list of
+                tuples with room names (or '*' for every room), positions
+                (or slices of positions), and items to be applied.
         """
-        self._n_day += 1
+        applied_items = self.make_effects(applied_items)
+        with self.lock_day():
+            with self._stats.time('next'):
+                self._next(applied_items)
+
+            for listener in self._day_listeners:
+                listener(self)
 
+    def make_effects(self, applied_items: PendingEffects | 
+        list[tuple[str, int | slice, Item]]) -> PendingEffects:
+        """
+        Gets the effects of the items to be applied, as next() takes them.
 
-        # The loop iterates through each tuple and applies the item if there
-        # is a plant at the specified room and position.
+        Parameters:
+            applied_items (PendingEffects | list[tuple[str, int | slice, 
+                Item]]): the effects, or a list of tuples with room names
+                (or '*' for every room), positions (or slices of positions),
+                and items to be applied.
 
-        for effect in applied_items:
-            room_id, position, item = effect
-            plant = self.get_rooms().get(room_id).get_pot(position)\
-                .look_at_plant()
-            if plant != None and not plant.is_dead():
-                item.apply(plant)
+        Returns:
+            PendingEffects: the effects, which are applied_items if it
+                already is a PendingEffects.
+        """
+        if isinstance(applied_items, PendingEffects):
+            return applied_items
+        effects = PendingEffects()
+        for room_id, positions, item in applied_items:
+            effects.add(room_id, positions, item, 
+                self.count_target_pots(room_id, positions))
+        return effects
+
+    def add_day_listener(self, listener: Callable[['Model'], None]) -> None:
+        """
+        Adds a function to be called with the model at the end of each day.
+
+        Parameters:
+            listener (Callable[[Model], None]): the function.
+        """
+        self._day_listeners.append(listener)
+
+    def remove_day_listener(self, 
+        listener: Callable[['Model'], None]) -> None:
+        """
+        Removes a function added with add_day_listener().
+
+        Parameters:
+            listener (Callable[[Model], None]): the function.
+        """
+        if listener in self._day_listeners:
+            self._day_listeners.remove(listener)
+
+    def __getstate__(self) -> dict:
+        """
+        dict: Returns the model's attributes for pickling, without the
+            day listeners, which belong to whoever added them, or the locks.
+            The placement index and triage heap are built again when next
+            needed, since the pickled rooms do not keep their listeners.
+        """
+        state = self.__dict__.copy()
+        state['_day_listeners'] = []
+        state['_placement_index'] = None
+        state['_triage'] = None
+        for name in ('_room_locks', '_tick', '_inventory_lock'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restores the model's attributes from pickling, with new locks.
+        """
+        self.__dict__.update(state)
+        self._make_locks()
+
+    def _make_locks(self) -> None:
+        """
+        Creates a lock for each room, the day and the inventory.
+        """
+        self._room_locks = {room_id: RLock() for room_id in self._rooms_by_id}
+        self._tick = TickLock()
+        self._inventory_lock = RLock()
+
+    @contextmanager
+    def lock_rooms(self, *room_ids: str):
+        """
+        Holds rooms for the body of a with statement, so that no other
+        thread changes them and the day does not end until it is finished.
+
+        The rooms are locked in order of room ID, so threads locking the
+        same rooms in a different order, e.g. moving plants both ways
+        between two rooms, cannot deadlock. A thread that holds rooms may
+        lock them again, and may then lock the inventory, but must not lock
+        other rooms or end the day.
+
+        Parameters:
+            *room_ids (str): IDs of the rooms, or '*' for every room. With
+                no IDs, only the day is held, e.g. to read the whole house.
+        """
+        if '*' in room_ids:
+            room_ids = self._room_locks
+        locks = [self._room_locks[room_id] for room_id in sorted(set(room_ids))]
+        with self._tick.shared():
+            for lock in locks:
+                lock.acquire()
+            try:
+                yield
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+
+    def lock_day(self) -> ContextManager:
+        """
+        Holds the whole model for the body of a with statement, e.g. to end
+        the day, once the moves in progress in other threads have finished.
+
+        Returns:
+            ContextManager: the hold on the model.
+        """
+        return self._tick.exclusive()
+
+    def lock_inventory(self) -> ContextManager:
+        """
+        Holds the inventory for the body of a with statement. It is locked
+        after rooms (see lock_rooms()) or the day, never before.
+
+        Returns:
+            ContextManager: the hold on the inventory.
+        """
+        return self._inventory_lock
+
+    def _next(self, applied_items: PendingEffects) -> None:
+        """
+        Progresses the state of the game to the next day (see next()).
+
+        Parameters:
+            applied_items (PendingEffects): the effects waiting to be applied.
+        """
+        self.start_day()
+        self.apply_effects(applied_items)
+        self.progress_rooms()
+
+    def start_day(self) -> None:
+        """
+        Increases the day by 1 and tops up the inventory.
+        The rooms' counts of events are cleared for the new day.
+        """
+        self._n_day += 1
+        for room in self.get_all_rooms():
+            room.clear_events()
 
 
         # A fertiliser and repellent are added every 3 days until
         # 15 days have passed.
         
-        if self._n_day in range(0, 15, 3):
-            self.get_inventory().add_entity(Fertiliser())
-            self.get_inventory().add_entity(PossumRepellent())
+        with self._stats.time('top up inventory'):
+            if self._n_day in range(0, 15, 3):
+                self.get_inventory().add_entity(Fertiliser())
+                self.get_inventory().add_entity(PossumRepellent())
 
+    def apply_effects(self, applied_items: PendingEffects) -> None:
+        """
+        Applies the waiting effects to the plants of the model's rooms.
 
-        for room in self.get_all_rooms():
-            room.progress_plants()
+        Parameters:
+            applied_items (PendingEffects): the effects waiting to be applied.
+        """
+
+        # The loop iterates through each effect and applies the item, as
+        # many times as it was added, to every plant at the specified rooms
+        # and positions.
+
+        with self._stats.time('apply items'):
+            for effect in applied_items.get_effects():
+                room_id, positions, item, count = effect
+                if room_id == '*':
+                    rooms = self.get_all_rooms()
+                else:
+                    rooms = [self.get_rooms().get(room_id)]
+
+                # Rooms are told which of their plants were changed.
+                for room in rooms:
+                    pots = room.get_pots()
+                    for position in range(len(pots))[positions]:
+                        plant = pots[position].look_at_plant()
+                        if plant != None and not plant.is_dead():
+                            item.apply_many(plant, count)
+                            room.notify(position)
+
+    def progress_rooms(self) -> None:
+        """
+        Progresses all plants in all rooms.
+        """
+
+        # Animal attacks are timed on their own inside of this phase.
+
+        with self._stats.time('progress rooms'):
+            for room in self.get_all_rooms():
+                room.progress_plants(self.get_days_past())
 
 
     def move_plant(self, from_room_name: str, from_position: int, 
@@ -990,23 +2773,26 @@ class Model:
 
         Parameters:
             from_room_name (str): Room ID to move plant from.
-            from_position (int): Position between 0 to 3.
+            from_position (int): Position of a pot in the room.
             to_room_name (str): Room ID to move plant to.
-            to_position (int): Position between 0 to 3.
+            to_position (int): Position of a pot in the room.
         """
-        initial_position = self.get_rooms().get(from_room_name)\
-            .get_pot(from_position)
-
-        final_position = self.get_rooms().get(to_room_name)\
-            .get_pot(to_position)
+        from_room = self.get_rooms().get(from_room_name)
+        to_room = self.get_rooms().get(to_room_name)
 
         # Check if there is plant at initial and final position
-        # before moving plant.
+        # before moving plant. The rooms keep track of which of their
+        # pots hold plants, and both are locked so that neither changes
+        # in between.
 
-        if initial_position.look_at_plant() != None \
-            and final_position.look_at_plant() == None:
-            plant = initial_position.remove_plant()
-            final_position.put_plant(plant)
+        with self.lock_rooms(from_room_name, to_room_name):
+            if from_room.has_plant(from_position) \
+                and not to_room.has_plant(to_position):
+                # The plant's vitals move with it.
+                ring = from_room.get_ring(from_position)
+                plant = from_room.remove_plant(from_position)
+                to_room.add_plant(to_position, plant)
+                to_room.set_ring(to_position, ring)
 
 
     def plant_plant(self, plant_name: str, room_name: str, 
@@ -1018,9 +2804,11 @@ class Model:
         Parameters:
             plant_name (str): name of plant
             room_name (str): ID of specified Room
-            position (int): Position between 0 and 3.
+            position (int): Position of a pot in the room.
         """
-        self.get_rooms().get(room_name).add_plant(position, Plant(plant_name))
+        with self.lock_rooms(room_name):
+            self.get_rooms().get(room_name)\
+                .add_plant(position, Plant(plant_name))
 
 
     def swap_plant(self, from_room_name: str, from_position: int, 
@@ -1030,28 +2818,31 @@ class Model:
 
         Parameters:
             from_room_name (str): Room ID to swap from.
-            from_position (int): Position between 0 and 3.
+            from_position (int): Position of a pot in the room.
             to_room_name (str): Room ID to swap to.
-            to_position (int): Position between 0 and 3.
+            to_position (int): Position of a pot in the room.
         """
 
         if [from_room_name, from_position] == [to_room_name, to_position]:
             return
         
-        position_one = self.get_rooms().get(from_room_name)\
-            .get_pot(from_position)
-        
-        position_two = self.get_rooms().get(to_room_name).get_pot(to_position)
+        from_room = self.get_rooms().get(from_room_name)
+        to_room = self.get_rooms().get(to_room_name)
 
         # Swaps plants if there is are plants at
         # both specified positions and rooms.
 
-        if position_one.look_at_plant() != None \
-            and position_two.look_at_plant() != None:
-            plant_one = position_one.remove_plant()
-            plant_two = position_two.remove_plant()
-            position_one.put_plant(plant_two)
-            position_two.put_plant(plant_one)
+        with self.lock_rooms(from_room_name, to_room_name):
+            if from_room.has_plant(from_position) \
+                and to_room.has_plant(to_position):
+                ring_one = from_room.get_ring(from_position)
+                ring_two = to_room.get_ring(to_position)
+                plant_one = from_room.remove_plant(from_position)
+                plant_two = to_room.remove_plant(to_position)
+                from_room.add_plant(from_position, plant_two)
+                to_room.add_plant(to_position, plant_one)
+                from_room.set_ring(from_position, ring_two)
+                to_room.set_ring(to_position, ring_one)
 
 
     def get_number_of_plants_alive(self) -> int:
@@ -1061,44 +2852,94 @@ class Model:
         Returns:
             int: number of alive plants.
         """
-        # This double 'for' loop iterates through each room and position and
-        # checks if a plant exists at each position and if that plant is alive.
+        # Each room keeps track of the positions of its living plants.
 
         alive_plants = 0
         for room in self.get_all_rooms():
-            for plant in room.get_plants():
-                if room.get_plants().get(plant) != None \
-                    and not room.get_plants().get(plant).is_dead():
-                        alive_plants += 1
+            alive_plants += room.get_number_of_plants_alive()
         return alive_plants
 
-    def has_won(self) -> bool:
+    def iter_pots(self, room_id: Optional[str] = None,
+        species: Optional[str] = None, state: Optional[str] = None,
+        start: int = 0) -> Iterator[tuple[str, int, Optional[Plant]]]:
+        """
+        Lists the pots of the house lazily, in order of room and position,
+        so that only the pots that are read are looked at.
+
+        The pots that pass the filters are found from each room's bitmaps
+        (see Room.get_bits()). Rooms before the start are skipped by
+        counting their bits, and the start within its room is found by a
+        binary search (see iter_bits()), so the pots before it are never
+        looked at.
+
+        Parameters:
+            room_id (Optional[str], optional): only list the pots of this
+                room. Defaults to None for every room.
+            species (Optional[str], optional): only list the pots with a
+                plant of this species. Defaults to None for any plant.
+            state (Optional[str], optional): only list the pots in this
+                state (see Room.get_bits()). Defaults to None.
+            start (int, optional): the number of pots that pass the filters
+                to skip. Defaults to 0.
+
+        Returns:
+            Iterator[tuple[str, int, Optional[Plant]]]: the room ID, position
+                and plant of each pot.
+        """
+        if room_id == None:
+            rooms = self.get_rooms().items()
+        else:
+            rooms = [(room_id, self.get_rooms().get(room_id))]
+
+        for room_id, room in rooms:
+            bits = room.get_bits(state, species)
+            count = bits.bit_count()
+            if start >= count:
+                start -= count
+                continue
+            for position in iter_bits(bits, start):
+                yield room_id, position, room.get_pot(position).look_at_plant()
+            start = 0
+
+    def has_won(self, alive: Optional[int] = None) -> bool:
         """
         Returns True if player has won, but False if not.
 
         A player has won if the number of alive plants is more than 50% of the
         initial total number of plants after 15 days.
 
+        Parameters:
+            alive (Optional[int], optional): the number of alive plants, if
+                already known. Defaults to counting them.
+
         Returns:
             bool: True if won, but False if player has not won.
         """
         if self.get_days_past() >= 15:
-            return self.get_number_of_plants_alive() > (self._total_plants/2)
+            if alive == None:
+                alive = self.get_number_of_plants_alive()
+            return alive > (self._total_plants/2)
         else:
             return False
 
-    def has_lost(self) -> bool:
+    def has_lost(self, alive: Optional[int] = None) -> bool:
         """
         Returns True if player has lost, but True if not.
 
         A player has lost if the number of alive plants is less than or equal
         to 50% of the inital total number of plants at any point.
 
+        Parameters:
+            alive (Optional[int], optional): the number of alive plants, if
+                already known. Defaults to counting them.
+
         Returns:
             bool: True if lost, but False if player has not lost.
         """
         if self.get_days_past() > 1:
-            return self.get_number_of_plants_alive() <= (self._total_plants/2)
+            if alive == None:
+                alive = self.get_number_of_plants_alive()
+            return alive <= (self._total_plants/2)
     
     # Since __str__ is not implemented, __repr__ automatically
     # acts as a replacement for __str__.
@@ -1119,22 +2960,130 @@ class GardenSim:
     Utilises Model coordinate gameplay.
     Utilises View to draw the game and display the game's information.
     """
-    def __init__(self, game_file: str, view: View) -> None:
+    def __init__(self, game_file: str, view: View, seed: Optional[int] = None,
+        model: Optional[Model] = None) -> None:
         """
         Initialises the model and visual aspects of the game.
 
-        It also initialises a list for applied_items to be applied when
+        It also initialises the effects of applied_items to be applied when
         'n' is input.
 
         Parameters:
             game_file (str): file directory of the house (.txt)
             view (View): instance of View() from a2_support.py
                 to display the house and other game information.
-        """
-        self._house = Model(game_file)
+            seed (Optional[int], optional): seed for the rooms' dice rolls,
+                defaults to None for the global generator.
+            model (Optional[Model], optional): a model to play instead of
+                loading game_file, e.g. one restored from a checkpoint.
+        """
+        if model == None:
+            model = Model(game_file, seed=seed)
+        self._house = model
         self._view = view
         self._rooms = self._house.get_all_rooms()
-        self._applied_items = []
+        self._applied_items = PendingEffects()
+
+        # The state changed by each move is journaled so moves can be undone.
+        self._journal = Journal(self.get_state, self.set_state)
+
+        # Functions that are called with the game and each accepted move.
+        self._move_listeners = []
+
+    def get_model(self) -> Model:
+        """
+        Model: Returns the model of the game being played.
+        """
+        return self._house
+
+    def get_journal(self) -> Journal:
+        """
+        Journal: Returns the journal of the moves that can be undone.
+        """
+        return self._journal
+
+    def get_applied_items(self) -> PendingEffects:
+        """
+        PendingEffects: Returns the items waiting to be applied by 'n'.
+        """
+        return self._applied_items
+
+    def add_move_listener(self, 
+        listener: Callable[['GardenSim', str], None]) -> None:
+        """
+        Adds a function that is called with the game and the move after
+        each move that changed the game, including 'undo' and 'redo'.
+
+        Parameters:
+            listener (Callable[[GardenSim, str], None]): the function.
+        """
+        self._move_listeners.append(listener)
+
+    def remove_move_listener(self, 
+        listener: Callable[['GardenSim', str], None]) -> None:
+        """
+        Removes a function added with add_move_listener().
+
+        Parameters:
+            listener (Callable[[GardenSim, str], None]): the function.
+        """
+        if listener in self._move_listeners:
+            self._move_listeners.remove(listener)
+
+    def get_state(self, key: tuple) -> object:
+        """
+        Gets one part of the game's state, for the journal. The key 
+        ('pending',) is every item waiting to be applied, and ('pending',
+        room ID, start, stop, item ID) is one item waiting to be applied to
+        a slice of positions (see effect_key()). Other keys are passed to
+        Model.get_state().
+
+        Parameters:
+            key (tuple): the part of the state.
+
+        Returns:
+            object: a value that set_state() accepts for the same key.
+        """
+        if key == ('pending',):
+            return self._applied_items.get_state()
+        elif key[0] == 'pending':
+            _, room_id, start, stop, item_id = key
+            return self._applied_items.get_effect(room_id, 
+                slice(start, stop), item_id)
+        return self._house.get_state(key)
+
+    def set_state(self, key: tuple, value: object) -> None:
+        """
+        Sets one part of the game's state, for the journal.
+
+        Parameters:
+            key (tuple): the part of the state, as for get_state().
+            value (object): a value from get_state() for the same key.
+        """
+        if key == ('pending',):
+            self._applied_items.set_state(value)
+        elif key[0] == 'pending':
+            # Undoing an item cancels it rather than restoring every item.
+            _, room_id, start, stop, item_id = key
+            self._applied_items.set_effect(room_id, slice(start, stop),
+                item_id, value)
+        else:
+            self._house.set_state(key, value)
+
+    def effect_key(self, room_id: str, positions: slice, 
+        item_id: str) -> tuple:
+        """
+        Gets the journal's key of one item waiting to be applied.
+
+        Parameters:
+            room_id (str): ID of a room, or '*' for every room.
+            positions (slice): a slice of positions.
+            item_id (str): ID of the item.
+
+        Returns:
+            tuple: the key, for get_state() and set_state().
+        """
+        return ('pending', room_id, positions.start, positions.stop, item_id)
     
     def input_user(self) -> str:
         """
@@ -1144,11 +3093,33 @@ class GardenSim:
             ls: lists all information about plants and inventory.
 
             n: progresses to the next, and applies items.
+
+            stats: displays timing counters for the day's phases and moves.
+
+            stats {on | off}: starts or stops recording timing counters.
+
+            undo: undoes the last move that changed the game, including 'n'.
+
+            redo: redoes the last move that was undone.
+
+            journal: displays the memory used by each move that can be undone.
+
+            suggest {plant name}: lists the empty pots that best suit a plant,
+                by how well their sun levels match and how slowly they dry.
+
+            p *: plants every plant in the inventory that there is an empty
+                pot for, choosing the pots in which they live longest.
+
+            urgent [{count}]: lists the plants that will die soonest if they
+                are not looked after, 5 unless a count is given.
             
             ls {room ID} {position}: lists information about plant at the
                 specified position.
             
             w {room ID} {position}: water a plant at a specified position.
+                '*' may be given for the room ID to water every room, and
+                for the position to water every pot, or a range of positions
+                may be given, e.g. 'w Bal1 0-3'.
             
             rm {room ID} {position}: removes the plant at the specified
                 position.
@@ -1158,7 +3129,8 @@ class GardenSim:
             
             a {room ID} {position} {item ID}: applies the specified item to
                 the plant at the specified position, and removes the item
-                from the inventory.
+                from the inventory. Rooms and positions may be given as for
+                'w', using one item from the inventory per pot.
             
             m {from room ID} {from position} {to room ID} {to position}:
                 moves a plant from one position in a room to the specified
@@ -1178,7 +3150,7 @@ class GardenSim:
         Splits the player's input into a list.
 
         This is done to categorize the input to a certain method: one_input(),
-        three_input(), four_input(), and five_input().
+        two_input(), three_input(), four_input(), and five_input().
 
         Parameters:
             user_input (str): player's input from input_user()
@@ -1198,9 +3170,101 @@ class GardenSim:
         print(INVALID_MOVE + user_input)
 
 
+    def parse_targets(self, room_key: str, 
+        position: str) -> Optional[tuple[str, slice]]:
+        """
+        Validates the room and position targeted by a 'w' or 'a' move.
+
+        The room may be a room ID or '*' for every room. The position may be
+        a position, a range of positions such as '0-3', or '*' for every pot.
+        A position or range must exist in every targeted room.
+
+        Parameters:
+            room_key (str): the room ID input by the player.
+            position (str): the position input by the player.
+
+        Returns:
+            Optional[tuple[str, slice]]: the room ID and a slice of positions,
+                or None if the targets are invalid.
+        """
+        rooms = self._house.get_rooms()
+        if room_key == '*':
+            targeted_rooms = list(rooms.values())
+        elif rooms.get(room_key) != None:
+            targeted_rooms = [rooms.get(room_key)]
+        else:
+            return None
+
+        # Converts the position into a slice of positions.
+        first, _, last = position.partition('-')
+        if position == '*':
+            return room_key, slice(None)
+        elif position.isdigit():
+            first = last = int(position)
+        elif first.isdigit() and last.isdigit() and int(first) <= int(last):
+            first, last = int(first), int(last)
+        else:
+            return None
+
+        for room in targeted_rooms:
+            if room.get_pot(last) == None:
+                return None
+        return room_key, slice(first, last + 1)
+
+    def list_pots(self, user_input: str) -> None:
+        """
+        Executes 'ls' with filters or a page, each given as key=value, e.g.
+        'ls room=Bal1 state=dead page=2'. Only one page of pots is looked at
+        and displayed, however large the house is.
+
+        Parameters:
+            user_input (str): player's input from input_user()
+        """
+        move_input = self.input_for_move(user_input)
+        filters = {}
+        page = 1
+        for token in move_input[1:]:
+            key, _, value = token.partition('=')
+            if key == 'room' and value in self._house.get_rooms():
+                filters['room_id'] = value
+            elif key == 'species' and value in PLANT_NAMES:
+                filters['species'] = value
+            elif key == 'state' and value in POT_STATES:
+                filters['state'] = value
+            elif key == 'page' and value.isdigit() and int(value) > 0:
+                page = int(value)
+            else:
+                self.invalid_message(user_input)
+                return
+        self.display_page(filters, page, [token for token in move_input
+            if not token.startswith('page=')])
+
+    def display_page(self, filters: dict[str, str], page: int,
+        command: list[str]) -> None:
+        """
+        Displays one page of the pots that pass the filters.
+
+        Parameters:
+            filters (dict[str, str]): the arguments to Model.iter_pots().
+            page (int): the page, starting from 1.
+            command (list[str]): the move without its page, to suggest for
+                the next page if there is one.
+        """
+        room_id = filters.get('room_id')
+        with self._house.lock_rooms(room_id if room_id != None else '*'):
+            # One pot past the page tells whether there is another page.
+            pots = list(islice(self._house.iter_pots(**filters, 
+                start=(page - 1) * PAGE_SIZE), PAGE_SIZE + 1))
+
+        more = None
+        if len(pots) > PAGE_SIZE:
+            more = ' '.join(command + [f'page={page + 1}'])
+        self._view.display_pots(pots[:PAGE_SIZE], more)
+
     def one_input(self, user_input: str) -> None:
         """
-        Executes actions of a move with one input, specifically 'ls' or 'n'.
+        Executes actions of a move with one input, specifically 'ls', 'n',
+        'stats', 'undo', 'redo', 'journal' or 'urgent'.
 
         Parameters:
             user_input (str): player's input from input_user()
@@ -1208,22 +3272,113 @@ class GardenSim:
         move = self.input_for_move(user_input)[0]
 
         # Displays the state of each position and plant in each room.
-        # Then it displays the inventory for plants and items.
+        # Then it displays the number of each plant and item in the inventory.
+        # Only the first page of pots is listed; see list_pots().
         if move == "ls":
-            self._view.display_rooms(self._house.get_rooms())
-            for entity in ["Plant", "Item"]:
-                self._view.display_inventory(
-                    self._house.get_inventory().get_entities(entity), entity)
+            self.display_page({}, 1, ['ls'])
+            with self._house.lock_inventory():
+                for entity in ["Plant", "Item"]:
+                    self._view.display_inventory(self._house.get_inventory()\
+                        .get_entities(entity), entity)
 
         # Progresses the state of all plants and applies items to the specified
-        # plants. The applied items must also be cleared from the inventory.
+        # plants. The applied items must also be cleared from the inventory,
+        # one for each pot that they were applied to.
         elif move == "n":
-            self._house.next(self._applied_items)
-            for effect in self._applied_items:
-                _, _, item = effect
-                self._house.get_inventory().remove_entity(item.get_id())
-            self._applied_items.clear()
+            with self._house.lock_day():
+                for key in self._house.get_day_keys(self._applied_items):
+                    self._journal.record(key)
+                self._journal.record(('pending',))
+                self._house.next(self._applied_items)
+                inventory = self._house.get_inventory()
+                for item_id, count in self._applied_items.get_totals().items():
+                    inventory.remove_entities(item_id, count)
+                self._applied_items.clear()
+
+        # Displays the timing counters of the day's phases and of each move.
+        elif move == "stats":
+            stats = self._house.get_stats()
+            self._view.display_stats(stats.summary(), stats.is_enabled())
+
+        # Undoes or redoes the last move that changed the game.
+        # A step may span any rooms, so the whole model is held.
+        elif move == "undo" or move == "redo":
+            with self._house.lock_day():
+                if move == "undo":
+                    label, done = self._journal.undo(), "undone"
+                else:
+                    label, done = self._journal.redo(), "redone"
+            if label == None:
+                print(f"There is nothing to {move}.")
+            else:
+                print(f"'{label}' has been {done}.")
+
+        # Displays the memory used to undo each move.
+        elif move == "journal":
+            self._view.display_journal(self._journal.get_sizes())
+
+        # Lists the plants nearest to death.
+        elif move == "urgent":
+            with self._house.lock_rooms('*'):
+                urgent = self._house.get_triage().urgent(URGENT)
+            self._view.display_urgent(urgent)
+
+        else:
+            self.invalid_message(user_input)
+
 
+    def two_input(self, user_input: str) -> None:
+        """
+        Executes actions for moves with two inputs.
+
+        Inputs include:
+            stats on
+            stats off
+            suggest {plant name}
+            p *
+            urgent {count}
+
+        Parameters:
+            user_input (str): player's input from input_user()
+        """
+        move, setting = self.input_for_move(user_input)
+
+        # Starts or stops recording of the timing counters.
+        if move == "stats" and setting == "on":
+            self._house.get_stats().enable()
+        elif move == "stats" and setting == "off":
+            self._house.get_stats().disable()
+
+        # Lists the best empty pots for a plant.
+        elif move == "suggest" and setting in PLANT_NAMES:
+            index = self._house.get_placement_index()
+            self._view.display_suggestions(setting, 
+                index.suggest(setting, SUGGESTIONS))
+
+        # Lists the given number of plants nearest to death.
+        elif move == "urgent" and setting.isdigit():
+            with self._house.lock_rooms('*'):
+                urgent = self._house.get_triage().urgent(int(setting))
+            self._view.display_urgent(urgent)
+
+        # Plants the inventory's plants in one batch, as planned by the model.
+        elif move == "p" and setting == "*":
+            with self._house.lock_rooms('*'), self._house.lock_inventory():
+                placements = self._house.plan_planting()
+                by_name = {}
+                for plant_name, room_id, position in placements:
+                    self._journal.record(('pot', room_id, position))
+                    self._journal.record(('inventory', 'Plant', plant_name))
+                    by_name.setdefault(plant_name, [])\
+                        .append((room_id, position))
+
+                rooms = self._house.get_rooms()
+                inventory = self._house.get_inventory()
+                for plant_name, pots in by_name.items():
+                    plants = inventory.remove_entities(plant_name, len(pots))
+                    for plant, (room_id, position) in zip(plants, pots):
+                        rooms.get(room_id).add_plant(position, plant)
+            print(f"{len(placements)} plants have been planted.")
         else:
             self.invalid_message(user_input)
 
@@ -1242,6 +3397,21 @@ class GardenSim:
         """
         move, room_key, position = self.input_for_move(user_input)
 
+        # Adds one instance of water for all of the targeted positions to
+        # applied_items for the 'n' input.
+        if move == "w":
+            targets = self.parse_targets(room_key, position)
+            if targets == None:
+                self.invalid_message(user_input)
+            else:
+                room_id, positions = targets
+                water = Water()
+                self._journal.record(
+                    self.effect_key(room_id, positions, water.get_id()))
+                self._applied_items.add(room_id, positions, water, 
+                    self._house.count_target_pots(room_id, positions))
+            return
+
         # Checks if the inputted positions are digits.
         if position.isdigit():
             position = int(position)
@@ -1258,19 +3428,24 @@ class GardenSim:
 
         # Displays information of specified pot.
         if move == "ls":
-            plant = self._house.get_rooms().get(room_key)\
-                .get_pot(position).look_at_plant()
-            self._view.display_room_position_information(
-                self._house.get_rooms().get(room_key), position, plant)
-            
-        # Adds an instance of water with the specified position to
-        # applied_items for the 'n' input.
-        elif move == "w":
-            self._applied_items.append((room_key, position, Water()))
+            with self._house.lock_rooms(room_key):
+                plant = self._house.get_rooms().get(room_key)\
+                    .get_pot(position).look_at_plant()
+                self._view.display_room_position_information(
+                    self._house.get_rooms().get(room_key), position, plant,
+                    self._house.get_rooms().get(room_key)\
+                        .get_history(position, 
+                            self._house.get_days_past() + 1))
             
         # Removes the plant at the specified position.
         elif move == "rm": # removes plant
-            plant = self._house.get_rooms().get(room_key).remove_plant(position)
+            plant = None
+            with self._house.lock_rooms(room_key):
+                # An empty pot is left as it is, so nothing is recorded.
+                room = self._house.get_rooms().get(room_key)
+                if room.has_plant(position):
+                    self._journal.record(('pot', room_key, position))
+                    plant = room.remove_plant(position)
             if plant != None:
                 print(f"{plant.get_name()} has been removed.")
             
@@ -1284,6 +3459,7 @@ class GardenSim:
 
         Inputs include:
             p {plant name} {room ID} {position}
+            p {plant name} {room ID} *
             a {room ID} {position} {item ID}
 
         Parameters:
@@ -1295,15 +3471,13 @@ class GardenSim:
         rooms = self._house.get_rooms()
 
         # Checks if the input meets the conditions for the 'a' move.
-        # input_one must be a Room's ID.
-        # input_two must be a valid position.
+        # input_one must be a Room's ID or '*'.
+        # input_two must be a valid position, range of positions or '*'.
         # input_three must be a valid item ID.
-        if rooms.get(input_one) != None \
-            and input_two.isdigit() \
-                and rooms.get(input_one).get_pot(int(input_two)) != None:
-            position = int(input_two)
+        targets = self.parse_targets(input_one, input_two)
+        if targets != None:
+            room_id, positions = targets
             item_id = input_three
-            room_id = input_one
 
         # Checks if the input meets the conditions for the 'p' move.
         # input_one must be a valid plant name.
@@ -1317,6 +3491,14 @@ class GardenSim:
                 plant_name = input_one
                 room_id = input_two
 
+        # '*' plants in the room's first empty pot, which is found once
+        # the room is locked.
+        elif rooms.get(input_two) != None and input_three == '*' \
+            and input_one in PLANT_NAMES:
+                position = None
+                plant_name = input_one
+                room_id = input_two
+
         # Prints an invalid message if one of the inputs are invalid.
         else:
             self.invalid_message(user_input)
@@ -1325,19 +3507,31 @@ class GardenSim:
         inv = self._house.get_inventory()
 
         # Appends the specified item to applied_items for the 'n'
-        # input if it is in the inventory.
+        # input if the inventory has one for each targeted living plant,
+        # besides the items already waiting to be applied.
         if move == 'a':
-            if item_id in inv.get_entities('Item'):
+            count = self._house.count_target_pots(room_id, positions, 'alive')
+            available = len(inv.get_entities('Item').get(item_id, [])) \
+                - self._applied_items.get_totals().get(item_id, 0)
+            if available >= count > 0:
                 item = inv.get_entities('Item').get(item_id)[0]
-                self._applied_items.append((room_id, position, item))
+                self._journal.record(
+                    self.effect_key(room_id, positions, item_id))
+                self._applied_items.add(room_id, positions, item, count)
             
         # Plants the specified plant if it is in the inventory.
+        # The room and inventory are locked so that neither the pot nor
+        # the plant is taken by another thread in between.
         elif move == 'p':
-            if plant_name in inv.get_entities('Plant') \
-                and rooms.get(room_id).get_plants().get(position) == None:
-                inv.remove_entity(plant_name)
-                self._house.plant_plant(plant_name, room_id, position)
-            pass
+            with self._house.lock_rooms(room_id), self._house.lock_inventory():
+                if position == None:
+                    position = rooms.get(room_id).find_empty_pot()
+                if position != None and plant_name in inv.get_entities('Plant')\
+                    and not rooms.get(room_id).has_plant(position):
+                    self._journal.record(('pot', room_id, position))
+                    self._journal.record(('inventory', 'Plant', plant_name))
+                    inv.remove_entity(plant_name)
+                    self._house.plant_plant(plant_name, room_id, position)
         else:
             self.invalid_message(user_input)
 
@@ -1374,19 +3568,79 @@ class GardenSim:
                     self.invalid_message(user_input)
                     return
 
-        # Move a plants from one room to another.
-        if move == "m":
-            self._house\
-                .move_plant(from_room, from_position, to_room, to_position)
+        if move != "m" and move != "s":
+            self.invalid_message(user_input)
+            return
 
-        # Swaps two plants between their specified positions and rooms.
-        elif move == "s":
-            self._house\
-                .swap_plant(from_room, from_position, to_room, to_position)
-            
-        else:
+        with self._house.lock_rooms(from_room, to_room):
+            # Only moves that change the pots are recorded to be undone, as
+            # move_plant() and swap_plant() make no change otherwise.
+            from_plant = rooms.get(from_room).has_plant(from_position)
+            to_plant = rooms.get(to_room).has_plant(to_position)
+            if move == "m":
+                applies = from_plant and not to_plant
+            else:
+                applies = from_plant and to_plant \
+                    and (from_room, from_position) != (to_room, to_position)
+            if applies:
+                self._journal.record(('pot', from_room, from_position))
+                self._journal.record(('pot', to_room, to_position))
+
+            # Move a plants from one room to another.
+            if move == "m":
+                self._house\
+                    .move_plant(from_room, from_position, to_room, to_position)
+
+            # Swaps two plants between their specified positions and rooms.
+            else:
+                self._house\
+                    .swap_plant(from_room, from_position, to_room, to_position)
+
+
+    def execute(self, user_input: str) -> None:
+        """
+        Executes a single move.
+
+        Based on the number of inputs, the corresponding method is called
+        and the specified move is executed.
+
+        Parameters:
+            user_input (str): player's input from input_user()
+        """
+        move_input = self.input_for_move(user_input)
+
+        # Moves that change the game record what they change in a new step.
+        changes = self._journal.get_changes()
+        self._journal.begin()
+
+        # 'ls' with filters or a page, e.g. 'ls state=dead page=2'.
+        if len(move_input) > 1 and move_input[0] == 'ls' \
+            and all('=' in token for token in move_input[1:]):
+            self.list_pots(user_input)
+
+        elif len(move_input) == 1:
+            self.one_input(user_input)
+
+        elif len(move_input) == 2:
+            self.two_input(user_input)
+
+        elif len(move_input) == 3:
+            self.three_input(user_input)
+
+        elif len(move_input) == 4:
+            self.four_input(user_input)
+
+        elif len(move_input) == 5:
+            self.five_input(user_input)
+        
+        elif len(move_input) > 5:
             self.invalid_message(user_input)
 
+        self._journal.commit(' '.join(move_input))
+        if self._journal.get_changes() != changes:
+            for listener in self._move_listeners:
+                listener(self, ' '.join(move_input))
+
 
     def play(self):
         """Executes the entire game until a win or loss occurs."""
@@ -1405,23 +3659,15 @@ class GardenSim:
             # Converts player's input to a list.
             move_input = self.input_for_move(user_input)
 
-            # Based on the number of inputs, the corresponding
-            # method is called and the specified move is executed.
-
-            if len(move_input) == 1:
-                self.one_input(user_input)
+            # The move is executed, and the time it takes is recorded
+            # under the move's name.
 
-            if len(move_input) == 3:
-                self.three_input(user_input)
+            if len(move_input) == 0:
+                continue
 
-            if len(move_input) == 4:
-                self.four_input(user_input)
-
-            if len(move_input) == 5:
-                self.five_input(user_input)
-            
-            if len(move_input) == 2 or len(move_input) > 5:
-                self.invalid_message(user_input)
+            move = move_input[0] if move_input[0] in MOVES else 'invalid'
+            with self._house.get_stats().time(f'move {move}'):
+                self.execute(user_input)
         
         if self._house.has_won():
             print(WIN_MESSAGE)
@@ -1430,10 +3676,14 @@ class GardenSim:
 
 def main():
     """ Entry-point to gameplay """
-    view = View()
+    # A terminal only needs the parts of the house that changed redrawn.
+    view = TerminalView() if sys.stdout.isatty() else View()
     house_file = input('Enter house file: ')
     garden_gnome = GardenSim(house_file, view)
-    garden_gnome.play()
+    try:
+        garden_gnome.play()
+    finally:
+        view.close()
 
 
 if __name__ == '__main__':
@@ -1,15 +1,604 @@
-from random import randint
-from typing import Optional
+import shutil
+import sys
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from math import log2
+from random import Random, randint
+from threading import Condition, get_ident, local
+from time import perf_counter_ns
+from typing import Callable, Hashable, Iterator, Optional
 
 from constants import *
 
-def dice_roll() -> bool:
-    """ (bool): Return True 15% of the time. False otherwise. """
-    return randint(0, 100) > 85
+def dice_roll(rng: Optional[Random] = None) -> bool:
+    """ (bool): Return True 15% of the time. False otherwise.
+    
+    Parameters:
+        rng: random number generator to roll with, defaults to the global one
+    """
+    if rng is None:
+        return randint(0, 100) > 85
+    return rng.randint(0, 100) > 85
 
 def invalid_message(move: str) -> str:
     return f'move not found: {move}'
 
+# Latency histograms use log-scaled buckets, BUCKETS_PER_OCTAVE per doubling,
+# so percentiles are accurate to within about 9% in constant memory.
+BUCKETS_PER_OCTAVE = 8
+
+class _NullTimer:
+    """ Context manager handed out while timing is disabled. """
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    """ Context manager that records the time spent inside its block. """
+    def __init__(self, stats: 'Stats', name: str):
+        self._stats = stats
+        self._name = name
+        self._start = 0
+
+    def __enter__(self) -> None:
+        self._start = perf_counter_ns()
+
+    def __exit__(self, *exc_info) -> None:
+        self._stats.record_ns(self._name, perf_counter_ns() - self._start)
+
+class Stats:
+    """ Timing counters for the phases of a day and the player's moves.
+
+    Each named counter keeps a count, a total, the extremes and a log-scaled
+    histogram of its samples, from which p50/p95/p99 are estimated. While
+    disabled, time() returns a shared no-op context manager so instrumented
+    code pays only for one attribute check.
+    """
+    def __init__(self, enabled: bool = False):
+        self._enabled = enabled
+        self._counters = {}
+
+    def is_enabled(self) -> bool:
+        """ (bool): Return True if samples are being recorded. """
+        return self._enabled
+
+    def enable(self) -> None:
+        """ Start recording samples. """
+        self._enabled = True
+
+    def disable(self) -> None:
+        """ Stop recording samples. Recorded samples are kept. """
+        self._enabled = False
+
+    def reset(self) -> None:
+        """ Discard all recorded samples. """
+        self._counters.clear()
+
+    def time(self, name: str) -> _Timer | _NullTimer:
+        """ Return a context manager timing its block under the given name.
+        
+        Parameters:
+            name: name of the counter to record the sample in
+        """
+        if not self._enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def record_ns(self, name: str, elapsed: int) -> None:
+        """ Record one sample.
+        
+        Parameters:
+            name: name of the counter to record the sample in
+            elapsed: duration of the sample in nanoseconds
+        """
+        counter = self._counters.get(name)
+        if counter is None:
+            # [count, total, minimum, maximum, histogram]
+            counter = [0, 0, elapsed, elapsed, {}]
+            self._counters[name] = counter
+        counter[0] += 1
+        counter[1] += elapsed
+        counter[2] = min(counter[2], elapsed)
+        counter[3] = max(counter[3], elapsed)
+        bucket = int(log2(elapsed + 1) * BUCKETS_PER_OCTAVE)
+        histogram = counter[4]
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    def get_names(self) -> list[str]:
+        """ (list[str]): Return the names of all counters with samples. """
+        return list(self._counters)
+
+    def get_count(self, name: str) -> int:
+        """ (int): Return the number of samples recorded under name. """
+        counter = self._counters.get(name)
+        return 0 if counter is None else counter[0]
+
+    def get_percentile(self, name: str, percentile: float) -> float:
+        """ Estimate a percentile of the samples recorded under name.
+        
+        Parameters:
+            name: name of the counter
+            percentile: the percentile to estimate, between 0 and 100
+
+        Return:
+            The estimated duration in seconds, or 0.0 if there are no samples
+        """
+        counter = self._counters.get(name)
+        if counter is None:
+            return 0.0
+        count, _, minimum, maximum, histogram = counter
+        rank = percentile / 100 * count
+        seen = 0
+        for bucket in sorted(histogram):
+            seen += histogram[bucket]
+            if seen >= rank:
+                # Report the bucket's upper bound, clamped to what was seen.
+                upper = 2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE) - 1
+                return max(minimum, min(maximum, upper)) / 1e9
+        return maximum / 1e9
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """ Summarise every counter.
+        
+        Return:
+            A dictionary from counter name to its 'count', 'total', 'mean',
+            'p50', 'p95', 'p99' and 'max', with durations in seconds
+        """
+        result = {}
+        for name, (count, total, _, maximum, _) in self._counters.items():
+            result[name] = {
+                'count': count,
+                'total': total / 1e9,
+                'mean': total / count / 1e9,
+                'p50': self.get_percentile(name, 50),
+                'p95': self.get_percentile(name, 95),
+                'p99': self.get_percentile(name, 99),
+                'max': maximum / 1e9,
+            }
+        return result
+
+def min_cost_transport(supplies: list[int], capacities: list[int],
+    costs: list[list[float]]) -> list[list[int]]:
+    """ Solve a transportation problem by min-cost flow: move as many units
+        as possible from the sources to the sinks, at the least total cost.
+
+    Successive shortest paths are found with a queue-based Bellman-Ford, so
+    the time depends on the number of sources and sinks, not on the units.
+    
+    Parameters:
+        supplies: the units at each source
+        capacities: the units each sink can take
+        costs: the cost of each unit moved from source i to sink j, or None
+            if it cannot be moved there
+
+    Return:
+        The units moved from each source to each sink
+    """
+    n_sources, n_sinks = len(supplies), len(capacities)
+    source, sink = n_sources + n_sinks, n_sources + n_sinks + 1
+    # Edges are stored in pairs, so edge ^ 1 is the reverse of an edge.
+    heads, capacity, cost = [], [], []
+    edges = [[] for _ in range(n_sources + n_sinks + 2)]
+
+    def add_edge(start: int, end: int, units: int, unit_cost: float) -> int:
+        for node, head, units, unit_cost in \
+            ((start, end, units, unit_cost), (end, start, 0, -unit_cost)):
+            edges[node].append(len(heads))
+            heads.append(head)
+            capacity.append(units)
+            cost.append(unit_cost)
+        return len(heads) - 2
+
+    for i, units in enumerate(supplies):
+        add_edge(source, i, units, 0)
+    for j, units in enumerate(capacities):
+        add_edge(n_sources + j, sink, units, 0)
+    routes = {}
+    for i in range(n_sources):
+        for j in range(n_sinks):
+            if costs[i][j] is not None:
+                routes[i, j] = add_edge(i, n_sources + j,
+                    min(supplies[i], capacities[j]), costs[i][j])
+
+    while True:
+        # Find the cheapest path with room left from the source to the sink.
+        distance = [float('inf')] * len(edges)
+        via = [None] * len(edges)
+        queued = [False] * len(edges)
+        distance[source] = 0
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            queued[node] = False
+            for edge in edges[node]:
+                head = heads[edge]
+                if capacity[edge] > 0 \
+                    and distance[node] + cost[edge] < distance[head] - 1e-9:
+                    distance[head] = distance[node] + cost[edge]
+                    via[head] = edge
+                    if not queued[head]:
+                        queued[head] = True
+                        queue.append(head)
+        if via[sink] is None:
+            break
+
+        # Move as many units along the path as it has room for.
+        units = float('inf')
+        node = sink
+        while node != source:
+            units = min(units, capacity[via[node]])
+            node = heads[via[node] ^ 1]
+        node = sink
+        while node != source:
+            capacity[via[node]] -= units
+            capacity[via[node] ^ 1] += units
+            node = heads[via[node] ^ 1]
+
+    moved = [[0] * n_sinks for _ in range(n_sources)]
+    for (i, j), edge in routes.items():
+        moved[i][j] = capacity[edge ^ 1]
+    return moved
+
+def bit_positions(bits: int) -> list[int]:
+    """ (list[int]): Return the positions of the set bits, lowest first.
+
+    Parameters:
+        bits: a bitmap with bit n set for position n
+    """
+    # Searching the binary digits, lowest first, is done in C, so this
+    # costs one step per set bit instead of one per position.
+    digits = bin(bits)[:1:-1]
+    positions = []
+    position = digits.find('1')
+    while position != -1:
+        positions.append(position)
+        position = digits.find('1', position + 1)
+    return positions
+
+def iter_bits(bits: int, skip: int = 0) -> Iterator[int]:
+    """ Yield the positions of the set bits, lowest first, after skipping
+        the lowest ones. The first position is found by a binary search on
+        bit counts, so skipped bits cost nothing each.
+
+    Parameters:
+        bits: a bitmap with bit n set for position n
+        skip: the number of set bits to skip
+    """
+    if skip >= bits.bit_count():
+        return
+    if skip > 0:
+        # The lowest end whose bits below it include more than skip set bits.
+        low, high = 0, bits.bit_length()
+        while low < high:
+            middle = (low + high) // 2
+            if (bits & ((1 << middle) - 1)).bit_count() > skip:
+                high = middle
+            else:
+                low = middle + 1
+        bits &= ~((1 << max(low - 1, 0)) - 1)
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+# Number of samples of vitals kept for each pot.
+HISTORY_LENGTH = 32
+
+class VitalsRing:
+    """ Fixed-size ring buffer of a plant's water and health, by day.
+
+    Samples are kept in typed arrays, so a ring takes the same memory however
+    many days are recorded. When full, the oldest sample is overwritten, or,
+    if downsampling, every other sample is dropped and from then on only
+    every other day is kept, so the ring covers the whole run more coarsely.
+    """
+    def __init__(self, length: int = HISTORY_LENGTH, downsample: bool = False):
+        """ 
+        Parameters:
+            length: the number of samples kept
+            downsample: True to halve the resolution instead of overwriting
+        """
+        self._days = array('i', [0]) * length
+        self._water = array('f', [0.0]) * length
+        self._health = array('i', [0]) * length
+        self._start = 0
+        self._size = 0
+        self._downsample = downsample
+        # Only every stride-th sample offered is kept.
+        self._stride = 1
+        self._offered = 0
+
+    def record(self, day: int, water: float, health: int) -> None:
+        """ Record a day's vitals. Samples of this day or later, left from
+            days that were undone, are dropped first.
+        
+        Parameters:
+            day: the day
+            water: the plant's water level
+            health: the plant's health
+        """
+        length = len(self._days)
+        while self._size > 0 and \
+            self._days[(self._start + self._size - 1) % length] >= day:
+            self._size -= 1
+            # The day that replaces the dropped ones is kept.
+            self._offered = 0
+        self._offered += 1
+        if (self._offered - 1) % self._stride != 0:
+            return
+        if self._size == length and self._downsample:
+            self._halve()
+        if self._size == length:
+            slot = self._start
+            self._start = (self._start + 1) % length
+        else:
+            slot = (self._start + self._size) % length
+            self._size += 1
+        self._days[slot] = day
+        self._water[slot] = water
+        self._health[slot] = health
+
+    def _halve(self) -> None:
+        """ Keep every other sample, oldest first, and double the stride. """
+        samples = self.get_samples()[::2]
+        self._start = 0
+        self._size = len(samples)
+        for slot, (day, water, health) in enumerate(samples):
+            self._days[slot] = day
+            self._water[slot] = water
+            self._health[slot] = health
+        self._stride *= 2
+
+    def get_samples(self) -> list[tuple[int, float, int]]:
+        """ (list[tuple[int, float, int]]): Return the day, water level and
+            health of each sample, oldest first.
+        """
+        length = len(self._days)
+        slots = [(self._start + i) % length for i in range(self._size)]
+        return [(self._days[slot], self._water[slot], self._health[slot])
+            for slot in slots]
+
+    def __len__(self) -> int:
+        """ (int): Return the number of samples kept. """
+        return self._size
+
+# Number of moves that can be undone, and redone, at most.
+JOURNAL_LIMIT = 100
+
+def _size_of(value: object) -> int:
+    """ Return the approximate size in bytes of a value and its containers.
+        Objects inside the containers are counted without their attributes,
+        which are shared with the game.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += _size_of(key) + _size_of(item)
+    elif isinstance(value, (tuple, list, set, frozenset)):
+        for item in value:
+            size += _size_of(item)
+    return size
+
+class Journal:
+    """ Bounded undo and redo history of the state that each move changed.
+
+    Before a move changes part of the game, that part's key is recorded, and
+    read() saves its value. Undoing a step saves the current value of each of
+    its keys and writes back the saved ones, so undo and redo cost as much as
+    the state the move changed, not the whole game. A new move clears the
+    steps that could be redone.
+    """
+    def __init__(self, read: Callable[[Hashable], object],
+        write: Callable[[Hashable, object], None], limit: int = JOURNAL_LIMIT):
+        """ 
+        Parameters:
+            read: returns the current value of a key
+            write: sets the value of a key
+            limit: the number of steps kept, the oldest are forgotten first
+        """
+        self._read = read
+        self._write = write
+        self._undo = deque(maxlen=limit)
+        self._redo = deque(maxlen=limit)
+        self._step = None
+        self._changes = 0
+
+    def begin(self) -> None:
+        """ Start recording a step. """
+        self._step = {}
+
+    def record(self, key: Hashable) -> None:
+        """ Save the value of a key before the current step changes it.
+            Keys already saved in the step, or recorded outside of a step,
+            are ignored.
+        
+        Parameters:
+            key: the key of the state that is about to change
+        """
+        if self._step is not None and key not in self._step:
+            self._step[key] = self._read(key)
+
+    def commit(self, label: str) -> bool:
+        """ Finish the current step, keeping it if it recorded anything.
+        
+        Parameters:
+            label: the move that the step undoes
+
+        Return:
+            True if the step was kept
+        """
+        step, self._step = self._step, None
+        if not step:
+            return False
+        self._undo.append((label, step))
+        self._redo.clear()
+        self._changes += 1
+        return True
+
+    def _swap(self, step: dict) -> dict:
+        """ Write back the values of a step, returning the values replaced. """
+        current = {key: self._read(key) for key in step}
+        for key, value in step.items():
+            self._write(key, value)
+        return current
+
+    def undo(self) -> Optional[str]:
+        """ Undo the latest step.
+        
+        Return:
+            The label of the step, or None if there is nothing to undo
+        """
+        if not self._undo:
+            return None
+        label, step = self._undo.pop()
+        self._redo.append((label, self._swap(step)))
+        self._changes += 1
+        return label
+
+    def redo(self) -> Optional[str]:
+        """ Redo the latest undone step.
+        
+        Return:
+            The label of the step, or None if there is nothing to redo
+        """
+        if not self._redo:
+            return None
+        label, step = self._redo.pop()
+        self._undo.append((label, self._swap(step)))
+        self._changes += 1
+        return label
+
+    def get_changes(self) -> int:
+        """ (int): Return the number of steps kept, undone or redone so far. """
+        return self._changes
+
+    def get_history(self) -> tuple[list, list]:
+        """ (tuple[list, list]): Return the steps that can be undone and
+            the steps that can be redone, e.g. to save them with the game.
+        """
+        return list(self._undo), list(self._redo)
+
+    def set_history(self, history: tuple[list, list]) -> None:
+        """ Replace the steps with ones from get_history().
+        
+        Parameters:
+            history: the steps that can be undone and redone
+        """
+        self._undo.clear()
+        self._undo.extend(history[0])
+        self._redo.clear()
+        self._redo.extend(history[1])
+
+    def get_sizes(self) -> list[tuple[str, int, int]]:
+        """ (list[tuple[str, int, int]]): Return the label, number of keys
+            and approximate size in bytes of each step that can be undone,
+            oldest first.
+        """
+        return [(label, len(step), _size_of(step))
+            for label, step in self._undo]
+
+    def __len__(self) -> int:
+        """ (int): Return the number of steps that can be undone. """
+        return len(self._undo)
+
+class TickLock:
+    """ A barrier between the moves made in rooms and the day ticking over.
+
+    Any number of threads may hold the lock shared, e.g. while moving plants
+    between rooms, but ending the day holds it exclusively: it waits for the
+    shared holders to finish, and new ones wait until the day has ended.
+    Threads waiting to end the day go before new shared holders, so a day
+    is not held up by a steady stream of moves.
+
+    A thread may take the lock again while it holds it, and may take it
+    shared while it holds it exclusively, but not the other way around.
+    """
+    def __init__(self):
+        self._condition = Condition()
+        self._shared = 0
+        self._owner = None
+        self._waiting = 0
+        # The depths to which the current thread holds the lock.
+        self._held = local()
+
+    def _depths(self) -> tuple[int, int]:
+        """ Return how many times the current thread holds the lock shared
+            and exclusively.
+        """
+        return (getattr(self._held, 'shared', 0),
+            getattr(self._held, 'exclusive', 0))
+
+    def acquire_shared(self) -> None:
+        """ Wait until the day is not ending, then hold the lock shared. """
+        shared, exclusive = self._depths()
+        if shared == 0 and exclusive == 0:
+            with self._condition:
+                while self._owner is not None or self._waiting > 0:
+                    self._condition.wait()
+                self._shared += 1
+        self._held.shared = shared + 1
+
+    def release_shared(self) -> None:
+        """ Release a shared hold of the lock. """
+        shared, exclusive = self._depths()
+        self._held.shared = shared - 1
+        if shared == 1 and exclusive == 0:
+            with self._condition:
+                self._shared -= 1
+                if self._shared == 0:
+                    self._condition.notify_all()
+
+    def acquire_exclusive(self) -> None:
+        """ Wait until no other thread holds the lock, then hold it
+            exclusively.
+
+        Raise:
+            RuntimeError: the current thread holds the lock shared
+        """
+        shared, exclusive = self._depths()
+        if exclusive == 0:
+            if shared > 0:
+                raise RuntimeError('the day cannot end during a move')
+            with self._condition:
+                self._waiting += 1
+                while self._owner is not None or self._shared > 0:
+                    self._condition.wait()
+                self._waiting -= 1
+                self._owner = get_ident()
+        self._held.exclusive = exclusive + 1
+
+    def release_exclusive(self) -> None:
+        """ Release an exclusive hold of the lock. """
+        exclusive = self._depths()[1]
+        self._held.exclusive = exclusive - 1
+        if exclusive == 1:
+            with self._condition:
+                self._owner = None
+                self._condition.notify_all()
+
+    @contextmanager
+    def shared(self):
+        """ Hold the lock shared for the body of a with statement. """
+        self.acquire_shared()
+        try:
+            yield
+        finally:
+            self.release_shared()
+
+    @contextmanager
+    def exclusive(self):
+        """ Hold the lock exclusively for the body of a with statement. """
+        self.acquire_exclusive()
+        try:
+            yield
+        finally:
+            self.release_exclusive()
+
 class View:
     def __init__(self):
         pass
@@ -26,22 +615,46 @@ class View:
         all_plants = []
 
         for room in rooms:
-            all_rooms.append(ROOM_LAYOUTS[room.get_name()].get('layout'))
+            room_layout = ROOM_LAYOUTS.get(room.get_name())
+            layout = dict(room_layout.get('layout'))
+            positions = self._pot_positions(room_layout, len(room.get_pots()))
+
+            # Pots past the end of the room's layout are drawn with the
+            # same symbol that the layout uses for its own pots.
+            base_positions = room_layout.get('positions')
+            pot_symbol = layout.get(base_positions[0], EMPTY)
+            for position in positions[len(base_positions):]:
+                layout[position] = pot_symbol
+            all_rooms.append(layout)
+
             plants = {}
-            for plant_number in room.get_plants():
-                plant = room.get_plants()[plant_number]
+            for plant_number, plant in enumerate(room.get_plants()):
                 if plant is not None:
                     if plant.get_age() < 3:
                         plant_name = plant.get_name()[0].lower()
                     else:
                         plant_name = plant.get_name()[0].upper()
-                    room_layout = ROOM_LAYOUTS.get(room.get_name())
-                    plant_position = room_layout.get('positions')[plant_number]
-                    plants[plant_position] = plant_name
+                    plants[positions[plant_number]] = plant_name
             all_plants.append(plants)
         
         self._draw_house(all_rooms, all_plants)
 
+    def _pot_positions(self, room_layout: dict, pot_count: int
+        ) -> list[tuple[int, int]]:
+        """ Find where each pot of a room is drawn.
+
+        The first pots use the positions of the room's layout. Any further
+        pots are drawn row by row below the layout, ROOM_COL to a row.
+        
+        Parameters:
+            room_layout: the room's entry in ROOM_LAYOUTS
+            pot_count: the number of pots in the room
+        """
+        positions = list(room_layout.get('positions')[:pot_count])
+        for extra in range(pot_count - len(positions)):
+            positions.append((ROOM_ROW + extra // ROOM_COL, extra % ROOM_COL))
+        return positions
+
     def _draw_house(
         self,
         rooms: list[dict[tuple[int, int], str]],
@@ -53,23 +666,56 @@ class View:
             rooms: a list of rooms
             all_plants: All plants that needs to be displayed
         """
-        for i in range(ROOM_ROW):
-            row_text = ''
-            for room_index, room in enumerate(rooms):
-                row_text += ' '.join(self._draw_room(room, 
-                    all_plants[room_index])[i]) + f' {SEPARATOR} '
+        self._draw_house_lines(self._house_lines(rooms, all_plants))
+
+    def _draw_house_lines(self, lines: list[str]) -> None:
+        """ Print the lines of text that draw the house.
+        
+        Parameters:
+            lines: the lines from _house_lines()
+        """
+        for row_text in lines:
             print(row_text)
 
+    def _house_lines(
+        self,
+        rooms: list[dict[tuple[int, int], str]],
+        all_plants: list[dict[tuple[int, int], str]],
+    ) -> list[str]:
+        """ Create the lines of text that draw the house.
+
+        Rooms with more pots than their layout are taller than ROOM_ROW,
+        and shorter rooms are padded with empty rows to the same height.
+        
+        Parameters:
+            rooms: a list of rooms
+            all_plants: All plants that needs to be displayed
+        """
+        drawn_rooms = [self._draw_room(room, all_plants[room_index])
+            for room_index, room in enumerate(rooms)]
+        height = max([len(room) for room in drawn_rooms], default=0)
+        empty_row = [EMPTY] * ROOM_COL
+
+        lines = []
+        for i in range(height):
+            row_text = ''
+            for room_list in drawn_rooms:
+                row = room_list[i] if i < len(room_list) else empty_row
+                row_text += ' '.join(row) + f' {SEPARATOR} '
+            lines.append(row_text)
+        return lines
+
     def _draw_room(self, room: dict[tuple[int, int], str], 
         plants: dict[tuple[int, int], str]):
-        room_list = []
         """ Draw a room.
         
         Parameters:
             room: the room to be drawn
             plants: All plants that needs to be displayed within the room
         """
-        for row in range(ROOM_ROW):
+        room_list = []
+        rows = max([row + 1 for row, _ in room] + [ROOM_ROW])
+        for row in range(rows):
             row_list = []
             for col in range(ROOM_COL):
                 if plants.get((row, col)) is not None:
@@ -77,31 +723,39 @@ class View:
                 elif room.get((row, col)) is not None:
                     row_list.append(room.get((row, col)))
                 else:
-                    # row_list.append()
                     row_list.append(EMPTY)
                 
             room_list.append(row_list)
         return room_list
 
-    def _display_plants(self, plants: dict[int, 'Plant']):
+    def _plant_line(self, position: int, entry: Optional['Plant']) -> str:
+        """ Create the line of information of the plant at a position.
+
+        Parameters:
+            position: position of the plant's pot
+            entry: the plant, or None if the pot is empty
+        Return:
+            The line to be displayed
+        """
+        if entry is None:
+            return f'{position}: None'
+        health = entry.get_health()
+        age = entry.get_age()
+        name = entry.get_name()
+        if entry.is_dead():
+            return f'{position}: {name} has died and is {age} days old'
+        output = f'{position}: {name} has {health} '
+        output += f'health and is {age} days old'
+        return output
+
+    def _display_plants(self, plants: list[Optional['Plant']]):
         """ Create the message to provide information all plants.
         
         Parameters:
-            plants: All plants that needs to be displayed
+            plants: All plants that needs to be displayed, by position
         """
-        for plant in plants:
-            if plants[plant] is not None:
-                health = plants[plant].get_health()
-                age = plants[plant].get_age()
-                name = plants[plant].get_name()
-                if plants[plant].is_dead():
-                    print(f'{plant}: {name} has died and is {age} days old')
-                else:
-                    output = f'{plant}: {name} has {health} '
-                    output += f'health and is {age} days old'
-                    print(output)
-            else:
-                print(f'{plant}: None')
+        for plant, entry in enumerate(plants):
+            print(self._plant_line(plant, entry))
 
     def display_rooms(self, rooms: dict[str, 'Room']):
         """ Display information of all the rooms.
@@ -114,8 +768,29 @@ class View:
             print(room_name)
             self._display_plants(rooms[room_name].get_plants())
 
+    def display_pots(self, pots: list[tuple[str, int, Optional['Plant']]],
+        more: Optional[str] = None):
+        """ Display a page of pots, with the ID of each room before its pots.
+
+        Parameters:
+            pots: the room ID, position and plant of each pot, in order
+            more: the move that lists the next page, or None if this is the
+                last page
+        """
+        print('Rooms:')
+        room_name = None
+        for room_id, position, plant in pots:
+            if room_id != room_name:
+                print(room_id)
+                room_name = room_id
+            print(self._plant_line(position, plant))
+        if len(pots) == 0:
+            print('No pots to list')
+        if more is not None:
+            print(f"More pots with '{more}'")
+
     def display_inventory(self, entities: dict[str, list], entity_type: str):
-        """ Display information of inventory
+        """ Display the number of each entity in the inventory
         
         Parameters:
             entities: Entities to be displayed.
@@ -125,10 +800,11 @@ class View:
         print(f'Inventory {entity_type}:')
         for entity in entities:
             if len(entities[entity]) > 0:
-                print(entities[entity])
+                print(f'{entity}: {len(entities[entity])}')
 
     def display_room_position_information(self, room: 'Room', position: int, 
-        plant: Optional['Plant']):
+        plant: Optional['Plant'], 
+        history: Optional[list[tuple[int, float, int]]] = None):
         """ Display information of a specific position of a specific room.
             This includes plant information if a plant is at that position.
         
@@ -137,6 +813,8 @@ class View:
             position: the position where the information is needed.
             plant: plant to be displayed, if None then only room information
                 will be displayed.
+            history: the days, water levels and health of the plant's recent
+                vitals, oldest first, if any were recorded.
         """
         room_name = room.get_name()
         pot = room.get_pot(position)
@@ -164,6 +842,213 @@ class View:
                 output += f'{plant_sun_level}'
                 output += f'\n    {plant_age} days old and water levels '
                 output += f'{round(plant_water, 3)} and {plant_repellent}'
+            if history:
+                output += '\n    recent days (day: water/health):'
+                for index, (day, water, health) in enumerate(history):
+                    output += '\n     ' if index % 6 == 0 else ','
+                    output += f' {day}: {round(water, 1)}/{health}'
             print(output)
         else:
-            print(f'No plant lives in {room_name} position {position}')
\ No newline at end of file
+            print(f'No plant lives in {room_name} position {position}')
+
+    def display_stats(self, summary: dict[str, dict[str, float]],
+        enabled: bool):
+        """ Display the timing counters.
+        
+        Parameters:
+            summary: counter summaries from Stats.summary()
+            enabled: whether timing is currently being recorded
+        """
+        state = 'on' if enabled else 'off'
+        print(f'Timing is {state} (use "stats on" or "stats off").')
+        for name, counter in summary.items():
+            output = f'{name}: {counter["count"]} samples, '
+            output += f'p50 {counter["p50"] * 1000:.3f}ms, '
+            output += f'p95 {counter["p95"] * 1000:.3f}ms, '
+            output += f'p99 {counter["p99"] * 1000:.3f}ms, '
+            output += f'max {counter["max"] * 1000:.3f}ms'
+            print(output)
+
+    def display_suggestions(self, plant_name: str,
+        suggestions: list[tuple[str, int, int, float]]):
+        """ Display the empty pots suggested for a plant, best first.
+        
+        Parameters:
+            plant_name: name of the plant
+            suggestions: room IDs, positions, sun overlaps and evaporation
+                rates from PlacementIndex.suggest()
+        """
+        if len(suggestions) == 0:
+            print(f'There are no empty pots with suitable sun for {plant_name}.')
+            return
+        print(f'Best empty pots for {plant_name}:')
+        for room_id, position, overlap, evaporation in suggestions:
+            print(f'{room_id} {position}: {overlap} sun levels in range, '
+                f'evaporation {evaporation}')
+
+    def display_urgent(self, plants: list[tuple[str, int, 'Plant', int]]):
+        """ Display the plants nearest to death, soonest first.
+        
+        Parameters:
+            plants: room IDs, positions, plants and predicted days until
+                death from TriageHeap.urgent()
+        """
+        if len(plants) == 0:
+            print('There are no living plants.')
+            return
+        print('Plants nearest to death:')
+        for room_id, position, plant, days in plants:
+            print(f'{room_id} {position}: {plant.get_name()} may die in '
+                f'{days} days (water {round(plant.get_water(), 1)}, '
+                f'health {plant.get_health()})')
+
+    def display_journal(self, sizes: list[tuple[str, int, int]]):
+        """ Display the size of each move that can be undone.
+        
+        Parameters:
+            sizes: labels, key counts and sizes from Journal.get_sizes()
+        """
+        total = sum(size for _, _, size in sizes)
+        print(f'{len(sizes)} moves can be undone, using about {total} bytes.')
+        for label, keys, size in sizes:
+            print(f'{label}: {keys} changes, {size} bytes')
+
+    def close(self):
+        """ Restore the terminal after the game. """
+        pass
+
+class TerminalView(View):
+    """ View that keeps the house drawn at the top of the terminal and,
+    after the first frame, rewrites only the characters that changed, using
+    ANSI cursor addressing. Everything else that is printed scrolls in a
+    region below the house, so the house is never scrolled away.
+
+    If the house does not fit in the terminal, because it is too tall or a
+    line would wrap, it is printed as by View.
+    """
+    def __init__(self, stream=None):
+        """ 
+        Parameters:
+            stream: the terminal to draw on, defaults to sys.stdout
+        """
+        super().__init__()
+        self._stream = stream if stream is not None else sys.stdout
+        self._frame = None
+        self._bytes = 0
+
+    def get_bytes_written(self) -> int:
+        """ (int): Return the number of bytes written to draw the house. """
+        return self._bytes
+
+    def _write(self, text: str) -> None:
+        """ Write text to the terminal at once, counting its bytes. """
+        self._stream.write(text)
+        self._stream.flush()
+        self._bytes += len(text.encode())
+
+    def _draw_house(
+        self,
+        rooms: list[dict[tuple[int, int], str]],
+        all_plants: list[dict[tuple[int, int], str]],
+    ) -> None:
+        """ Draw the house, rewriting only what changed since the last frame.
+        
+        Parameters:
+            rooms: a list of rooms
+            all_plants: All plants that needs to be displayed
+        """
+        lines = self._house_lines(rooms, all_plants)
+        if self._frame is None or len(lines) != len(self._frame) \
+            or not self._fits(lines):
+            self._draw_frame(lines)
+            return
+
+        # Each run of changed characters is written at its own position.
+        # The cursor is saved and restored so the prompt stays where it is.
+        changes = []
+        for row, (old, new) in enumerate(zip(self._frame, lines)):
+            width = max(len(old), len(new))
+            old, new = old.ljust(width), new.ljust(width)
+            col = 0
+            while col < width:
+                if old[col] == new[col]:
+                    col += 1
+                    continue
+                end = col
+                while end < width and old[end] != new[end]:
+                    end += 1
+                changes.append(f'\x1b[{row + 1};{col + 1}H{new[col:end]}')
+                col = end
+        self._frame = lines
+        if changes:
+            self._write('\x1b7' + ''.join(changes) + '\x1b8')
+
+    def _fits(self, lines: list[str]) -> bool:
+        """ Return True if the house can be kept at the top of the terminal,
+            with room below it to scroll, and without any line wrapping,
+            which would put the characters addressed by _draw_house in the
+            wrong cells.
+
+        Parameters:
+            lines: the lines of text that draw the house
+        """
+        size = shutil.get_terminal_size()
+        width = max([len(line) for line in lines], default=0)
+        return len(lines) + 2 < size.lines and width < size.columns
+
+    def _draw_frame(self, lines: list[str]) -> None:
+        """ Clear the terminal, draw the whole house at the top, and make
+            the rows below it the scrolling region.
+        
+        Parameters:
+            lines: the lines of text that draw the house
+        """
+        rows = shutil.get_terminal_size().lines
+        if not self._fits(lines):
+            self._frame = None
+            self._write('\x1b[r' + ''.join(line + '\n' for line in lines))
+            return
+        self._frame = lines
+        self._write('\x1b[r\x1b[2J\x1b[H' + '\n'.join(lines) 
+            + f'\x1b[{len(lines) + 2};{rows}r\x1b[{len(lines) + 2};1H')
+
+    def close(self):
+        """ Remove the scrolling region and move below everything drawn. """
+        if self._frame is not None:
+            rows = shutil.get_terminal_size().lines
+            self._write(f'\x1b[r\x1b[{rows};1H\n')
+            self._frame = None
+
+class NullView(View):
+    """ View that displays nothing, e.g. for games played by a program
+    rather than a person, where drawing would only add to the time taken.
+    """
+    def draw(self, rooms: list['Room']) -> None:
+        pass
+
+    def display_rooms(self, rooms: dict[str, 'Room']):
+        pass
+
+    def display_pots(self, pots: list[tuple[str, int, Optional['Plant']]],
+        more: Optional[str] = None):
+        pass
+
+    def display_inventory(self, entities: dict[str, list], entity_type: str):
+        pass
+
+    def display_room_position_information(self, *args, **kwargs):
+        pass
+
+    def display_stats(self, summary: dict[str, dict[str, float]],
+        enabled: bool):
+        pass
+
+    def display_suggestions(self, plant_name: str,
+        suggestions: list[tuple[str, int, int, float]]):
+        pass
+
+    def display_urgent(self, plants: list[tuple[str, int, 'Plant', int]]):
+        pass
+
+    def display_journal(self, sizes: list[tuple[str, int, int]]):
+        pass
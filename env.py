@@ -0,0 +1,455 @@
+"""
+Gym-style environments for training agents to play the game.
+
+GardenEnv plays one game through GardenSim, so it follows the game's rules
+exactly. VectorGardenEnv plays a batch of independent games of one house on
+the NumPy records of store.py, stepping every game with a few array
+operations per call, with the same rules but its own dice.
+
+Both take the same integer actions and give the same observations:
+
+    action 0                       n, ending the day
+    action 1 + p                   w, watering pot p
+    action 1 + P + i * P + p       a, applying item ITEMS[i] to pot p
+    action 1 + P + (I + s) * P + p p, planting PLANT_NAMES[s] in pot p
+    action 1 + P + (I + S) * P + p rm, removing the plant from pot p
+
+where pots are numbered in order of room and position, P is the number of
+pots, I the number of items and S the number of species. An observation is
+a dictionary of 'pots', an array of POT_FEATURES for each pot, 'inventory',
+the number of each species then each item that can still be used, and
+'day', the number of days that have passed. get_action_mask() gives which
+actions the game accepts, and actions that it does not are ignored.
+
+The reward of a step is the change in the number of living plants, plus
+WIN_REWARD when the game is won or minus it when the game is lost.
+
+Requires NumPy.
+"""
+import os
+import sys
+from typing import Optional
+
+import numpy
+
+from a2 import (PLANT_NAMES, PLANTS_DATA, Fertiliser, GardenSim, Model,
+    NullView, PossumRepellent, parse_house)
+from store import NO_PLANT, alive_mask, progress_records, records_from_model
+
+
+ITEMS = (Fertiliser().get_id(), PossumRepellent().get_id())
+POT_FEATURES = ('alive', 'water', 'health', 'age', 'sun')
+WIN_REWARD = 10.0
+
+# Days on which a fertiliser and a repellent are added to the inventory,
+# as counted by Model.start_day().
+TOP_UP_DAYS = tuple(range(3, 15, 3))
+
+
+def count_actions(pots: int) -> int:
+    """
+    int: Returns the number of actions for a house with a number of pots.
+    """
+    return 1 + pots * (2 + len(ITEMS) + len(PLANT_NAMES))
+
+
+def decode_action(action: int, pots: int) -> tuple[str, int, int]:
+    """
+    Finds the move of an action.
+
+    Parameters:
+        action (int): the action.
+        pots (int): the number of pots in the house.
+
+    Returns:
+        tuple[str, int, int]: the move ('n', 'w', 'a', 'p' or 'rm'), the
+            index of its item or species (or 0), and its pot (or -1 for 'n').
+    """
+    if action == 0:
+        return 'n', 0, -1
+    kind, pot = divmod(action - 1, pots)
+    if kind == 0:
+        return 'w', 0, pot
+    elif kind <= len(ITEMS):
+        return 'a', kind - 1, pot
+    elif kind <= len(ITEMS) + len(PLANT_NAMES):
+        return 'p', kind - 1 - len(ITEMS), pot
+    return 'rm', 0, pot
+
+
+class GardenEnv:
+    """
+    One game of a house, played through GardenSim.
+    """
+    def __init__(self, house_file: str) -> None:
+        """
+        Parameters:
+            house_file (str): path of the house file, which is read once.
+        """
+        self._house_file = house_file
+        with open(house_file, 'r') as file:
+            self._lines = file.read().splitlines()
+        self._devnull = open(os.devnull, 'w')
+        self._game = None
+        self._pots = []
+
+    def reset(self, seed: Optional[int] = None) -> tuple[dict, dict]:
+        """
+        Starts a new game.
+
+        Parameters:
+            seed (Optional[int], optional): seed for the rooms' dice,
+                defaults to None for the global generator.
+
+        Returns:
+            tuple[dict, dict]: the observation, and an info dictionary with
+                the 'action_mask'.
+        """
+        model = Model(self._house_file, seed=seed,
+            house=parse_house(self._lines, self._house_file))
+        self._game = GardenSim(self._house_file, NullView(), model=model)
+        self._pots = [(room_id, room, position)
+            for room_id, room in model.get_rooms().items()
+            for position in range(len(room.get_pots()))]
+        return self.get_observation(), {'action_mask': self.get_action_mask()}
+
+    def get_command(self, action: int) -> str:
+        """
+        str: Returns the move of an action, as a player would type it.
+        """
+        move, index, pot = decode_action(action, len(self._pots))
+        if move == 'n':
+            return 'n'
+        room_id, _, position = self._pots[pot]
+        if move == 'a':
+            return f'a {room_id} {position} {ITEMS[index]}'
+        elif move == 'p':
+            return f'p {PLANT_NAMES[index]} {room_id} {position}'
+        return f'{move} {room_id} {position}'
+
+    def step(self, action: int) -> tuple[dict, float, bool, bool, dict]:
+        """
+        Makes the move of an action.
+
+        Parameters:
+            action (int): the action.
+
+        Returns:
+            tuple[dict, float, bool, bool, dict]: the observation, the
+                reward, whether the game is over, False as games are not
+                cut short, and an info dictionary with the 'action_mask'
+                and whether the action was 'legal'.
+        """
+        model = self._game.get_model()
+        alive = model.get_number_of_plants_alive()
+        legal = bool(self.get_action_mask()[action])
+        if legal:
+            # Messages about plants are printed rather than viewed.
+            stdout, sys.stdout = sys.stdout, self._devnull
+            try:
+                self._game.execute(self.get_command(action))
+            finally:
+                sys.stdout = stdout
+
+        now_alive = model.get_number_of_plants_alive()
+        reward = float(now_alive - alive)
+        won = model.has_won(now_alive)
+        lost = bool(model.has_lost(now_alive))
+        if won:
+            reward += WIN_REWARD
+        elif lost:
+            reward -= WIN_REWARD
+        info = {'action_mask': self.get_action_mask(), 'legal': legal}
+        return self.get_observation(), reward, won or lost, False, info
+
+    def _available(self) -> numpy.ndarray:
+        """
+        numpy.ndarray: Returns the number of each species and item in the
+            inventory, less the items waiting to be applied.
+        """
+        inventory = self._game.get_model().get_inventory()
+        plants = inventory.get_entities('Plant')
+        items = inventory.get_entities('Item')
+        pending = self._game.get_applied_items().get_totals()
+        return numpy.array([len(plants.get(name, [])) for name in PLANT_NAMES]
+            + [len(items.get(item, [])) - pending.get(item, 0)
+                for item in ITEMS], dtype=numpy.int32)
+
+    def get_observation(self) -> dict:
+        """
+        dict: Returns the observation of the game (see the module).
+        """
+        pots = numpy.zeros((len(self._pots), len(POT_FEATURES)),
+            dtype=numpy.float32)
+        for index, (_, room, position) in enumerate(self._pots):
+            pot = room.get_pot(position)
+            plant = pot.look_at_plant()
+            if plant == None:
+                continue
+            lower, upper = plant.get_sun_levels()
+            pot_lower, pot_upper = pot.get_sun_range()
+            pots[index] = (not plant.is_dead(), plant.get_water(),
+                plant.get_health(), plant.get_age(),
+                max(0, min(upper, pot_upper) - max(lower, pot_lower) + 1))
+        return {
+            'pots': pots,
+            'inventory': self._available(),
+            'day': self._game.get_model().get_days_past(),
+        }
+
+    def get_action_mask(self) -> numpy.ndarray:
+        """
+        numpy.ndarray: Returns which actions the game accepts now.
+        """
+        count = len(self._pots)
+        occupied = numpy.array([room.has_plant(position)
+            for _, room, position in self._pots], dtype=bool)
+        alive = numpy.array([room.get_bits('alive') >> position & 1
+            for _, room, position in self._pots], dtype=bool)
+        available = self._available()
+
+        # Items are only applied to living plants.
+        mask = numpy.ones(count_actions(count), dtype=bool)
+        items = mask[1 + count:1 + (1 + len(ITEMS)) * count]
+        items[:] = numpy.outer(available[len(PLANT_NAMES):] > 0,
+            alive).ravel()
+        plants = mask[1 + (1 + len(ITEMS)) * count:-count]
+        plants[:] = numpy.outer(available[:len(PLANT_NAMES)] > 0,
+            ~occupied).ravel()
+        mask[-count:] = occupied
+        return mask
+
+    def get_game(self) -> GardenSim:
+        """
+        GardenSim: Returns the game being played.
+        """
+        return self._game
+
+    def close(self) -> None:
+        """
+        Ends the environment.
+        """
+        self._devnull.close()
+
+
+class VectorGardenEnv:
+    """
+    A batch of independent games of one house, each stepped by its own
+    action in every call. A game that is over is started again straight
+    away, and its last observation is given in the info dictionary.
+    """
+    def __init__(self, house_file: str, count: int) -> None:
+        """
+        Parameters:
+            house_file (str): path of the house file.
+            count (int): the number of games.
+        """
+        model = Model(house_file)
+        self._template = records_from_model(model)
+        self._total_plants = model.get_total_plants()
+        self._pots = len(self._template)
+        self._count = count
+
+        inventory = model.get_inventory()
+        plants = inventory.get_entities('Plant')
+        items = inventory.get_entities('Item')
+        self._start_inventory = numpy.array(
+            [len(plants.get(name, [])) for name in PLANT_NAMES]
+            + [len(items.get(item, [])) for item in ITEMS], dtype=numpy.int32)
+
+        # The fields of a new plant of each species.
+        species = [PLANTS_DATA[name] for name in PLANT_NAMES]
+        self._drink_rates = numpy.array([data['drink rate']
+            for data in species])
+        self._sun_lowers = numpy.array([data['sun-lower'] for data in species])
+        self._sun_uppers = numpy.array([data['sun-upper'] for data in species])
+
+        self._records = None
+        self._inventory = None
+        # Waterings, then each item, waiting to be applied to each pot.
+        self._pending = None
+        self._days = None
+        # The action mask of the current state, for checking the actions.
+        self._mask = None
+        self._rows = numpy.arange(count)
+        self._random = numpy.random.default_rng()
+
+    def reset(self, seed: Optional[int] = None) -> tuple[dict, dict]:
+        """
+        Starts every game again.
+
+        Parameters:
+            seed (Optional[int], optional): seed for the games' dice,
+                defaults to None for unseeded dice.
+
+        Returns:
+            tuple[dict, dict]: the observations, and an info dictionary
+                with the 'action_mask' of each game.
+        """
+        self._random = numpy.random.default_rng(seed)
+        self._records = numpy.tile(self._template, (self._count, 1))
+        self._inventory = numpy.tile(self._start_inventory, (self._count, 1))
+        self._pending = numpy.zeros((self._count, 1 + len(ITEMS),
+            self._pots), dtype=numpy.int32)
+        self._days = numpy.zeros(self._count, dtype=numpy.int32)
+        self._mask = self.get_action_mask()
+        return self.get_observation(), {'action_mask': self._mask}
+
+    def _restart(self, games: numpy.ndarray) -> None:
+        """
+        Starts some of the games again.
+
+        Parameters:
+            games (numpy.ndarray): the indexes of the games.
+        """
+        self._records[games] = self._template
+        self._inventory[games] = self._start_inventory
+        self._pending[games] = 0
+        self._days[games] = 0
+
+    def _end_days(self, games: numpy.ndarray) -> None:
+        """
+        Progresses some of the games to the next day, as Model.next() and
+        the 'n' move do.
+
+        Parameters:
+            games (numpy.ndarray): the indexes of the games.
+        """
+        self._days[games] += 1
+        topped_up = games[numpy.isin(self._days[games], TOP_UP_DAYS)]
+        self._inventory[topped_up, len(PLANT_NAMES):] += 1
+
+        records = self._records[games]
+        pending = self._pending[games]
+        alive = alive_mask(records)
+        records['water'] += numpy.where(alive, pending[:, 0], 0)
+        for index, item in enumerate(ITEMS, 1):
+            if item == Fertiliser().get_id():
+                records['health'] += numpy.where(alive, pending[:, index], 0)
+            else:
+                records['repellent'] |= alive & (pending[:, index] > 0)
+        self._inventory[games, len(PLANT_NAMES):] -= \
+            pending[:, 1:].sum(axis=2)
+        self._pending[games] = 0
+
+        progress_records(records, self._random.random(records.shape))
+        self._records[games] = records
+
+    def step(self, actions: numpy.ndarray) -> tuple[dict, numpy.ndarray,
+        numpy.ndarray, numpy.ndarray, dict]:
+        """
+        Makes one action in each game.
+
+        Parameters:
+            actions (numpy.ndarray): the action of each game.
+
+        Returns:
+            tuple[dict, numpy.ndarray, numpy.ndarray, numpy.ndarray, dict]:
+                the observations, rewards, whether each game is over, False
+                for each game as games are not cut short, and an info
+                dictionary with the 'action_mask' of each game, whether
+                each action was 'legal', and the 'final_observation' of the
+                games that are over.
+        """
+        actions = numpy.asarray(actions)
+        rows = self._rows
+        pots = self._pots
+        legal = self._mask[rows, actions]
+        before = alive_mask(self._records).sum(axis=1)
+
+        kinds, targets = numpy.divmod(actions - 1, pots)
+        kinds = numpy.where(actions == 0, -1, kinds)
+        kinds = numpy.where(legal, kinds, -2)
+
+        # Watering and applying items wait for the end of the day.
+        waiting = (kinds >= 0) & (kinds <= len(ITEMS))
+        self._pending[rows[waiting], kinds[waiting], targets[waiting]] += 1
+
+        # Planting takes a plant from the inventory.
+        planting = (kinds > len(ITEMS)) & (kinds <= len(ITEMS)
+            + len(PLANT_NAMES))
+        games, pots_planted = rows[planting], targets[planting]
+        species = kinds[planting] - 1 - len(ITEMS)
+        planted = self._records[games, pots_planted]
+        planted['species'] = species
+        planted['sun_lower'] = self._sun_lowers[species]
+        planted['sun_upper'] = self._sun_uppers[species]
+        planted['drink_rate'] = self._drink_rates[species]
+        planted['water'] = 10.0
+        planted['health'] = 10
+        planted['age'] = 0
+        planted['repellent'] = 0
+        self._records[games, pots_planted] = planted
+        self._inventory[games, species] -= 1
+
+        # Removing a plant leaves an empty pot.
+        removing = kinds == 1 + len(ITEMS) + len(PLANT_NAMES)
+        removed = self._records[rows[removing], targets[removing]]
+        removed['species'] = NO_PLANT
+        for field in ('sun_lower', 'sun_upper', 'drink_rate', 'water',
+            'health', 'age', 'repellent'):
+            removed[field] = 0
+        self._records[rows[removing], targets[removing]] = removed
+
+        self._end_days(rows[kinds == -1])
+
+        alive = alive_mask(self._records).sum(axis=1)
+        won = (self._days + 1 >= 15) & (alive > self._total_plants / 2)
+        lost = (self._days + 1 > 1) & (alive <= self._total_plants / 2)
+        over = won | lost
+        rewards = (alive - before).astype(numpy.float32) \
+            + WIN_REWARD * won - WIN_REWARD * lost
+
+        info = {'legal': legal}
+        if over.any():
+            info['final_observation'] = self.get_observation()
+            self._restart(rows[over])
+        self._mask = self.get_action_mask()
+        info['action_mask'] = self._mask
+        return self.get_observation(), rewards, over, \
+            numpy.zeros(self._count, dtype=bool), info
+
+    def get_observation(self) -> dict:
+        """
+        dict: Returns the observations of the games (see the module), with
+            the first axis of each array for the game.
+        """
+        records = self._records
+        planted = records['species'] != NO_PLANT
+        sun = numpy.minimum(records['sun_upper'], records['pot_sun_upper']) \
+            - numpy.maximum(records['sun_lower'], records['pot_sun_lower']) + 1
+        pots = numpy.stack([alive_mask(records), records['water'],
+            records['health'], records['age'],
+            numpy.where(planted, numpy.maximum(sun, 0), 0)],
+            axis=-1).astype(numpy.float32)
+        available = self._inventory.copy()
+        available[:, len(PLANT_NAMES):] -= self._pending[:, 1:].sum(axis=2)
+        return {'pots': pots, 'inventory': available, 'day': self._days + 1}
+
+    def get_action_mask(self) -> numpy.ndarray:
+        """
+        numpy.ndarray: Returns which actions each game accepts now, with
+            a row for each game.
+        """
+        count = self._pots
+        occupied = self._records['species'] != NO_PLANT
+        alive = alive_mask(self._records)
+        available = self._inventory.copy()
+        available[:, len(PLANT_NAMES):] -= self._pending[:, 1:].sum(axis=2)
+
+        # Items are only applied to living plants.
+        mask = numpy.ones((self._count, count_actions(count)), dtype=bool)
+        items = mask[:, 1 + count:1 + (1 + len(ITEMS)) * count]
+        items[:] = ((available[:, len(PLANT_NAMES):, None] > 0)
+            & alive[:, None, :]).reshape(self._count, -1)
+        plants = mask[:, 1 + (1 + len(ITEMS)) * count:-count]
+        plants[:] = ((available[:, :len(PLANT_NAMES), None] > 0)
+            & ~occupied[:, None, :]).reshape(self._count, -1)
+        mask[:, -count:] = occupied
+        return mask
+
+    def __len__(self) -> int:
+        """
+        int: Returns the number of games.
+        """
+        return self._count
@@ -0,0 +1,272 @@
+"""
+Estate mode: many houses progressing in parallel, one day at a time.
+
+Usage: python estate.py {directory of house files} {days} [{workers}] [{seed}]
+"""
+import os
+import random
+import sys
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from typing import Optional
+
+from a2 import Model
+
+
+def find_house_files(directory: str) -> list[str]:
+    """
+    Finds every house file (.txt) in a directory.
+
+    Parameters:
+        directory (str): the directory of the house files.
+
+    Returns:
+        list[str]: paths of the house files, sorted by name.
+    """
+    return sorted(os.path.join(directory, name) 
+        for name in os.listdir(directory) if name.endswith('.txt'))
+
+
+def partition_houses(house_files: list[str], 
+    workers: int) -> list[list[str]]:
+    """
+    Splits house files between workers so that each has a similar load.
+
+    The largest files are handed out first, each to the worker with the
+    fewest bytes of houses so far.
+
+    Parameters:
+        house_files (list[str]): paths of the house files.
+        workers (int): the number of workers.
+
+    Returns:
+        list[list[str]]: the house files of each worker.
+    """
+    shares = [[] for _ in range(workers)]
+    loads = [0] * workers
+    for house_file in sorted(house_files, key=os.path.getsize, reverse=True):
+        worker = loads.index(min(loads))
+        shares[worker].append(house_file)
+        loads[worker] += os.path.getsize(house_file)
+    return shares
+
+
+def survival(models: list[Model]) -> list[tuple[str, int, int]]:
+    """
+    Summarises how many plants of each house are alive.
+
+    Parameters:
+        models (list[Model]): the models of the houses.
+
+    Returns:
+        list[tuple[str, int, int]]: tuples of house files, the number of
+            alive plants, and the number of plants the house started with.
+    """
+    return [(model.get_house_file(), model.get_number_of_plants_alive(),
+        model.get_total_plants()) for model in models]
+
+
+def _estate_worker(connection: Connection, house_files: list[str], 
+    seed: Optional[int]) -> None:
+    """
+    Runs in a worker process, which owns the models of its houses.
+
+    The worker replies to every 'next' with the survival of its houses
+    once they have all progressed, and stops on 'close'.
+
+    Parameters:
+        connection (Connection): the worker's end of a pipe to the estate.
+        house_files (list[str]): paths of the worker's house files.
+        seed (Optional[int]): seed for the worker's random numbers.
+    """
+    # Messages about each plant are not wanted from every worker at once.
+    sys.stdout = open(os.devnull, 'w')
+    if seed is not None:
+        random.seed(seed)
+
+    models = []
+    for house_file in house_files:
+        try:
+            models.append(Model(house_file))
+        except Exception as error:
+            connection.send(('error', 
+                f'{house_file}: {type(error).__name__}: {error}'))
+            return
+    connection.send(('ok', survival(models)))
+
+    while True:
+        command = connection.recv()
+        if command != 'next':
+            break
+        try:
+            for model in models:
+                model.next([])
+            connection.send(('ok', survival(models)))
+        except Exception as error:
+            connection.send(('error', f'{type(error).__name__}: {error}'))
+    connection.close()
+
+
+class Estate:
+    """
+    Many houses, each with its own Model, progressing a day at a time.
+
+    The houses are shared between worker processes that keep their models
+    for the whole run. Each day every worker progresses its houses, and
+    the day ends once all of them have replied.
+    """
+    def __init__(self, directory: str, workers: Optional[int] = None,
+        seed: Optional[int] = None) -> None:
+        """
+        Loads every house file of a directory into the worker processes.
+
+        Parameters:
+            directory (str): the directory of the house files.
+            workers (Optional[int], optional): the number of worker
+                processes. Defaults to the number of CPUs.
+            seed (Optional[int], optional): seed for the random numbers of
+                the workers. Defaults to None for unseeded random numbers.
+
+        Raises:
+            ValueError: a house file could not be loaded.
+        """
+        house_files = find_house_files(directory)
+        workers = workers or os.cpu_count() or 1
+        workers = max(1, min(workers, len(house_files)))
+
+        self._n_day = 0
+        self._connections = []
+        self._processes = []
+        for index, share in enumerate(partition_houses(house_files, workers)):
+            parent_end, child_end = Pipe()
+            worker_seed = None if seed is None else seed + index
+            process = Process(target=_estate_worker, 
+                args=(child_end, share, worker_seed), daemon=True)
+            process.start()
+            child_end.close()
+            self._connections.append(parent_end)
+            self._processes.append(process)
+
+        self._survival = self._gather()
+
+    def _gather(self) -> list[tuple[str, int, int]]:
+        """
+        Waits for a reply from every worker.
+
+        Returns:
+            list[tuple[str, int, int]]: the survival of every house.
+
+        Raises:
+            ValueError: a worker could not load or progress its houses, or
+                stopped without replying, e.g. because it was killed.
+        """
+        houses = []
+        errors = []
+        for index, connection in enumerate(self._connections):
+            try:
+                status, reply = connection.recv()
+            except (EOFError, OSError):
+                status, reply = 'error', \
+                    f'worker {index} stopped without replying'
+            if status == 'ok':
+                houses.extend(reply)
+            else:
+                errors.append(reply)
+        if errors:
+            self.close()
+            raise ValueError('; '.join(errors))
+        return sorted(houses)
+
+    def next(self) -> tuple[int, int]:
+        """
+        Progresses every house to the next day.
+
+        Returns:
+            tuple[int, int]: the number of alive plants in the estate,
+                and the number of plants it started with.
+
+        Raises:
+            ValueError: a worker could not progress its houses, or has
+                stopped.
+        """
+        for index, connection in enumerate(self._connections):
+            try:
+                connection.send('next')
+            except OSError:
+                self.close()
+                raise ValueError(f'worker {index} has stopped') from None
+        self._survival = self._gather()
+        self._n_day += 1
+        return self.get_survival()
+
+    def get_days_past(self) -> int:
+        """
+        int: Returns the number of days that have been progressed.
+        """
+        return self._n_day
+
+    def get_survival(self) -> tuple[int, int]:
+        """
+        Returns:
+            tuple[int, int]: the number of alive plants in the estate,
+                and the number of plants it started with.
+        """
+        alive = sum(house[1] for house in self._survival)
+        total = sum(house[2] for house in self._survival)
+        return alive, total
+
+    def get_house_survival(self) -> list[tuple[str, int, int]]:
+        """
+        list[tuple[str, int, int]]: Returns tuples of house files, the
+            number of alive plants, and the number of starting plants.
+        """
+        return self._survival
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        for connection in self._connections:
+            try:
+                connection.send('close')
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    def __enter__(self) -> 'Estate':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        """
+        str: Returns the representation of the estate.
+        """
+        return f"Estate({len(self._survival)} houses)"
+
+
+def main():
+    """ Entry-point to estate mode """
+    if len(sys.argv) < 3:
+        print(__doc__.strip())
+        return
+    directory, days = sys.argv[1], int(sys.argv[2])
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    with Estate(directory, workers, seed) as estate:
+        for _ in range(days):
+            alive, total = estate.next()
+            percent = 100 * alive / total if total else 0.0
+            print(f'Day {estate.get_days_past()}: {alive}/{total} plants '
+                f'alive ({percent:.1f}%) across '
+                f'{len(estate.get_house_survival())} houses')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+"""
+Event-sourced log of a game, with checkpoints for seeking to any day.
+
+A GameLog attached to a GardenSim appends every move that changed the game
+to an events file, one JSON object per line, along with the dice rolled by
+each room during the move. Every few days, the first time the game reaches
+a day, the model, the waiting items and the undo history are pickled and
+compressed into a checkpoint.
+
+seek() rebuilds the game as it was at the start of a day from the nearest
+earlier checkpoint, replaying only the moves after it. The logged dice are
+replayed instead of being rolled again, so games that use the global
+generator replay exactly as well.
+
+Usage: python gamelog.py play {log directory} {house file} [{seed}]
+       python gamelog.py seek {log directory} {day}
+"""
+import contextlib
+import io
+import json
+import os
+import pickle
+import sys
+import zlib
+from random import Random, randint
+from typing import Optional
+
+from a2 import GardenSim, View
+
+
+# A checkpoint is written when the day is a multiple of this.
+CHECKPOINT_DAYS = 10
+HEADER_FILE = 'game.json'
+EVENTS_FILE = 'events.jsonl'
+
+
+def _checkpoint_file(day: int) -> str:
+    """
+    str: Returns the name of the checkpoint file of a day.
+    """
+    return f'checkpoint-{day:06d}.z'
+
+
+class _DrawRecorder:
+    """
+    Rolls a room's dice with its generator and remembers the results.
+    """
+    def __init__(self, rng: Optional[Random]) -> None:
+        """
+        Parameters:
+            rng (Optional[Random]): the room's generator, or None for the
+                global generator.
+        """
+        self._rng = rng
+        self._draws = []
+
+    def get_random(self) -> Optional[Random]:
+        """
+        Optional[Random]: Returns the room's own generator.
+        """
+        return self._rng
+
+    def randint(self, a: int, b: int) -> int:
+        """
+        int: Returns a random integer from a to b, and remembers it.
+        """
+        value = randint(a, b) if self._rng is None else self._rng.randint(a, b)
+        self._draws.append(value)
+        return value
+
+    def take_draws(self) -> list[int]:
+        """
+        list[int]: Returns and forgets the results rolled so far.
+        """
+        draws, self._draws = self._draws, []
+        return draws
+
+
+class _DrawReplayer:
+    """
+    Returns a room's logged dice instead of rolling them. A seeded generator
+    is still advanced, so the game carries on as it did when it was played.
+    """
+    def __init__(self, rng: Optional[Random], draws: list[int]) -> None:
+        """
+        Parameters:
+            rng (Optional[Random]): the room's generator, or None for the
+                global generator, which is left alone.
+            draws (list[int]): the logged results, in order.
+        """
+        self._rng = rng
+        self._draws = iter(draws)
+
+    def randint(self, a: int, b: int) -> int:
+        """
+        int: Returns the next logged result.
+        """
+        if self._rng is not None:
+            self._rng.randint(a, b)
+        return next(self._draws)
+
+
+class GameLog:
+    """
+    Appends the accepted moves and dice rolls of a game to a directory,
+    with periodic checkpoints of its state.
+    """
+    def __init__(self, directory: str,
+        checkpoint_days: int = CHECKPOINT_DAYS) -> None:
+        """
+        Parameters:
+            directory (str): the directory of the log, which is created if
+                needed and must not already hold a log.
+            checkpoint_days (int, optional): the number of days between
+                checkpoints, defaults to CHECKPOINT_DAYS.
+
+        Raises:
+            ValueError: checkpoint_days is not positive, or the directory
+                already holds a log.
+        """
+        if checkpoint_days < 1:
+            raise ValueError('checkpoint_days must be at least 1')
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(os.path.join(directory, EVENTS_FILE)):
+            raise ValueError(f'{directory} already holds a game log')
+
+        self._directory = directory
+        self._checkpoint_days = checkpoint_days
+        self._events = None
+        self._game = None
+
+    def attach(self, game: GardenSim) -> None:
+        """
+        Starts logging a game, writing a checkpoint of its current state.
+
+        Parameters:
+            game (GardenSim): the game to log.
+        """
+        model = game.get_model()
+        header = {
+            'house_file': model.get_house_file(),
+            'seed': model.get_seed(),
+            'checkpoint_days': self._checkpoint_days,
+        }
+        with open(os.path.join(self._directory, HEADER_FILE), 'w') as file:
+            json.dump(header, file)
+
+        self._events = open(os.path.join(self._directory, EVENTS_FILE), 'w')
+        self._game = game
+        for room in model.get_all_rooms():
+            room.set_random(_DrawRecorder(room.get_random()))
+        self.checkpoint()
+        game.add_move_listener(self.record)
+
+    def record(self, game: GardenSim, move: str) -> None:
+        """
+        Appends a move and the dice it rolled, then writes a checkpoint if
+        the game has reached a checkpoint day for the first time.
+
+        Parameters:
+            game (GardenSim): the game the move was made in.
+            move (str): the move.
+        """
+        model = game.get_model()
+        event = {'day': model.get_days_past(), 'move': move}
+        draws = {}
+        for room_id, room in model.get_rooms().items():
+            room_draws = room.get_random().take_draws()
+            if room_draws != []:
+                draws[room_id] = room_draws
+        if draws != {}:
+            event['draws'] = draws
+        self._events.write(json.dumps(event) + '\n')
+        self._events.flush()
+
+        if model.get_days_past() % self._checkpoint_days == 0 \
+            and not os.path.exists(os.path.join(self._directory,
+                _checkpoint_file(model.get_days_past()))):
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """
+        Writes a checkpoint of the game's current day, with the position
+        in the events file that moves after it are replayed from.
+        """
+        model = self._game.get_model()
+        rooms = model.get_all_rooms()
+        recorders = [room.get_random() for room in rooms]
+
+        # The rooms' own generators are pickled, not the recorders.
+        for room, recorder in zip(rooms, recorders):
+            room.set_random(recorder.get_random())
+        try:
+            data = pickle.dumps((self._events.tell(), model,
+                self._game.get_applied_items().get_state(),
+                self._game.get_journal().get_history()))
+        finally:
+            for room, recorder in zip(rooms, recorders):
+                room.set_random(recorder)
+
+        path = os.path.join(self._directory,
+            _checkpoint_file(model.get_days_past()))
+        with open(path, 'wb') as file:
+            file.write(zlib.compress(data))
+
+    def close(self) -> None:
+        """
+        Stops logging the game and closes the events file.
+        """
+        if self._game != None:
+            self._game.remove_move_listener(self.record)
+            for room in self._game.get_model().get_all_rooms():
+                room.set_random(room.get_random().get_random())
+            self._game = None
+        if self._events != None:
+            self._events.close()
+            self._events = None
+
+    def __enter__(self) -> 'GameLog':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_events(directory: str) -> list[dict]:
+    """
+    Reads every logged move.
+
+    Parameters:
+        directory (str): the directory of the log.
+
+    Returns:
+        list[dict]: the moves in order, each with the 'day' after it, the
+            'move', and the 'draws' of each room that rolled dice.
+    """
+    with open(os.path.join(directory, EVENTS_FILE)) as file:
+        return [json.loads(line) for line in file]
+
+
+def seek(directory: str, day: int, view: Optional[View] = None) -> GardenSim:
+    """
+    Rebuilds a logged game as it was when it first reached a day, before
+    any moves were made on that day.
+
+    Parameters:
+        directory (str): the directory of the log.
+        day (int): the day, as counted by Model.get_days_past().
+        view (Optional[View], optional): the view of the rebuilt game,
+            defaults to a new View.
+
+    Returns:
+        GardenSim: the rebuilt game, which is not being logged.
+
+    Raises:
+        ValueError: the game never reached the day.
+    """
+    with open(os.path.join(directory, HEADER_FILE)) as file:
+        header = json.load(file)
+
+    # The latest checkpoint at or before the day was written on the way
+    # to the first time the game reached the day.
+    days = [int(name[len('checkpoint-'):-len('.z')])
+        for name in os.listdir(directory) if name.startswith('checkpoint-')]
+    days = [checkpoint_day for checkpoint_day in days if checkpoint_day <= day]
+    if days == []:
+        raise ValueError(f'the game never reached day {day}')
+
+    with open(os.path.join(directory, _checkpoint_file(max(days))),
+        'rb') as file:
+        offset, model, pending, history = \
+            pickle.loads(zlib.decompress(file.read()))
+    game = GardenSim(header['house_file'],
+        view if view != None else View(), model=model)
+    game.get_applied_items().set_state(pending)
+    game.get_journal().set_history(history)
+
+    rooms = model.get_rooms()
+    with open(os.path.join(directory, EVENTS_FILE)) as events:
+        events.seek(offset)
+        while model.get_days_past() < day:
+            line = events.readline()
+            if line == '':
+                raise ValueError(f'the game never reached day {day}')
+            event = json.loads(line)
+
+            generators = {room_id: room.get_random()
+                for room_id, room in rooms.items()}
+            for room_id, draws in event.get('draws', {}).items():
+                rooms[room_id].set_random(
+                    _DrawReplayer(generators[room_id], draws))
+            try:
+                # Messages were already shown when the move was played.
+                with contextlib.redirect_stdout(io.StringIO()):
+                    game.execute(event['move'])
+            finally:
+                for room_id, room in rooms.items():
+                    room.set_random(generators[room_id])
+    return game
+
+
+def main():
+    """ Entry-point to playing a logged game or seeking in its log """
+    if len(sys.argv) < 4 or sys.argv[1] not in ('play', 'seek'):
+        print(__doc__.strip())
+        return
+
+    if sys.argv[1] == 'play':
+        seed = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        game = GardenSim(sys.argv[3], View(), seed=seed)
+        with GameLog(sys.argv[2]) as log:
+            log.attach(game)
+            game.play()
+    else:
+        game = seek(sys.argv[2], int(sys.argv[3]))
+        print(f'Day {game.get_model().get_days_past()}:')
+        View().draw(game.get_model().get_all_rooms())
+
+
+if __name__ == '__main__':
+    main()
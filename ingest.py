@@ -0,0 +1,193 @@
+"""
+Bulk loading of a directory of house files.
+
+Reading files waits on the disk and parsing them keeps a CPU busy, so the
+two are overlapped: a pool of threads reads the files, and each file is
+handed to a pool of worker processes as soon as it has been read. The
+workers parse and check each house, build its Model, and send back either
+the model or a compact blob of it (see pack_model()).
+
+A malformed house does not stop the others from loading. Its error, with
+the file and line of the mistake, is reported with the file's path.
+
+Usage: python ingest.py {directory of house files} [{threads}] [{workers}]
+"""
+import os
+import pickle
+import sys
+import time
+import zlib
+from concurrent.futures import (ProcessPoolExecutor, ThreadPoolExecutor,
+    as_completed)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from a2 import Model, parse_house
+from estate import find_house_files
+
+
+# Threads reading files at once, by default.
+READERS = 8
+
+
+def pack_model(model: Model) -> bytes:
+    """
+    Packs a model into a compressed blob, e.g. to store or send it.
+
+    Parameters:
+        model (Model): the model.
+
+    Returns:
+        bytes: the blob.
+    """
+    return zlib.compress(pickle.dumps(model))
+
+
+def unpack_model(blob: bytes) -> Model:
+    """
+    Unpacks a model packed by pack_model().
+
+    Parameters:
+        blob (bytes): the blob.
+
+    Returns:
+        Model: the model.
+    """
+    return pickle.loads(zlib.decompress(blob))
+
+
+def _read_house(house_file: str) -> str:
+    """
+    str: Returns the text of a house file. Runs in a reader thread.
+    """
+    with open(house_file, 'r') as file:
+        return file.read()
+
+
+def _build_house(house_file: str, text: str, packed: bool) -> Model | bytes:
+    """
+    Parses a house and builds its model. Runs in a worker process.
+
+    Parameters:
+        house_file (str): path of the house file.
+        text (str): the text of the house file.
+        packed (bool): True to return the model packed by pack_model().
+
+    Returns:
+        Model | bytes: the model or its blob.
+
+    Raises:
+        ValueError: the house is malformed.
+    """
+    model = Model(house_file, house=parse_house(text.splitlines(), house_file))
+    return pack_model(model) if packed else model
+
+
+class BulkLoader:
+    """
+    Loads every house file of a directory, reading and parsing them at
+    once, and counts how quickly it did so.
+    """
+    def __init__(self, readers: int = READERS,
+        workers: Optional[int] = None, packed: bool = False) -> None:
+        """
+        Parameters:
+            readers (int, optional): the number of threads reading files,
+                defaults to READERS.
+            workers (Optional[int], optional): the number of worker
+                processes parsing houses. Defaults to the number of CPUs.
+            packed (bool, optional): True to load each house as a blob
+                packed by pack_model(), which is smaller to keep and quicker
+                to send back from a worker. Defaults to False for models.
+        """
+        self._readers = readers
+        self._workers = workers or os.cpu_count() or 1
+        self._packed = packed
+        self._files = 0
+        self._seconds = 0.0
+
+    def load(self, directory: str) -> tuple[dict[str, Model | bytes],
+        dict[str, str]]:
+        """
+        Loads every house file (.txt) of a directory.
+
+        Parameters:
+            directory (str): the directory of the house files.
+
+        Returns:
+            tuple[dict[str, Model | bytes], dict[str, str]]: the model (or
+                blob) of each house that loaded, and the error of each
+                house that did not, both by path of the house file.
+        """
+        house_files = find_house_files(directory)
+        houses = {}
+        errors = {}
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(self._readers) as readers, \
+            ProcessPoolExecutor(self._workers) as workers:
+            reads = {readers.submit(_read_house, house_file): house_file
+                for house_file in house_files}
+            builds = {}
+            for read in as_completed(reads):
+                house_file = reads[read]
+                try:
+                    text = read.result()
+                except (OSError, UnicodeDecodeError) as error:
+                    errors[house_file] = f'{house_file}: {error}'
+                    continue
+                # Once a worker has died, no more houses can be built.
+                try:
+                    builds[workers.submit(_build_house, house_file, text,
+                        self._packed)] = house_file
+                except BrokenProcessPool as error:
+                    errors[house_file] = f'{house_file}: {error}'
+
+            # Any error building a house, including a worker dying, is
+            # reported with its file rather than stopping the others.
+            for build in as_completed(builds):
+                house_file = builds[build]
+                try:
+                    houses[house_file] = build.result()
+                except ValueError as error:
+                    errors[house_file] = str(error)
+                except Exception as error:
+                    errors[house_file] = \
+                        f'{house_file}: {type(error).__name__}: {error}'
+
+        self._files += len(house_files)
+        self._seconds += time.perf_counter() - start
+        return dict(sorted(houses.items())), dict(sorted(errors.items()))
+
+    def get_files_per_second(self) -> float:
+        """
+        float: Returns the number of files loaded each second, over every
+            directory loaded so far.
+        """
+        return self._files / self._seconds if self._seconds else 0.0
+
+    def __repr__(self) -> str:
+        """
+        str: Returns the representation of the loader.
+        """
+        return f"BulkLoader({self._readers} readers, {self._workers} workers)"
+
+
+def main():
+    """ Entry-point to loading a directory of houses """
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        return
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else READERS
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    loader = BulkLoader(readers, workers)
+    houses, errors = loader.load(sys.argv[1])
+    for error in errors.values():
+        print(error)
+    print(f'Loaded {len(houses)} houses, {len(errors)} failed '
+        f'({loader.get_files_per_second():.1f} files/s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+Load test of the game's controller: many games played in-process from
+generated streams of moves, at growing house sizes.
+
+Each house is scaled up by repeating its rooms, and its plants and items.
+Each game is a GardenSim with a NullView whose input_user() reads the next
+move from a stream that mixes the moves a player makes, e.g. mostly
+watering and progressing the day. The time taken by each move is recorded
+in the games' shared Stats, and each size's report gives the sustained
+moves per second and the p50/p95/p99 latency of each move.
+
+Usage: python loadtest.py {house file} [{scales}] [{games}] [{moves}] [{seed}]
+       e.g. python loadtest.py houses/house1.txt 1,10,100 4 500
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Optional
+
+from a2 import (GardenSim, Model, NullView, Stats, PLANT_NAMES, Fertiliser,
+    PossumRepellent)
+
+
+# The share of each move in the generated streams.
+MOVE_MIX = {
+    'ls': 0.10,
+    'w': 0.30,
+    'a': 0.10,
+    'p': 0.10,
+    'm': 0.10,
+    's': 0.10,
+    'n': 0.20,
+}
+SCALES = (1, 10, 100)
+GAMES = 4
+MOVES = 500
+
+
+def scale_house(house_file: str, scale: int, directory: str) -> str:
+    """
+    Writes a copy of a house with its rooms repeated, and its plants and
+    items multiplied, a number of times.
+
+    Parameters:
+        house_file (str): path of the house file.
+        scale (int): the number of copies of each room.
+        directory (str): the directory to write the scaled house to.
+
+    Returns:
+        str: path of the scaled house file.
+    """
+    rooms = []
+    stock = []
+    with open(house_file) as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith('Plants') or line.startswith('Items'):
+                kind, _, entries = line.partition(' - ')
+                entries = [entry.split(' ') for entry in entries.split(',')]
+                stock.append(kind + ' - ' + ','.join(
+                    f'{name} {int(count) * scale}' for name, count in entries))
+            elif line.startswith('Room'):
+                rooms.append([line])
+            elif line != '' and rooms != []:
+                rooms[-1].append(line)
+
+    path = os.path.join(directory, f'x{scale}-{os.path.basename(house_file)}')
+    with open(path, 'w') as file:
+        for _ in range(scale):
+            for room in rooms:
+                file.write('\n'.join(room) + '\n\n')
+        file.write('\n\n'.join(stock) + '\n')
+    return path
+
+
+def generate_moves(model: Model, count: int, rng: random.Random,
+    mix: dict[str, float] = MOVE_MIX) -> list[str]:
+    """
+    Generates a stream of valid moves for a house.
+
+    Parameters:
+        model (Model): the house the moves are made in.
+        count (int): the number of moves.
+        rng (random.Random): the generator to choose moves with.
+        mix (dict[str, float], optional): the share of each move,
+            defaults to MOVE_MIX.
+
+    Returns:
+        list[str]: the moves, in order.
+    """
+    pots = [(room_id, len(room.get_pots()))
+        for room_id, room in model.get_rooms().items()]
+    items = [Fertiliser().get_id(), PossumRepellent().get_id()]
+    plants = sorted(PLANT_NAMES)
+
+    def pot() -> str:
+        room_id, size = rng.choice(pots)
+        return f'{room_id} {rng.randrange(size)}'
+
+    moves = []
+    for move in rng.choices(list(mix), weights=list(mix.values()), k=count):
+        # A quarter of listings are of the whole house.
+        if move == 'ls':
+            moves.append('ls' if rng.random() < 0.25 else f'ls {pot()}')
+        elif move == 'w' or move == 'a':
+            # A tenth of waterings and items are for a whole room.
+            if rng.random() < 0.1:
+                target = f'{rng.choice(pots)[0]} *'
+            else:
+                target = pot()
+            moves.append(f'w {target}' if move == 'w'
+                else f'a {target} {rng.choice(items)}')
+        elif move == 'p':
+            moves.append(f'p {rng.choice(plants)} {pot()}')
+        elif move == 'm' or move == 's':
+            moves.append(f'{move} {pot()} {pot()}')
+        else:
+            moves.append(move)
+    return moves
+
+
+class _OutOfMoves(Exception):
+    """
+    Raised by a scripted game's input_user() to stop the game.
+    """
+
+
+class _ScriptedGame(GardenSim):
+    """
+    A game whose player's moves are read from a list instead of the
+    keyboard. The game is stopped when the moves run out.
+    """
+    def __init__(self, house_file: str, model: Model, 
+        moves: list[str]) -> None:
+        """
+        Parameters:
+            house_file (str): path of the house file.
+            model (Model): the house to play.
+            moves (list[str]): the moves to make, in order.
+        """
+        super().__init__(house_file, NullView(), model=model)
+        self._moves = iter(moves)
+        self._made = 0
+
+    def input_user(self) -> str:
+        """
+        Returns the next move.
+
+        Raises:
+            _OutOfMoves: every move has been made.
+        """
+        move = next(self._moves, None)
+        if move == None:
+            raise _OutOfMoves()
+        self._made += 1
+        return move
+
+    def get_moves_made(self) -> int:
+        """
+        int: Returns the number of moves that have been made.
+        """
+        return self._made
+
+
+def run_load(house_file: str, games: int = GAMES, moves: int = MOVES,
+    seed: Optional[int] = None) -> dict:
+    """
+    Plays games of a house one after another and times every move.
+
+    A game that is won or lost before its moves run out is replaced by a
+    new game of the house, which makes the rest of the moves.
+
+    Parameters:
+        house_file (str): path of the house file.
+        games (int, optional): the number of games, defaults to GAMES.
+        moves (int, optional): the number of moves in each game's stream,
+            defaults to MOVES.
+        seed (Optional[int], optional): seed for the moves and dice,
+            defaults to None for unseeded random numbers.
+
+    Returns:
+        dict: the house's number of 'rooms' and 'pots', the number of
+            'moves' made, the 'seconds' spent making them, the 'moves/s',
+            and the Stats.summary() of each move, by move, in 'latency'.
+    """
+    stats = Stats(enabled=True)
+    made = 0
+    seconds = 0.0
+    with open(os.devnull, 'w') as devnull:
+        for game_index in range(games):
+            game_seed = None if seed is None else seed + game_index
+            model = Model(house_file, stats=stats, seed=game_seed)
+            stream = generate_moves(model, moves, random.Random(game_seed))
+            while stream != []:
+                game = _ScriptedGame(house_file, model, stream)
+
+                # Messages about plants are printed rather than viewed.
+                stdout, sys.stdout = sys.stdout, devnull
+                start = time.perf_counter()
+                try:
+                    game.play()
+                except _OutOfMoves:
+                    pass
+                finally:
+                    seconds += time.perf_counter() - start
+                    sys.stdout = stdout
+
+                # A house that is over before any move is never played.
+                if game.get_moves_made() == 0:
+                    break
+                made += game.get_moves_made()
+                stream = stream[game.get_moves_made():]
+                model = Model(house_file, stats=stats, seed=game_seed)
+
+    rooms = model.get_all_rooms()
+    return {
+        'rooms': len(rooms),
+        'pots': sum(len(room.get_pots()) for room in rooms),
+        'moves': made,
+        'seconds': seconds,
+        'moves/s': made / seconds if seconds else 0.0,
+        'latency': {name[len('move '):]: counter
+            for name, counter in sorted(stats.summary().items())
+            if name.startswith('move ')},
+    }
+
+
+def main():
+    """ Entry-point to the load test """
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        return
+    house_file = sys.argv[1]
+    scales = [int(scale) for scale in sys.argv[2].split(',')] \
+        if len(sys.argv) > 2 else SCALES
+    games = int(sys.argv[3]) if len(sys.argv) > 3 else GAMES
+    moves = int(sys.argv[4]) if len(sys.argv) > 4 else MOVES
+    seed = int(sys.argv[5]) if len(sys.argv) > 5 else None
+
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in scales:
+            report = run_load(scale_house(house_file, scale, directory),
+                games, moves, seed)
+            print(f"x{scale}: {report['rooms']} rooms, {report['pots']} pots, "
+                f"{report['moves']} moves in {report['seconds']:.2f}s "
+                f"({report['moves/s']:.0f} moves/s)")
+            for move, counter in report['latency'].items():
+                print(f"  {move}: {counter['count']} moves, "
+                    f"p50 {counter['p50'] * 1000:.3f}ms, "
+                    f"p95 {counter['p95'] * 1000:.3f}ms, "
+                    f"p99 {counter['p99'] * 1000:.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""
+Memory profiling of long runs, to find what keeps growing from day to day.
+
+A MemoryProfiler is added to a Model as a day listener. At the end of each
+day it takes a tracemalloc snapshot and compares it to the day before,
+keeping the allocation sites (file and line) that grew the most, and counts
+the live instances of each of the game's classes. A run whose memory keeps
+growing shows the same sites and classes growing every day, e.g. the undo
+history or the waiting items.
+
+Tracing slows the game down, so the profiler is only for scripted runs.
+
+Usage: python memprofile.py {house file} [{moves}] [{top}] [{seed}]
+       e.g. python memprofile.py houses/house1.txt 2000 5 1
+"""
+import contextlib
+import gc
+import os
+import random
+import sys
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+from a2 import GardenSim, Model, NullView
+from loadtest import generate_moves
+
+
+# Number of growing allocation sites kept for each day.
+TOP = 10
+MOVES = 2000
+# Frames of each allocation that are traced; one is enough for a site.
+FRAMES = 1
+# Modules whose classes have their live instances counted.
+MODULES = ('a2', 'a2_support')
+
+
+def count_instances(modules: tuple[str, ...] = MODULES) -> dict[str, int]:
+    """
+    Counts the live instances of the classes defined in some modules.
+
+    Parameters:
+        modules (tuple[str, ...], optional): names of the modules, defaults
+            to MODULES.
+
+    Returns:
+        dict[str, int]: the number of instances of each class, by name.
+    """
+    counts = Counter()
+    for obj in gc.get_objects():
+        cls = type(obj)
+        if cls.__module__ in modules:
+            counts[cls.__qualname__] += 1
+    return dict(sorted(counts.items()))
+
+
+class MemoryProfiler:
+    """
+    Snapshots the memory allocated by a game at the end of each day, and
+    reports the sites and classes that grew since the day before.
+    """
+    def __init__(self, top: int = TOP, frames: int = FRAMES,
+        modules: tuple[str, ...] = MODULES) -> None:
+        """
+        Parameters:
+            top (int, optional): the number of growing allocation sites kept
+                for each day, defaults to TOP.
+            frames (int, optional): the number of frames traced for each
+                allocation if tracing is started here, defaults to FRAMES.
+            modules (tuple[str, ...], optional): the modules whose classes
+                have their instances counted, defaults to MODULES.
+
+        Raises:
+            ValueError: top or frames is not positive.
+        """
+        if top < 1:
+            raise ValueError('top must be at least 1')
+        if frames < 1:
+            raise ValueError('frames must be at least 1')
+        self._top = top
+        self._frames = frames
+        self._modules = modules
+        self._started = False
+        self._models = []
+        self._first = None
+        self._previous = None
+        self._instances = {}
+        self._reports = []
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        """
+        tracemalloc.Snapshot: Returns a snapshot of the traced memory,
+            without the memory allocated by tracing and importing.
+        """
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+    def attach(self, model: Model) -> None:
+        """
+        Starts profiling a model at the end of each of its days. Tracing is
+        started if it has not been already, and the memory of the model as
+        it is now is the baseline for its first day.
+
+        Parameters:
+            model (Model): the model to profile.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self._frames)
+            self._started = True
+        model.add_day_listener(self.record)
+        self._models.append(model)
+        if self._previous == None:
+            gc.collect()
+            self._first = self._previous = self._snapshot()
+            self._instances = count_instances(self._modules)
+
+    def record(self, model: Model) -> None:
+        """
+        Snapshots the traced memory at the end of a model's day, and records
+        how it grew since the last snapshot.
+
+        Parameters:
+            model (Model): the model whose day ended.
+        """
+        # Garbage waiting to be collected is not growth.
+        gc.collect()
+        snapshot = self._snapshot()
+        instances = count_instances(self._modules)
+        growth = [stat for stat in snapshot.compare_to(self._previous,
+            'lineno') if stat.size_diff > 0][:self._top]
+
+        current, peak = tracemalloc.get_traced_memory()
+        self._reports.append({
+            'day': model.get_days_past(),
+            'current': current,
+            'peak': peak,
+            'growth': [(str(stat.traceback), stat.size_diff, stat.count_diff)
+                for stat in growth],
+            'instances': {name: (count, count - self._instances.get(name, 0))
+                for name, count in instances.items()},
+        })
+        self._previous = snapshot
+        self._instances = instances
+
+    def get_reports(self) -> list[dict]:
+        """
+        Gets the report of each day profiled so far, oldest first.
+
+        Returns:
+            list[dict]: each day's 'day', the 'current' and 'peak' bytes
+                traced, the 'growth' of the sites that grew the most, as
+                (site, bytes, blocks), and the 'instances' of each class,
+                as (count, change since the day before), by name.
+        """
+        return self._reports
+
+    def get_growth(self, top: Optional[int] = None) -> list[tuple[str, int,
+        int]]:
+        """
+        Gets the sites that grew the most over the whole run.
+
+        Parameters:
+            top (Optional[int], optional): the number of sites, defaults to
+                the profiler's top.
+
+        Returns:
+            list[tuple[str, int, int]]: the site, and the bytes and blocks
+                it grew by, for each site that grew, most first.
+        """
+        if self._first == None or self._previous is self._first:
+            return []
+        return [(str(stat.traceback), stat.size_diff, stat.count_diff)
+            for stat in self._previous.compare_to(self._first, 'lineno')
+            if stat.size_diff > 0][:top or self._top]
+
+    def close(self) -> None:
+        """
+        Stops profiling attached models, and stops tracing if it was
+        started by the profiler.
+        """
+        for model in self._models:
+            model.remove_day_listener(self.record)
+        self._models = []
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def __enter__(self) -> 'MemoryProfiler':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def format_report(report: dict) -> str:
+    """
+    Formats a day's report from MemoryProfiler.get_reports() for reading.
+
+    Parameters:
+        report (dict): the report.
+
+    Returns:
+        str: the report, over several lines.
+    """
+    lines = [f"Day {report['day']}: {report['current'] / 1024:.1f} KiB "
+        f"traced, {report['peak'] / 1024:.1f} KiB peak"]
+    for site, size, blocks in report['growth']:
+        lines.append(f'  +{size / 1024:.1f} KiB in {blocks:+d} blocks: {site}')
+    changed = [f'{name} {count} ({change:+d})'
+        for name, (count, change) in report['instances'].items()
+        if change != 0]
+    if changed != []:
+        lines.append('  Instances: ' + ', '.join(changed))
+    return '\n'.join(lines)
+
+
+def profile_run(house_file: str, moves: int = MOVES, top: int = TOP,
+    seed: Optional[int] = None) -> MemoryProfiler:
+    """
+    Plays a generated stream of moves in a house while profiling its memory.
+    The run stops early if the game is won or lost.
+
+    Parameters:
+        house_file (str): path of the house file.
+        moves (int, optional): the number of moves, defaults to MOVES.
+        top (int, optional): the number of growing sites kept for each
+            day, defaults to TOP.
+        seed (Optional[int], optional): seed for the moves and dice,
+            defaults to None for unseeded random numbers.
+
+    Returns:
+        MemoryProfiler: the profiler, closed, with the run's reports.
+    """
+    model = Model(house_file, seed=seed)
+    game = GardenSim(house_file, NullView(), model=model)
+    stream = generate_moves(model, moves, random.Random(seed))
+
+    # Messages about plants are printed rather than viewed.
+    with MemoryProfiler(top) as profiler, open(os.devnull, 'w') as devnull, \
+        contextlib.redirect_stdout(devnull):
+        profiler.attach(model)
+        for move in stream:
+            if model.has_won() or model.has_lost():
+                break
+            game.execute(move)
+    return profiler
+
+
+def main():
+    """ Entry-point to profiling the memory of a run """
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        return
+    house_file = sys.argv[1]
+    moves = int(sys.argv[2]) if len(sys.argv) > 2 else MOVES
+    top = int(sys.argv[3]) if len(sys.argv) > 3 else TOP
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    profiler = profile_run(house_file, moves, top, seed)
+    for report in profiler.get_reports():
+        print(format_report(report))
+    print('Grew over the run:')
+    for site, size, blocks in profiler.get_growth():
+        print(f'  +{size / 1024:.1f} KiB in {blocks:+d} blocks: {site}')
+
+
+if __name__ == '__main__':
+    main()
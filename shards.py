@@ -0,0 +1,213 @@
+"""
+Sharded progression of one large house.
+
+The rooms of a house are split between worker processes. Each day every
+worker applies the items for its rooms and progresses them, and only the
+number of alive plants comes back. Rooms roll their own seeded dice (see
+Model), so the result is the same as progressing the house in one process.
+"""
+import os
+import sys
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from typing import Optional
+
+from a2 import Item, Model, PendingEffects, Room
+
+
+def partition_rooms(rooms: list[tuple[Room, str]], 
+    shards: int) -> list[list[tuple[Room, str]]]:
+    """
+    Splits rooms between shards so that each has a similar number of pots.
+
+    Parameters:
+        rooms (list[tuple[Room, str]]): the rooms and their IDs.
+        shards (int): the number of shards.
+
+    Returns:
+        list[list[tuple[Room, str]]]: the rooms of each shard.
+    """
+    shares = [[] for _ in range(shards)]
+    loads = [0] * shards
+    by_size = sorted(rooms, key=lambda room: len(room[0].get_pots()), 
+        reverse=True)
+    for room, room_id in by_size:
+        shard = loads.index(min(loads))
+        shares[shard].append((room, room_id))
+        loads[shard] += len(room.get_pots())
+    return shares
+
+
+def _shard_worker(connection: Connection, house_file: str, 
+    rooms: list[tuple[Room, str]]) -> None:
+    """
+    Runs in a worker process, which owns the rooms of its shard.
+
+    Commands are 'next' with the shard's effects, 'gather' to send the
+    rooms back, and 'close'.
+
+    Parameters:
+        connection (Connection): the worker's end of a pipe to the house.
+        house_file (str): directory of the house file, for reference.
+        rooms (list[tuple[Room, str]]): the rooms of the shard and their IDs.
+    """
+    # Messages about each plant are not wanted from every worker at once.
+    sys.stdout = open(os.devnull, 'w')
+    shard = Model(house_file, house=(rooms, {}, {}))
+    connection.send(shard.get_number_of_plants_alive())
+
+    while True:
+        command, payload = connection.recv()
+        if command == 'next':
+            effects = PendingEffects()
+            for room_id, positions, item, count in payload:
+                effects.add(room_id, positions, item, 
+                    shard.count_target_pots(room_id, positions), count)
+            shard.apply_effects(effects)
+            shard.progress_rooms()
+            connection.send(shard.get_number_of_plants_alive())
+        elif command == 'gather':
+            connection.send(shard.get_rooms())
+        else:
+            break
+    connection.close()
+
+
+class ShardedHouse:
+    """
+    Progresses the rooms of a model in worker processes.
+
+    While sharded, the workers own the rooms, so the model's own rooms are
+    out of date until gather() copies them back. The model keeps its day
+    and inventory.
+    """
+    def __init__(self, model: Model, shards: Optional[int] = None) -> None:
+        """
+        Sends the rooms of a model to the worker processes.
+
+        Parameters:
+            model (Model): the model, which must have been given a seed.
+            shards (Optional[int], optional): the number of worker
+                processes. Defaults to the number of CPUs.
+
+        Raises:
+            ValueError: the model was not given a seed, so its rooms roll
+                the global dice, which differ between processes.
+        """
+        if model.get_seed() == None:
+            raise ValueError('sharded progression needs a seeded Model')
+
+        rooms = [(room, room_id) for room_id, room in model.get_rooms().items()]
+        shards = shards or os.cpu_count() or 1
+        shards = max(1, min(shards, len(rooms)))
+
+        self._model = model
+        self._shard_of_room = {}
+        self._connections = []
+        self._processes = []
+        for index, share in enumerate(partition_rooms(rooms, shards)):
+            for _, room_id in share:
+                self._shard_of_room[room_id] = index
+            parent_end, child_end = Pipe()
+            process = Process(target=_shard_worker, 
+                args=(child_end, model.get_house_file(), share), daemon=True)
+            process.start()
+            child_end.close()
+            self._connections.append(parent_end)
+            self._processes.append(process)
+
+        self._alive = sum(connection.recv() 
+            for connection in self._connections)
+
+    def next(self, applied_items: PendingEffects | 
+        list[tuple[str, int | slice, Item]]) -> int:
+        """
+        Progresses the house to the next day and applies the items, as
+        Model.next() does.
+
+        Parameters:
+            applied_items (PendingEffects | list[tuple[str, int | slice, 
+                Item]]): the effects waiting to be applied, or a list of
+                items to be applied, as for Model.next().
+
+        Returns:
+            int: the number of alive plants.
+        """
+        applied_items = self._model.make_effects(applied_items)
+        self._model.start_day()
+
+        # Effects for every room go to every shard, and the others only
+        # to the shard that owns their room.
+        payloads = [[] for _ in self._connections]
+        for effect in applied_items.get_effects():
+            room_id = effect[0]
+            if room_id == '*':
+                for payload in payloads:
+                    payload.append(effect)
+            else:
+                payloads[self._shard_of_room[room_id]].append(effect)
+
+        for connection, payload in zip(self._connections, payloads):
+            connection.send(('next', payload))
+        self._alive = sum(connection.recv() 
+            for connection in self._connections)
+        return self._alive
+
+    def get_number_of_plants_alive(self) -> int:
+        """
+        int: Returns the number of alive plants after the last day.
+        """
+        return self._alive
+
+    def has_won(self) -> bool:
+        """
+        bool: Returns True if player has won, as in Model.has_won().
+        """
+        return self._model.has_won(self._alive)
+
+    def has_lost(self) -> bool:
+        """
+        bool: Returns True if player has lost, as in Model.has_lost().
+        """
+        return bool(self._model.has_lost(self._alive))
+
+    def gather(self) -> None:
+        """
+        Copies the rooms of every shard back into the model.
+        """
+        rooms = {}
+        for connection in self._connections:
+            connection.send(('gather', None))
+        for connection in self._connections:
+            rooms.update(connection.recv())
+        self._model.restore_rooms(rooms)
+
+    def close(self, gather: bool = True) -> None:
+        """
+        Stops the worker processes.
+
+        Parameters:
+            gather (bool, optional): whether to copy the rooms back into the
+                model first, defaults to True.
+        """
+        if gather and self._connections:
+            self.gather()
+        for connection in self._connections:
+            connection.send(('close', None))
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    def __enter__(self) -> 'ShardedHouse':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        """
+        str: Returns the representation of the sharded house.
+        """
+        return f"ShardedHouse({self._model!r}, {len(self._connections)})"
@@ -0,0 +1,585 @@
+"""
+Memory-mapped storage of pot and plant state, for houses too large to
+hold as Pot and Plant objects.
+
+A store file holds a fixed-size header, a table of rooms (as JSON), and
+then one fixed-width record per pot, ordered by room and position. A
+MappedHouse progresses the records a chunk at a time with the same rules
+as Pot.progress() and OutDoor.progress_plant(), so only one chunk of
+temporary arrays is in memory at once. Any number of processes can open
+the same file read-only with PlantStore(path) and see the records without
+copying them while a simulation writes to it.
+
+Requires NumPy.
+"""
+import json
+import struct
+from typing import Iterator, Optional
+
+import numpy
+
+from a2 import (ANIMAL_ATTACK_DAMAGE, PLANT_NAMES, PLANTS_DATA, ROOM_LAYOUTS,
+    Fertiliser, Item, Model, OutDoor, PendingEffects, PossumRepellent, Water,
+    parse_pot)
+
+
+MAGIC = b'PLANTSTR'
+VERSION = 1
+
+# magic, version, record size, number of records, day, number of plants
+# the house started with, size of the room table in bytes.
+HEADER = struct.Struct('<8sIIQQQQ')
+HEADER_SIZE = 64
+ALIGNMENT = 64
+
+RECORD = numpy.dtype([
+    ('room', '<i4'),
+    ('position', '<i4'),
+    ('species', '<i2'),
+    ('pot_sun_lower', '<i2'),
+    ('pot_sun_upper', '<i2'),
+    ('sun_lower', '<i2'),
+    ('sun_upper', '<i2'),
+    ('outdoor', 'u1'),
+    ('repellent', 'u1'),
+    ('evaporation', '<f8'),
+    ('drink_rate', '<f8'),
+    ('water', '<f8'),
+    ('health', '<i4'),
+    ('age', '<i4'),
+])
+
+# Records without a plant have this species.
+NO_PLANT = -1
+
+DEFAULT_CHUNK_ROWS = 1 << 20
+
+
+def _records_offset(rooms_size: int) -> int:
+    """
+    Returns the offset of the first record, after the header and room table.
+
+    Parameters:
+        rooms_size (int): the size of the room table in bytes.
+    """
+    end = HEADER_SIZE + rooms_size
+    return (end + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class PlantStore:
+    """
+    A file of fixed-width pot and plant records, mapped into memory.
+    """
+    def __init__(self, path: str, mode: str = 'r') -> None:
+        """
+        Opens an existing store.
+
+        Parameters:
+            path (str): the store file.
+            mode (str, optional): 'r' to map it read-only, or 'r+' to map
+                it for writing. Defaults to 'r'.
+
+        Raises:
+            ValueError: the file is not a store, or is of another version.
+        """
+        with open(path, 'rb') as file:
+            header = HEADER.unpack(file.read(HEADER.size))
+            magic, version, record_size, count, _, _, rooms_size = header
+            if magic != MAGIC or version != VERSION \
+                or record_size != RECORD.itemsize:
+                raise ValueError(f'{path} is not a version {VERSION} store')
+            file.seek(HEADER_SIZE)
+            self._rooms = json.loads(file.read(rooms_size))
+
+        self._path = path
+        self._mode = mode
+        self._header = numpy.memmap(path, dtype=numpy.uint8, mode=mode,
+            offset=0, shape=(HEADER_SIZE,))
+        if count > 0:
+            self._records = numpy.memmap(path, dtype=RECORD, mode=mode,
+                offset=_records_offset(rooms_size), shape=(count,))
+        else:
+            self._records = numpy.zeros(0, dtype=RECORD)
+        self._room_index = {room['id']: room for room in self._rooms}
+
+    @classmethod
+    def create(cls, path: str,
+        rooms: list[tuple[str, str, int]]) -> 'PlantStore':
+        """
+        Creates a store of empty pots.
+
+        Parameters:
+            path (str): the store file, which is overwritten.
+            rooms (list[tuple[str, str, int]]): tuples of room IDs, room
+                names (keys of ROOM_LAYOUTS), and numbers of pots.
+
+        Returns:
+            PlantStore: the new store, open for writing.
+        """
+        table = []
+        count = 0
+        for room_id, name, pots in rooms:
+            outdoor = ROOM_LAYOUTS.get(name).get('room_type') == 'OutDoor'
+            table.append({'id': room_id, 'name': name, 'outdoor': outdoor,
+                'start': count, 'count': pots})
+            count += pots
+        room_bytes = json.dumps(table).encode()
+
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize, count,
+                0, 0, len(room_bytes)))
+            file.seek(HEADER_SIZE)
+            file.write(room_bytes)
+            file.truncate(_records_offset(len(room_bytes))
+                + count * RECORD.itemsize)
+
+        store = cls(path, 'r+')
+        for index, room in enumerate(table):
+            records = store.get_records()[room['start']:
+                room['start'] + room['count']]
+            records['room'] = index
+            records['position'] = numpy.arange(room['count'])
+            records['outdoor'] = room['outdoor']
+            records['species'] = NO_PLANT
+        return store
+
+    @classmethod
+    def from_house(cls, house_file: str, path: str,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS) -> 'PlantStore':
+        """
+        Creates a store from a house file without building Pot or Plant
+        objects. The file is read twice: once to count the pots of each
+        room, and once to fill in their records a chunk at a time.
+
+        Parameters:
+            house_file (str): directory of the house file.
+            path (str): the store file, which is overwritten.
+            chunk_rows (int, optional): the number of records filled in
+                at once.
+
+        Returns:
+            PlantStore: the new store, open for writing.
+        """
+        rooms = []
+        room_count = {}
+        with open(house_file, 'r') as file:
+            for line in file:
+                line = line.strip()
+                if line.startswith('Room'):
+                    _, _, room = line.partition(' - ')
+                    name, _ = room.split(' ')
+                    room_count[name] = room_count.get(name, 0) + 1
+                    rooms.append([name[:3] + str(room_count[name]), name, 0])
+                elif line.startswith(('Plants', 'Items')):
+                    continue
+                elif len(line) > 0 and len(rooms) > 0:
+                    rooms[-1][2] += line.count(',') + 1
+
+        store = cls.create(path, rooms)
+        records = store.get_records()
+        pots = []
+        filled = 0
+        with open(house_file, 'r') as file:
+            for line in file:
+                line = line.strip()
+                if line.startswith(('Room', 'Plants', 'Items')) \
+                    or len(line) == 0:
+                    continue
+                for token in line.split(','):
+                    pots.append(parse_pot(token))
+                    if len(pots) == chunk_rows:
+                        _fill_pots(records[filled:filled + len(pots)], pots)
+                        filled += len(pots)
+                        pots = []
+        _fill_pots(records[filled:filled + len(pots)], pots)
+        store.set_total_plants(int((records['species'] != NO_PLANT).sum()))
+        store.flush()
+        return store
+
+    @classmethod
+    def from_model(cls, model: Model, path: str) -> 'PlantStore':
+        """
+        Creates a store holding the current state of a model's pots.
+
+        Parameters:
+            model (Model): the model.
+            path (str): the store file, which is overwritten.
+
+        Returns:
+            PlantStore: the new store, open for writing.
+        """
+        rooms = [(room_id, room.get_name(), len(room.get_pots()))
+            for room_id, room in model.get_rooms().items()]
+        store = cls.create(path, rooms)
+        store.get_records()[:] = records_from_model(model)
+        store.set_day(model.get_days_past() - 1)
+        store.set_total_plants(model.get_total_plants())
+        store.flush()
+        return store
+
+    def get_records(self) -> numpy.ndarray:
+        """
+        numpy.ndarray: Returns the mapped records, in order of room and
+            position. Slices of it are views of the file.
+        """
+        return self._records
+
+    def get_rooms(self) -> list[dict]:
+        """
+        list[dict]: Returns the room table, with each room's 'id', 'name',
+            'outdoor', and the 'start' and 'count' of its records.
+        """
+        return self._rooms
+
+    def get_room(self, room_id: str) -> Optional[dict]:
+        """
+        Optional[dict]: Returns the entry of the room table of a room ID.
+        """
+        return self._room_index.get(room_id)
+
+    def iter_chunks(self, chunk_rows: int = DEFAULT_CHUNK_ROWS
+        ) -> Iterator[tuple[int, numpy.ndarray]]:
+        """
+        Iterates over the records a chunk at a time.
+
+        Parameters:
+            chunk_rows (int, optional): the number of records in a chunk.
+
+        Returns:
+            Iterator[tuple[int, numpy.ndarray]]: the index of the first
+                record of each chunk, and a view of the chunk's records.
+        """
+        for start in range(0, len(self._records), chunk_rows):
+            yield start, self._records[start:start + chunk_rows]
+
+    def _get_header_field(self, index: int) -> int:
+        """
+        Returns a field of the mapped header.
+
+        Parameters:
+            index (int): the index of the field in HEADER.
+        """
+        return HEADER.unpack(bytes(self._header[:HEADER.size]))[index]
+
+    def _set_header_field(self, index: int, value: int) -> None:
+        """
+        Sets a field of the mapped header.
+
+        Parameters:
+            index (int): the index of the field in HEADER.
+            value (int): the new value.
+        """
+        fields = list(HEADER.unpack(bytes(self._header[:HEADER.size])))
+        fields[index] = value
+        self._header[:HEADER.size] = numpy.frombuffer(HEADER.pack(*fields),
+            dtype=numpy.uint8)
+
+    def get_day(self) -> int:
+        """
+        int: Returns the number of days the records have been progressed.
+        """
+        return self._get_header_field(4)
+
+    def set_day(self, day: int) -> None:
+        """
+        Sets the number of days the records have been progressed.
+
+        Parameters:
+            day (int): the number of days.
+        """
+        self._set_header_field(4, day)
+
+    def get_total_plants(self) -> int:
+        """
+        int: Returns the number of plants that the house started with.
+        """
+        return self._get_header_field(5)
+
+    def set_total_plants(self, total: int) -> None:
+        """
+        Sets the number of plants that the house started with.
+
+        Parameters:
+            total (int): the number of plants.
+        """
+        self._set_header_field(5, total)
+
+    def flush(self) -> None:
+        """
+        Writes changes to the mapped records back to the file.
+        """
+        if self._mode != 'r':
+            self._header.flush()
+            if isinstance(self._records, numpy.memmap):
+                self._records.flush()
+
+    def close(self) -> None:
+        """
+        Flushes and unmaps the store.
+        """
+        self.flush()
+        self._records = numpy.zeros(0, dtype=RECORD)
+        self._header = numpy.zeros(HEADER_SIZE, dtype=numpy.uint8)
+
+    def __len__(self) -> int:
+        """
+        int: Returns the number of records.
+        """
+        return len(self._records)
+
+    def __repr__(self) -> str:
+        """
+        str: Returns the representation of the store.
+        """
+        return f"PlantStore('{self._path}', '{self._mode}')"
+
+
+def _fill_pots(records: numpy.ndarray,
+    pots: list[tuple[tuple[int, int], float, Optional[str]]]) -> None:
+    """
+    Fills in records from descriptions of pots, as read by parse_pot().
+
+    Parameters:
+        records (numpy.ndarray): the records to fill in.
+        pots (list[tuple[tuple[int, int], float, Optional[str]]]): the
+            sun range, evaporation rate, and plant name of each pot.
+    """
+    if len(pots) == 0:
+        return
+    sun_ranges, evaporation, names = zip(*pots)
+    records['pot_sun_lower'], records['pot_sun_upper'] = \
+        numpy.array(sun_ranges).T
+    records['evaporation'] = evaporation
+
+    species = numpy.array([NO_PLANT if name == None
+        else PLANT_NAMES.index(name) for name in names])
+    planted = species != NO_PLANT
+    data = [PLANTS_DATA[name] for name in PLANT_NAMES]
+    records['species'] = species
+    for field, key in (('sun_lower', 'sun-lower'), ('sun_upper', 'sun-upper'),
+        ('drink_rate', 'drink rate')):
+        values = numpy.array([plant[key] for plant in data])
+        records[field][planted] = values[species[planted]]
+    records['water'][planted] = 10.0
+    records['health'][planted] = 10
+
+
+def records_from_model(model: Model) -> numpy.ndarray:
+    """
+    Creates records, in memory, of the current state of a model's pots.
+
+    Parameters:
+        model (Model): the model.
+
+    Returns:
+        numpy.ndarray: a record for each pot, in order of room and position.
+    """
+    count = sum(len(room.get_pots()) for room in model.get_all_rooms())
+    records = numpy.zeros(count, dtype=RECORD)
+    records['species'] = NO_PLANT
+    index = 0
+    for room_index, room in enumerate(model.get_all_rooms()):
+        for position, pot in enumerate(room.get_pots()):
+            record = records[index]
+            record['room'] = room_index
+            record['position'] = position
+            record['outdoor'] = isinstance(room, OutDoor)
+            record['pot_sun_lower'], record['pot_sun_upper'] = \
+                pot.get_sun_range()
+            record['evaporation'] = pot.get_evaporation()
+            plant = pot.look_at_plant()
+            if plant != None:
+                record['species'] = PLANT_NAMES.index(plant.get_name())
+                record['sun_lower'], record['sun_upper'] = \
+                    plant.get_sun_levels()
+                record['drink_rate'] = plant.get_drink_rate()
+                record['water'] = plant.get_water()
+                record['health'] = plant.get_health()
+                record['age'] = plant.get_age()
+                record['repellent'] = plant.has_repellent()
+            index += 1
+    return records
+
+
+def alive_mask(records: numpy.ndarray) -> numpy.ndarray:
+    """
+    numpy.ndarray: Returns which records hold living plants.
+    """
+    return (records['species'] != NO_PLANT) & (records['health'] > 0)
+
+
+def progress_records(records: numpy.ndarray, draws: numpy.ndarray) -> int:
+    """
+    Progresses the living plants of records by one day in place, with the
+    same rules as Pot.progress() and OutDoor.progress_plant().
+
+    Parameters:
+        records (numpy.ndarray): the records to progress.
+        draws (numpy.ndarray): one uniform random number in [0, 1) for
+            each record, for outdoor animal attacks.
+
+    Returns:
+        int: the number of living plants afterwards.
+    """
+    alive = alive_mask(records)
+    health = records['health']
+    water = records['water']
+
+    # At least one value of the plant's sun range must be in the pot's
+    # sun range to avoid losing health.
+    overlap = numpy.minimum(records['pot_sun_upper'], records['sun_upper']) \
+        - numpy.maximum(records['pot_sun_lower'], records['sun_lower'])
+    health[alive & (overlap < 0)] -= 1
+
+    # Evaporation, then drinking, or losing health if there is no water.
+    water[alive] -= records['evaporation'][alive]
+    dry = alive & (water <= 0)
+    health[dry] -= 1
+    drinking = alive & ~dry
+    water[drinking] -= records['drink_rate'][drinking]
+    records['age'][alive] += 1
+
+    # dice_roll() is True for 15 of the 101 values of randint(0, 100).
+    attacked = alive & (health > 0) & (records['outdoor'] == 1) \
+        & (records['repellent'] == 0) \
+        & (numpy.floor(draws * 101) > 85)
+    health[attacked] -= ANIMAL_ATTACK_DAMAGE
+
+    return int(alive_mask(records).sum())
+
+
+def apply_item(records: numpy.ndarray, item: Item, count: int) -> None:
+    """
+    Applies an item count times to the living plants of records in place,
+    as Item.apply_many() does.
+
+    Parameters:
+        records (numpy.ndarray): the records of the targeted pots.
+        item (Item): the item.
+        count (int): the number of times it is applied to each pot.
+    """
+    alive = alive_mask(records)
+    if isinstance(item, Water):
+        records['water'][alive] += count
+    elif isinstance(item, Fertiliser):
+        records['health'][alive] += count
+    elif isinstance(item, PossumRepellent):
+        records['repellent'][alive] = 1
+    else:
+        raise NotImplementedError(f'{item!r} cannot be applied to a store')
+
+
+class MappedHouse:
+    """
+    Progresses the records of a PlantStore a day at a time, like Model.
+
+    Random numbers come from a stream for each seed and day, skipped ahead
+    to each chunk's first record, so the result does not depend on the
+    size of the chunks.
+    """
+    def __init__(self, store: PlantStore, seed: int = 0,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS) -> None:
+        """
+        Parameters:
+            store (PlantStore): the store, open for writing.
+            seed (int, optional): seed of the random numbers, defaults to 0.
+            chunk_rows (int, optional): the number of records progressed
+                at once.
+        """
+        self._store = store
+        self._seed = seed
+        self._chunk_rows = chunk_rows
+        self._alive = sum(int(alive_mask(chunk).sum())
+            for _, chunk in store.iter_chunks(chunk_rows))
+
+    def get_store(self) -> PlantStore:
+        """
+        PlantStore: Returns the store of the house.
+        """
+        return self._store
+
+    def get_days_past(self) -> int:
+        """
+        int: Returns the number of days that have passed, as in Model.
+        """
+        return self._store.get_day() + 1
+
+    def get_number_of_plants_alive(self) -> int:
+        """
+        int: Returns the number of living plants.
+        """
+        return self._alive
+
+    def _target_ranges(self, room_id: str,
+        positions: slice) -> list[tuple[int, int, int]]:
+        """
+        Finds the records targeted by an effect.
+
+        Parameters:
+            room_id (str): ID of a room, or '*' for every room.
+            positions (slice): a slice of positions within each room.
+
+        Returns:
+            list[tuple[int, int, int]]: the start, stop and step of the
+                targeted records of each room.
+        """
+        if room_id == '*':
+            rooms = self._store.get_rooms()
+        else:
+            rooms = [self._store.get_room(room_id)]
+        ranges = []
+        for room in rooms:
+            start, stop, step = positions.indices(room['count'])
+            ranges.append((room['start'] + start, room['start'] + stop, step))
+        return ranges
+
+    def next(self, applied_items: Optional[PendingEffects] = None) -> int:
+        """
+        Progresses the house to the next day and applies the items.
+
+        Parameters:
+            applied_items (Optional[PendingEffects], optional): the effects
+                waiting to be applied, defaults to none.
+
+        Returns:
+            int: the number of living plants.
+        """
+        records = self._store.get_records()
+        day = self._store.get_day() + 1
+
+        if applied_items != None:
+            for room_id, positions, item, count in applied_items.get_effects():
+                for start, stop, step in self._target_ranges(room_id,
+                    positions):
+                    window = self._chunk_rows * step
+                    for first in range(start, stop, window):
+                        apply_item(records[first:min(first + window, stop):
+                            step], item, count)
+
+        alive = 0
+        for start, chunk in self._store.iter_chunks(self._chunk_rows):
+            generator = numpy.random.PCG64([self._seed, day])
+            generator.advance(start)
+            draws = numpy.random.Generator(generator).random(len(chunk))
+            alive += progress_records(chunk, draws)
+
+        self._store.set_day(day)
+        self._store.flush()
+        self._alive = alive
+        return alive
+
+    def has_won(self) -> bool:
+        """
+        bool: Returns True if more than half of the plants are alive after
+            15 days, as in Model.has_won().
+        """
+        return self.get_days_past() >= 15 \
+            and self._alive > self._store.get_total_plants() / 2
+
+    def has_lost(self) -> bool:
+        """
+        bool: Returns True if half or less of the plants are alive after
+            the first day, as in Model.has_lost().
+        """
+        return self.get_days_past() > 1 \
+            and self._alive <= self._store.get_total_plants() / 2
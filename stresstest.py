@@ -0,0 +1,147 @@
+"""
+Stress test of threaded play: several threads play one shared house at
+once, each with its own GardenSim, and no plant may be lost or duplicated.
+
+Every thread makes a stream of generated m, s, p and ls moves, and the
+first thread also progresses the day with 'n'. Moves that cross rooms in
+opposite directions, and days that tick while plants are moved, are what
+the room, inventory and day locks guard against. At the end the plants in
+pots and in the inventory must number as many as at the start, each plant
+must be in only one pot, and no move may have raised an exception.
+
+Usage: python stresstest.py {house file} [{threads}] [{moves}] [{seed}]
+       e.g. python stresstest.py houses/house1.txt 8 2000 1
+"""
+import contextlib
+import os
+import random
+import sys
+import threading
+from typing import Optional
+
+from a2 import GardenSim, Model, NullView
+from loadtest import generate_moves
+
+
+# The share of each move in the generated streams. The first thread's
+# stream also progresses the day.
+MOVE_MIX = {
+    'm': 0.45,
+    's': 0.45,
+    'p': 0.07,
+    'ls': 0.03,
+}
+DAY_MIX = {
+    'm': 0.45,
+    's': 0.45,
+    'p': 0.07,
+    'n': 0.03,
+}
+THREADS = 8
+MOVES = 2000
+# Seconds between thread switches, short so that moves interleave often.
+SWITCH_INTERVAL = 1e-6
+
+
+def count_plants(model: Model) -> tuple[int, int, int]:
+    """
+    Counts the plants of a house.
+
+    Parameters:
+        model (Model): the house.
+
+    Returns:
+        tuple[int, int, int]: the number of plants in pots, of plants in
+            the inventory, and of plants that are in more than one pot.
+    """
+    potted = [plant for room in model.get_all_rooms()
+        for plant in room.get_plants() if plant != None]
+    stored = sum(len(stack) for stack
+        in model.get_inventory().get_entities('Plant').values())
+    duplicated = len(potted) - len({id(plant) for plant in potted})
+    return len(potted), stored, duplicated
+
+
+def run_stress(house_file: str, threads: int = THREADS, moves: int = MOVES,
+    seed: Optional[int] = None) -> dict:
+    """
+    Plays a house from several threads at once.
+
+    Parameters:
+        house_file (str): path of the house file.
+        threads (int, optional): the number of threads, defaults to THREADS.
+        moves (int, optional): the number of moves each thread makes,
+            defaults to MOVES.
+        seed (Optional[int], optional): seed for the moves and dice,
+            defaults to None for unseeded random numbers.
+
+    Returns:
+        dict: the number of plants 'before' and 'after' the run, in pots
+            and in the inventory, the number of plants in more than one
+            pot as 'duplicated', the 'errors' raised by moves, as reprs,
+            and the 'days' progressed.
+    """
+    model = Model(house_file, seed=seed)
+    potted, stored, _ = count_plants(model)
+    errors = []
+
+    def play(index: int) -> None:
+        thread_seed = None if seed is None else seed + index
+        stream = generate_moves(model, moves, random.Random(thread_seed),
+            DAY_MIX if index == 0 else MOVE_MIX)
+        game = GardenSim(house_file, NullView(), model=model)
+        try:
+            for move in stream:
+                game.execute(move)
+        except Exception as error:
+            errors.append(repr(error))
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(SWITCH_INTERVAL)
+    # Messages about plants are printed rather than viewed.
+    try:
+        with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+            players = [threading.Thread(target=play, args=(index,))
+                for index in range(threads)]
+            for player in players:
+                player.start()
+            for player in players:
+                player.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    after_potted, after_stored, duplicated = count_plants(model)
+    return {
+        'before': potted + stored,
+        'after': after_potted + after_stored,
+        'duplicated': duplicated,
+        'errors': errors,
+        'days': model.get_days_past(),
+    }
+
+
+def main():
+    """ Entry-point to the stress test """
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        return
+    house_file = sys.argv[1]
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else THREADS
+    moves = int(sys.argv[3]) if len(sys.argv) > 3 else MOVES
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    report = run_stress(house_file, threads, moves, seed)
+    print(f"{threads} threads, {moves} moves each, {report['days']} days: "
+        f"{report['before']} plants before, {report['after']} after, "
+        f"{report['duplicated']} duplicated, {len(report['errors'])} errors")
+    for error in report['errors']:
+        print(f'  {error}')
+    if report['after'] != report['before'] or report['duplicated'] != 0 \
+        or report['errors'] != []:
+        sys.exit('FAILED: plants were lost or duplicated, or moves raised '
+            'exceptions')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""
+Per-day plant telemetry, written as chunked columnar files.
+
+A TelemetryRecorder is added to a Model as a day listener. At the end of
+each day it appends one row per plant (and one row per room event) to
+fixed-size column buffers, which are written out as a numbered chunk file
+whenever they fill up. Memory use is therefore bounded by the chunk size,
+however long the run.
+
+CSV chunks can be read without extra packages; NumPy (.npz) chunks, and
+reading chunks back with read_telemetry(), need NumPy.
+"""
+import csv
+import os
+from array import array
+
+from a2 import Model
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Columns of each table and the array typecode of their buffers. Rooms,
+# species and events are stored as codes into a list of labels.
+PLANT_COLUMNS = {
+    'day': 'l',
+    'room': 'l',
+    'position': 'l',
+    'species': 'l',
+    'water': 'd',
+    'health': 'l',
+    'age': 'l',
+    'repellent': 'b',
+}
+EVENT_COLUMNS = {
+    'day': 'l',
+    'room': 'l',
+    'event': 'l',
+    'count': 'l',
+}
+LABELLED_COLUMNS = ('room', 'species', 'event')
+TABLES = ('plants', 'events')
+FORMATS = ('csv', 'npz')
+
+
+def _clear_chunks(directory: str) -> None:
+    """
+    Deletes the chunks of every table in a directory, e.g. those of an
+    earlier run, so that they are not read back with a new run's chunks.
+    Other files are kept.
+
+    Parameters:
+        directory (str): the directory that chunks are written to.
+    """
+    for name in os.listdir(directory):
+        table, _, chunk = name.partition('-')
+        number, _, extension = chunk.partition('.')
+        if table in TABLES and number.isdigit() and extension in FORMATS:
+            os.remove(os.path.join(directory, name))
+
+
+def _require_numpy() -> None:
+    """
+    Raises:
+        ImportError: NumPy is not installed.
+    """
+    if numpy is None:
+        raise ImportError('NumPy is needed for .npz telemetry and for '
+            'reading telemetry back')
+
+
+class _ColumnBuffer:
+    """
+    Fixed-size typed column buffers for one table, written out in chunks.
+    """
+    def __init__(self, directory: str, table: str,
+        columns: dict[str, str], file_format: str, chunk_rows: int,
+        labels: dict[str, list[str]]) -> None:
+        """
+        Parameters:
+            directory (str): the directory that chunks are written to.
+            table (str): name of the table, used to name the chunks.
+            columns (dict[str, str]): the columns and their typecodes.
+            file_format (str): 'csv' or 'npz'.
+            chunk_rows (int): the number of rows in each chunk.
+            labels (dict[str, list[str]]): the labels of coded columns,
+                shared between tables.
+        """
+        self._directory = directory
+        self._table = table
+        self._columns = columns
+        self._format = file_format
+        self._chunk_rows = chunk_rows
+        self._labels = labels
+        self._buffers = {name: array(code) for name, code in columns.items()}
+        self._rows = 0
+        self._chunks = 0
+
+    def append(self, row: tuple) -> None:
+        """
+        Appends a row, writing a chunk if the buffers are full.
+
+        Parameters:
+            row (tuple): one value for each column, in order.
+        """
+        for buffer, value in zip(self._buffers.values(), row):
+            buffer.append(value)
+        self._rows += 1
+        if self._rows >= self._chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the buffered rows as the next chunk and empties the buffers.
+        """
+        if self._rows == 0:
+            return
+        path = os.path.join(self._directory,
+            f'{self._table}-{self._chunks:05d}.{self._format}')
+
+        if self._format == 'npz':
+            columns = {name: numpy.frombuffer(buffer, dtype=buffer.typecode)
+                for name, buffer in self._buffers.items()}
+            for name in LABELLED_COLUMNS:
+                if name in columns:
+                    columns[f'{name}_labels'] = \
+                        numpy.array(self._labels[name], dtype=str)
+            numpy.savez(path, **columns)
+        else:
+            with open(path, 'w', newline='') as chunk:
+                writer = csv.writer(chunk)
+                writer.writerow(self._columns)
+                for row in zip(*self._buffers.values()):
+                    writer.writerow(self._label_row(row))
+
+        for name, code in self._columns.items():
+            self._buffers[name] = array(code)
+        self._rows = 0
+        self._chunks += 1
+
+    def _label_row(self, row: tuple) -> list:
+        """
+        Replaces the codes of a row with their labels, for CSV.
+
+        Parameters:
+            row (tuple): one value for each column, in order.
+        """
+        labelled = list(row)
+        for index, name in enumerate(self._columns):
+            if name in LABELLED_COLUMNS:
+                labelled[index] = self._labels[name][row[index]]
+        return labelled
+
+
+class TelemetryRecorder:
+    """
+    Records the water, health, age and repellent of every plant each day,
+    and the count of each event in each room, as chunked columnar files.
+    """
+    def __init__(self, directory: str, file_format: str = 'csv',
+        chunk_rows: int = 65536) -> None:
+        """
+        Parameters:
+            directory (str): the directory that chunks are written to,
+                which is created if needed. Chunks already in it are
+                deleted.
+            file_format (str, optional): 'csv' or 'npz', defaults to 'csv'.
+            chunk_rows (int, optional): the number of rows kept in memory
+                before they are written as a chunk, defaults to 65536.
+
+        Raises:
+            ValueError: the format is unknown or chunk_rows is not positive.
+            ImportError: the format is 'npz' and NumPy is not installed.
+        """
+        if file_format not in FORMATS:
+            raise ValueError(f'unknown telemetry format: {file_format}')
+        if chunk_rows < 1:
+            raise ValueError('chunk_rows must be at least 1')
+        if file_format == 'npz':
+            _require_numpy()
+
+        os.makedirs(directory, exist_ok=True)
+        _clear_chunks(directory)
+        self._labels = {name: [] for name in LABELLED_COLUMNS}
+        self._codes = {name: {} for name in LABELLED_COLUMNS}
+        self._plants = _ColumnBuffer(directory, 'plants', PLANT_COLUMNS,
+            file_format, chunk_rows, self._labels)
+        self._events = _ColumnBuffer(directory, 'events', EVENT_COLUMNS,
+            file_format, chunk_rows, self._labels)
+        self._models = []
+
+    def _code(self, column: str, label: str) -> int:
+        """
+        Returns the code of a label, adding it if it is new.
+
+        Parameters:
+            column (str): 'room', 'species' or 'event'.
+            label (str): the label.
+        """
+        codes = self._codes[column]
+        if label not in codes:
+            codes[label] = len(codes)
+            self._labels[column].append(label)
+        return codes[label]
+
+    def attach(self, model: Model) -> None:
+        """
+        Starts recording a model at the end of each of its days.
+
+        Parameters:
+            model (Model): the model to record.
+        """
+        model.add_day_listener(self.record)
+        self._models.append(model)
+
+    def record(self, model: Model) -> None:
+        """
+        Records the current state of a model's plants and rooms.
+
+        Parameters:
+            model (Model): the model to record.
+        """
+        day = model.get_days_past()
+        for room_id, room in model.get_rooms().items():
+            room_code = self._code('room', room_id)
+            for position, plant in enumerate(room.get_plants()):
+                if plant == None:
+                    continue
+                self._plants.append((day, room_code, position,
+                    self._code('species', plant.get_name()),
+                    plant.get_water(), plant.get_health(), plant.get_age(),
+                    plant.has_repellent()))
+            for event, count in room.get_events().items():
+                self._events.append(
+                    (day, room_code, self._code('event', event), count))
+
+    def close(self) -> None:
+        """
+        Stops recording attached models and writes any buffered rows.
+        """
+        for model in self._models:
+            model.remove_day_listener(self.record)
+        self._models = []
+        self._plants.flush()
+        self._events.flush()
+
+    def __enter__(self) -> 'TelemetryRecorder':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_telemetry(directory: str,
+    table: str = 'plants') -> dict[str, 'numpy.ndarray']:
+    """
+    Reads every chunk of a table back as one array per column.
+
+    Columns of rooms, species and events hold their labels.
+
+    Parameters:
+        directory (str): the directory the chunks were written to.
+        table (str, optional): 'plants' or 'events', defaults to 'plants'.
+
+    Returns:
+        dict[str, numpy.ndarray]: the column arrays, by column name.
+
+    Raises:
+        ImportError: NumPy is not installed.
+    """
+    _require_numpy()
+    names = sorted(name for name in os.listdir(directory)
+        if name.startswith(f'{table}-'))
+    columns = PLANT_COLUMNS if table == 'plants' else EVENT_COLUMNS
+
+    parts = {name: [] for name in columns}
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.endswith('.npz'):
+            with numpy.load(path) as chunk:
+                for column in columns:
+                    values = chunk[column]
+                    if column in LABELLED_COLUMNS:
+                        values = chunk[f'{column}_labels'][values]
+                    parts[column].append(values)
+        else:
+            chunk = numpy.genfromtxt(path, delimiter=',', names=True,
+                dtype=None, encoding='utf-8', ndmin=1)
+            for column in columns:
+                parts[column].append(chunk[column])
+
+    return {column: numpy.concatenate(values) if values
+        else numpy.array([]) for column, values in parts.items()}